@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""Benchmark OCR render modes: fixed 200 DPI baseline vs adaptive DPI (+ grayscale).
+
+Each mode runs in a fresh process so peak RSS is measured independently.
+
+    python scripts/bench_ocr.py --pdf data/samples/court_order.pdf
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MODES = {
+    "fixed-200": dict(dpi=200, adaptive_dpi=False, grayscale=False),
+    "adaptive": dict(dpi=200, adaptive_dpi=True, grayscale=False),
+    "adaptive-gray": dict(dpi=200, adaptive_dpi=True, grayscale=True),
+}
+
+def _run_mode(pdf_path, options, out):
+    from src.docupilot.models.ocr_paddle import PaddleOCRExtractor, ENGINE_POOL, peak_rss_mb
+
+    # Load the engine before timing so every mode pays the same setup cost
+    with ENGINE_POOL.acquire():
+        pass
+    extractor = PaddleOCRExtractor()
+    started = time.perf_counter()
+    pages = blocks = 0
+    for _, page_blocks in extractor.iter_pdf(pdf_path, **options):
+        pages += 1
+        blocks += len(page_blocks)
+    elapsed = time.perf_counter() - started
+    out.put((pages, blocks, elapsed, peak_rss_mb()))
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--pdf", required=True, help="Scanned PDF to OCR")
+    ap.add_argument("--modes", nargs="+", default=list(MODES), choices=list(MODES))
+    args = ap.parse_args()
+
+    ctx = mp.get_context("spawn")
+    results = {}
+    for mode in args.modes:
+        out = ctx.Queue()
+        proc = ctx.Process(target=_run_mode, args=(args.pdf, MODES[mode], out))
+        proc.start()
+        results[mode] = out.get()
+        proc.join()
+
+    print(f"\n{'mode':<15}{'pages':>7}{'blocks':>8}{'pages/sec':>11}{'peak RSS MB':>13}")
+    for mode, (pages, blocks, elapsed, rss) in results.items():
+        print(f"{mode:<15}{pages:>7}{blocks:>8}{pages / elapsed:>11.2f}{rss:>13.0f}")
+
+    if "fixed-200" in results:
+        base_pages, _, base_elapsed, base_rss = results["fixed-200"]
+        for mode, (pages, _, elapsed, rss) in results.items():
+            if mode == "fixed-200":
+                continue
+            speedup = (pages / elapsed) / (base_pages / base_elapsed)
+            print(f"{mode}: {speedup:.2f}x pages/sec, {rss - base_rss:+.0f} MB peak RSS vs fixed-200")
+
+if __name__ == "__main__":
+    main()
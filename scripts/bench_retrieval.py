@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Benchmark BM25 evidence retrieval: index build time and per-query latency.
+
+Uses a synthetic contract-like evidence store by default, or the blocks of a
+real evidence.json written by src/main.py.
+
+    python scripts/bench_retrieval.py --blocks 20000 --queries 200 --top_k 8
+    python scripts/bench_retrieval.py --evidence output/evidence.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.retrieval import BM25Index
+from src.agents.orchestrator import ROLE_QUERIES
+
+VOCAB = (
+    "agreement party supplier buyer payment invoice fee penalty interest termination breach notice "
+    "warranty liability indemnify confidentiality jurisdiction arbitration court order plaintiff defendant "
+    "schedule delivery goods services license permit regulation audit tax refund deposit amount days "
+    "shall may must within prior written consent obligation remedy damages clause section"
+).split()
+
+def synthetic_blocks(n, seed=0):
+    rng = random.Random(seed)
+    blocks = []
+    for i in range(n):
+        words = [rng.choice(VOCAB) for _ in range(rng.randint(8, 40))]
+        blocks.append({'id': f"p{i // 40 + 1}_b{i % 40}", 'page': i // 40 + 1, 'text': " ".join(words)})
+    return blocks
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--blocks", type=int, default=10000, help="Synthetic blocks to index")
+    ap.add_argument("--evidence", help="Index the blocks of this evidence.json instead")
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--top_k", type=int, default=8)
+    args = ap.parse_args()
+
+    if args.evidence:
+        with open(args.evidence) as f:
+            data = json.load(f)
+        blocks = data['blocks'] if isinstance(data, dict) else data
+    else:
+        blocks = synthetic_blocks(args.blocks)
+
+    started = time.perf_counter()
+    index = BM25Index(blocks)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(1)
+    queries = list(ROLE_QUERIES.values()) + [
+        " ".join(rng.sample(VOCAB, rng.randint(2, 8))) for _ in range(max(args.queries - len(ROLE_QUERIES), 0))
+    ]
+    latencies = []
+    for q in queries:
+        t0 = time.perf_counter()
+        index.search(q, args.top_k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))]
+    print(f"blocks: {len(index)}  terms: {len(index.postings)}  build: {build_ms:.1f} ms")
+    print(f"queries: {len(latencies)}  top_k: {args.top_k}  "
+          f"p50: {statistics.median(latencies):.2f} ms  p95: {p95:.2f} ms  max: {latencies[-1]:.2f} ms")
+
+if __name__ == "__main__":
+    main()
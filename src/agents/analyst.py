@@ -1,10 +1,11 @@
 
 from pathlib import Path
-from .base import BaseAgent
+from .base import AsyncBaseAgent
+from ..utils.json_repair import JSONRepairError, parse_json
 import json
 from loguru import logger
 
-class AnalystAgent(BaseAgent):
+class AnalystAgent(AsyncBaseAgent):
     def __init__(self):
         super().__init__(name="AnalystAgent", role="Senior Document Analyst")
         prompt_path = Path(__file__).parent / 'prompts' / 'analyst.txt'
@@ -63,23 +64,15 @@ class AnalystAgent(BaseAgent):
         )
         response = self.run(prompt)
         
-        # Robust Parsing
+        # Robust Parsing: fences, prose, trailing commas, truncation etc. are repaired locally
         try:
-            # Clean string
-            json_str = response.strip()
-            
-            # Handle Markdown Code Blocks
-            if "```" in json_str:
-                import re
-                pattern = r"```(?:json)?\s*(.*?)\s*```"
-                match = re.search(pattern, json_str, re.DOTALL | re.IGNORECASE)
-                if match:
-                     json_str = match.group(1)
-            
-            return json.loads(json_str)
-        except Exception as e:
+            data, repairs = parse_json(response)
+        except JSONRepairError as e:
             logger.error(f"Failed to parse Analyst JSON: {e}")
-            return {} 
+            return {}
+        if repairs:
+            logger.info(f"Repaired Analyst JSON: {', '.join(repairs)}")
+        return data
 
     def aggregate(self, partial_results):
         """
@@ -1,14 +1,25 @@
 
 """Base Agent definition using ERNIE"""
 
+import asyncio
 import os
 from loguru import logger
 import erniebot
+from ..config import Config
+from ..docupilot.models.llm_adapter import AsyncChatLLM, run_coroutine
+from ..utils.rate_limit import get_rate_limiter
+from ..utils.llm_cache import get_llm_cache
+from ..utils.json_stream import JSONArrayStream
 
 # Initialize ERNIE - expecting credentials in env
 erniebot.api_type = 'aistudio'
 erniebot.access_token = os.getenv('ERNIE_ACCESS_TOKEN', '')
 
+def _forward(stream, text, on_element):
+    """Feed streamed text to the parser and hand every completed element on."""
+    for key, value in stream.feed(text):
+        on_element(key, value)
+
 class BaseAgent:
     def __init__(self, name, role, model='ernie-3.5'):
         self.name = name
@@ -19,27 +30,128 @@ class BaseAgent:
     def set_system_prompt(self, prompt):
         self.system_prompt = prompt
         
-    def run(self, message):
-        """Send a message to the agent and get a response."""
+    def run(self, message, on_element=None):
+        """
+        Send a message to the agent and get a response.
+        
+        With `on_element`, the response is streamed and parsed as it arrives:
+        every completed element of a top-level JSON array (or of an array
+        under a top-level key, e.g. each entry of {"risks": [...]}) is passed
+        to on_element(key, value) right away. The full text is still returned.
+        """
         logger.info(f"🤖 {self.name} processing task...")
         
+        temperature = 0.3
+        stream = JSONArrayStream() if on_element is not None else None
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = cache.make_key(self.model, self.system_prompt, message, temperature=temperature)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"{self.name} served from LLM cache")
+                if stream is not None:
+                    _forward(stream, cached, on_element)
+                return cached
+        
         try:
             # Construct messages with system prompt
             messages = [
                 {'role': 'user', 'content': f"System Instruction: {self.system_prompt}\n\nTask: {message}"}
             ]
             
-            # Use erniebot ChatCompletion
-            response = erniebot.ChatCompletion.create(
+            # Use erniebot ChatCompletion (shared per-provider rate limit across threads)
+            get_rate_limiter('ernie').acquire()
+            if stream is not None:
+                parts = []
+                for chunk in erniebot.ChatCompletion.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    stream=True
+                ):
+                    delta = chunk.get_result()
+                    parts.append(delta)
+                    _forward(stream, delta, on_element)
+                result = "".join(parts)
+            else:
+                response = erniebot.ChatCompletion.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature
+                )
+                result = response.get_result()
+            logger.debug(f"{self.name} output: {result[:100]}...")
+            if cache is not None:
+                cache.put(cache_key, result)
+            return result
+            
+        except Exception as e:
+            logger.error(f"Error in agent {self.name}: {e}")
+            return f"Error executing task: {e}"
+
+class AsyncBaseAgent(BaseAgent):
+    """
+    BaseAgent with a coroutine `arun`.
+    
+    With ERNIE_BASE_URL set, calls go to that OpenAI-style chat endpoint
+    through AsyncChatLLM on the shared background event loop, so the
+    independent calls of every agent (whichever thread makes them) share
+    one pooled HTTP client and its concurrency limit. `run` stays
+    synchronous and waits on that loop, so helpers calling self.run keep
+    working. Without ERNIE_BASE_URL, both fall back to the erniebot SDK.
+    """
+    def __init__(self, name, role, model='ernie-3.5', llm=None):
+        super().__init__(name, role, model)
+        if llm is None and Config.ERNIE_BASE_URL:
+            llm = AsyncChatLLM(
+                api_key=Config.ERNIE_API_KEY or os.getenv('ERNIE_ACCESS_TOKEN', ''),
+                base_url=Config.ERNIE_BASE_URL,
                 model=self.model,
-                messages=messages,
-                temperature=0.3
             )
-            
-            result = response.get_result()
+        self.llm = llm
+    
+    def run(self, message, on_element=None):
+        if self.llm is None:
+            return self._sdk_run(message, on_element)
+        return run_coroutine(self.arun(message, on_element))
+    
+    def _sdk_run(self, message, on_element):
+        if on_element is None:
+            return super().run(message)
+        return super().run(message, on_element=on_element)
+    
+    async def arun(self, message, on_element=None):
+        """Send a message to the agent and get a response (`on_element` as in BaseAgent.run)."""
+        if self.llm is None:
+            return await asyncio.to_thread(self._sdk_run, message, on_element)
+        logger.info(f"🤖 {self.name} processing task...")
+        
+        temperature = 0.3
+        stream = JSONArrayStream() if on_element is not None else None
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = cache.make_key(self.model, self.system_prompt, message, temperature=temperature)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"{self.name} served from LLM cache")
+                if stream is not None:
+                    _forward(stream, cached, on_element)
+                return cached
+        
+        try:
+            messages = [
+                {'role': 'user', 'content': f"System Instruction: {self.system_prompt}\n\nTask: {message}"}
+            ]
+            result = await self.llm.chat(messages, temperature=temperature, on_element=on_element)
             logger.debug(f"{self.name} output: {result[:100]}...")
+            if cache is not None:
+                cache.put(cache_key, result)
             return result
             
         except Exception as e:
             logger.error(f"Error in agent {self.name}: {e}")
             return f"Error executing task: {e}"
+    
+    async def run_many(self, messages):
+        """Run independent messages concurrently; responses come back in input order."""
+        return await asyncio.gather(*(self.arun(m) for m in messages))
@@ -1,32 +1,128 @@
-
 from pathlib import Path
-from .base import BaseAgent
+from concurrent.futures import ThreadPoolExecutor
+from .base import AsyncBaseAgent
+from ..config import Config
+from ..utils.chunking import estimate_tokens
+from ..utils.json_repair import JSONRepairError, parse_json
 import json
+import re
 from loguru import logger
 
-class IngestionAgent(BaseAgent):
+# Wire format line: "<block_id>|<page>|<text>" (text may itself contain '|')
+_WIRE_LINE_RE = re.compile(r'^\s*([^|\s]+)\|(\d*)\|(.*)$')
+
+def to_wire_line(block):
+    """Compact one-line form of a block, e.g. 'p3_b12|3|Payment is due within 30 days.'"""
+    text = " ".join(str(block.get('text', '')).split())
+    page = block.get('page')
+    return f"{block.get('id', 'N/A')}|{'' if page is None else page}|{text}"
+
+class IngestionAgent(AsyncBaseAgent):
     def __init__(self):
         super().__init__(name="IngestionAgent", role="OCR Data Cleaner")
         prompt_path = Path(__file__).parent / 'prompts' / 'ingestion.txt'
         self.set_system_prompt(prompt_path.read_text())
+        self.last_stats = {}
+
+    def _pack(self, lines, max_tokens):
+        """Group wire lines into chunks of at most `max_tokens` estimated tokens."""
+        chunks, current, current_tokens = [], [], 0
+        for line in lines:
+            tokens = estimate_tokens(line) + 1
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(line)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _clean_chunk(self, lines):
+        """Send one chunk; returns {block_id: cleaned text} for the lines the agent returned."""
+        response = self.run(
+            "Clean these OCR blocks. Each line is block_id|page|text. "
+            "Return the same lines in the same format:\n\n" + "\n".join(lines)
+        )
+        cleaned_text = response.strip()
+        if cleaned_text.startswith("```"):
+            cleaned_text = cleaned_text.split("\n", 1)[-1]
+        if cleaned_text.endswith("```"):
+            cleaned_text = cleaned_text[:-3]
+
+        cleaned = {}
+        for line in cleaned_text.splitlines():
+            match = _WIRE_LINE_RE.match(line)
+            if match and match.group(3).strip():
+                cleaned[match.group(1)] = match.group(3).strip()
+        if not cleaned:
+            # Tolerate agents that still answer with a JSON list of blocks
+            try:
+                data, repairs = parse_json(cleaned_text)
+            except JSONRepairError:
+                return cleaned
+            if repairs:
+                logger.info(f"Repaired Ingestion JSON: {', '.join(repairs)}")
+            for b in data if isinstance(data, list) else []:
+                if not isinstance(b, dict):
+                    continue
+                block_id = b.get('id') or b.get('block_id')
+                if block_id and b.get('text'):
+                    cleaned[block_id] = b['text']
+        return cleaned
 
-    def process(self, blocks):
-        # Convert blocks to a JSON string for the agent to process
-        # We might need to chunk this if it's too large, but for now we pass it all.
-        blocks_str = json.dumps(blocks, indent=2)
-        
-        response = self.run(f"Process these OCR blocks and return cleaned structure:\n\n{blocks_str}")
-        
+    def process(self, blocks, max_tokens=None, max_workers=None):
+        """
+        Clean blocks in compact id|page|text chunks, in parallel, and merge
+        the cleaned text back by block id. Blocks the agent drops or garbles
+        keep their original text. Token savings versus the old indented JSON
+        payload are recorded in `last_stats`.
+        """
+        if not blocks:
+            self.last_stats = {}
+            return blocks
+        max_tokens = max_tokens or Config.INGESTION_CHUNK_TOKENS
+        lines = [to_wire_line(b) for b in blocks]
+        chunks = self._pack(lines, max_tokens)
+
+        cleaned = {}
+        failed_chunks = 0
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers or Config.MAX_WORKERS, len(chunks)))) as pool:
+            for result in pool.map(self._safe_clean_chunk, chunks):
+                if result:
+                    cleaned.update(result)
+                else:
+                    failed_chunks += 1
+
+        merged = []
+        for b in blocks:
+            block = dict(b)
+            if block.get('id') in cleaned:
+                block['text'] = cleaned[block['id']]
+            merged.append(block)
+
+        json_tokens = estimate_tokens(json.dumps(blocks, indent=2))
+        compact_tokens = sum(estimate_tokens(line) + 1 for line in lines)
+        self.last_stats = {
+            'blocks': len(blocks),
+            'chunks': len(chunks),
+            'failed_chunks': failed_chunks,
+            'blocks_cleaned': sum(1 for b in blocks if b.get('id') in cleaned),
+            'json_tokens': json_tokens,
+            'compact_tokens': compact_tokens,
+            'tokens_saved': json_tokens - compact_tokens,
+        }
+        logger.info(
+            f"Ingestion: {len(blocks)} blocks in {len(chunks)} chunk(s), "
+            f"~{compact_tokens} tokens (saved ~{json_tokens - compact_tokens} vs indented JSON)"
+        )
+        if failed_chunks:
+            logger.warning(f"Ingestion Agent returned nothing usable for {failed_chunks} chunk(s); kept original blocks there.")
+        return merged
+
+    def _safe_clean_chunk(self, lines):
         try:
-            # Attempt to parse the response as JSON
-            # The agent might return markdown code blocks, so we strip them
-            cleaned_text = response.strip()
-            if cleaned_text.startswith("```json"):
-                cleaned_text = cleaned_text[7:]
-            if cleaned_text.endswith("```"):
-                cleaned_text = cleaned_text[:-3]
-            
-            return json.loads(cleaned_text.strip())
+            return self._clean_chunk(lines)
         except Exception as e:
-            logger.warning(f"Ingestion Agent returned invalid JSON: {e}. Returning original blocks.")
-            return blocks
+            logger.error(f"Ingestion chunk failed: {e}")
+            return {}
@@ -1,118 +1,266 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from loguru import logger
+from ..config import Config
+from ..utils.chunking import chunk_blocks, chunk_label
+from ..utils.retrieval import BM25Index, format_blocks
 from .ingestion import IngestionAgent
 from .analyst import AnalystAgent
 from .risk import RiskAgent
 from .summarizer import SummarizerAgent
 from .verifier import VerifierAgent
+from .scheduler import Stage, StageScheduler
 
-def run_pipeline(evidence, status_callback=None):
+def analyze_chunks(analyst, chunks, update_status, max_workers=None):
     """
-    Run the DocuPilot Multi-Agent Pipeline.
+    Map phase: run `analyst.analyze` over the chunks on a bounded thread pool.
     
-    Flow:
-    1. Ingestion Agent -> Cleans and Structures OCR
-    2. Analyst Agent -> Extracts structured facts
-    3. Risk Agent -> Evaluates facts for risks
-    4. Summarizer Agent -> Creates executive summary
-    5. Verifier Agent -> Checks validity
+    Concurrency is capped by Config.MAX_WORKERS; request pacing is left to the
+    provider rate limiter inside BaseAgent.run. Progress is reported from the
+    calling thread as chunks finish, and results come back in chunk order.
     """
+    total_chunks = len(chunks)
+    if not total_chunks:
+        return []
+    max_workers = max(1, min(max_workers or Config.MAX_WORKERS, total_chunks))
     
-    logger.info("🚀 Starting Multi-Agent Pipeline...")
+    def analyze_one(i, chunk):
+        # Add context header to chunk (block chunks also carry their page/block range)
+        if isinstance(chunk, dict):
+            header = f"[PART {i+1} OF {total_chunks} | {chunk_label(chunk)}]"
+            chunk = chunk['text']
+        else:
+            header = f"[PART {i+1} OF {total_chunks}]"
+        return analyst.analyze(header + "\n" + chunk)
+    
+    results = [None] * total_chunks
+    update_status(f"🔍 Analyst Agent: Processing {total_chunks} parts ({max_workers} in parallel)...")
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(analyze_one, i, chunk): i for i, chunk in enumerate(chunks)}
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.error(f"Failed to analyze chunk {i}: {e}")
+            update_status(f"🔍 Analyst Agent: Processed Part {done}/{total_chunks}...")
+    
+    return [res for res in results if res]
 
-    # helper to update status safely
-    def update_status(msg):
-        if status_callback:
-            status_callback(msg)
+def clean_noisy_blocks(ingestion, blocks, update_status, threshold=None):
+    """
+    Send only the blocks the deterministic cleaner scored as noisy to the
+    Ingestion Agent and merge its output back in document order. Blocks
+    without a noise score (not from create_evidence_store) count as noisy.
+    """
+    threshold = Config.INGESTION_NOISE_THRESHOLD if threshold is None else threshold
+    noisy = [b for b in blocks if b.get('noise', 1.0) >= threshold]
+    if not noisy:
+        logger.info("🧹 Ingestion Agent skipped: deterministic cleaning left no noisy blocks.")
+        update_status("🧹 Ingestion Agent: OCR data already clean, skipping LLM cleanup...")
+        return blocks
+    
+    logger.info(f"🧹 Ingestion Agent working on {len(noisy)}/{len(blocks)} noisy blocks...")
+    update_status(f"🧹 Ingestion Agent: Cleaning {len(noisy)} noisy OCR blocks...")
+    # Blocks go out as compact id|page|text chunks in parallel and are merged back by id
+    cleaned = {b.get('id'): b for b in ingestion.process(noisy)}
+    return [cleaned.get(b.get('id'), b) for b in blocks]
 
-    # 1. Ingestion Phase
-    ingestion = IngestionAgent()
-    logger.info("🧹 Ingestion Agent working...")
-    update_status("🧹 Ingestion Agent: Cleaning OCR data...")
-    # Process blocks (taking a subset if too large, or all)
-    # We'll rely on the agent to handle the json dump
-    cleaned_evidence = ingestion.process(evidence['blocks'])
+ROLE_ICONS = {
+    "Compliance Analyst": "👮",
+    "Financial Reviewer": "💰",
+    "Legal Expert": "⚖️",
+}
+
+# Retrieval queries per reviewer role; other roles query by their own name
+ROLE_QUERIES = {
+    "Compliance Analyst": "compliance regulatory regulation statute law license permit violation audit reporting disclosure sanction",
+    "Financial Reviewer": "payment fee amount price cost penalty interest invoice total tax damages refund deposit",
+    "Legal Expert": "liability indemnify indemnification termination breach warranty governing law jurisdiction dispute arbitration confidentiality",
+}
+
+def assess_risk_roles(risk_agent, analysis_text, roles, update_status, index=None, top_k=None, on_risk=None,
+                      on_role_failed=None):
+    """
+    Run `risk_agent.assess_risk` once per reviewer role, all roles at once.
+    With an evidence `index`, each role also gets its own top-k source blocks.
+    With `on_risk`, responses are streamed and on_risk(role, risk) is called
+    (from the worker threads) for each risk as soon as it is complete.
     
-    # Prepare text for context from CLEANED evidence
-    # Format: [block_id] text
-    full_text = "\n".join([f"[{b.get('id', 'N/A')}] {b.get('text', '')}" for b in cleaned_evidence])
+    Returns {"risks": [...], "roles": {role: status}} with risks in role
+    order. A role that raises or returns no usable register is reported as
+    failed in "roles" and contributes no risks; the other roles still count.
+    on_role_failed(role, error) is called as soon as a role has failed, so
+    risks it already streamed can be withdrawn.
+    """
+    role_status = {}
+    if not roles:
+        return {"risks": [], "roles": role_status}
     
-    # Truncate for context window if needed (keeping reasonable size)
-    # truncated_text = full_text[:10000] # Use chunking instead 
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(roles)) as pool:
+        futures = {}
+        for role in roles:
+            evidence_text = None
+            if index is not None:
+                evidence_text = format_blocks(index.search(ROLE_QUERIES.get(role, role), top_k))
+            kwargs = {'role': role, 'evidence_text': evidence_text}
+            if on_risk is not None:
+                kwargs['on_risk'] = lambda risk, role=role: on_risk(role, risk)
+            futures[pool.submit(risk_agent.assess_risk, analysis_text, **kwargs)] = role
+        for done, future in enumerate(as_completed(futures), start=1):
+            role = futures[future]
+            try:
+                res = future.result()
+            except Exception as e:
+                logger.error(f"Risk role {role} failed: {e}")
+                role_status[role] = {"status": "failed", "error": str(e)}
+            else:
+                if isinstance(res, dict) and isinstance(res.get('risks'), list):
+                    results[role] = res['risks']
+                    role_status[role] = {"status": "ok", "risks": len(res['risks'])}
+                else:
+                    # Includes a stream that broke off: BaseAgent.run returns an error string
+                    logger.warning(f"Risk role {role} returned no usable risk register")
+                    role_status[role] = {"status": "failed", "error": "No usable risk register in response"}
+            if on_role_failed is not None and role not in results:
+                on_role_failed(role, role_status[role]["error"])
+            update_status(f"{ROLE_ICONS.get(role, '🛡️')} {role}: Review complete ({done}/{len(roles)})")
     
-    # Merge Helper removed in favor of LLM Aggregation
+    # Keep the risks and report keys in configured role order
+    all_risks = [risk for role in roles for risk in results.get(role, [])]
+    return {"risks": all_risks, "roles": {role: role_status[role] for role in roles}}
 
-    # 2. Analyst Phase (Chunked)
-    analyst = AnalystAgent()
-    logger.info("🔍 Analyst Agent working (Chunked Mode)...")
-    
-    # Simple chunking by character count (approx 8000 chars ~ 2000 tokens)
-    CHUNK_SIZE = 8000
-    chunks = [full_text[i:i+CHUNK_SIZE] for i in range(0, len(full_text), CHUNK_SIZE)]
+def extract_rule_hints(cleaned):
+    """Deterministic (regex) extraction over the whole cleaned document; no LLM involved."""
+    from ..utils.extraction_rules import extract_invoice_totals, extract_invoice_line_items, extract_contract_dates, extract_contract_value
+    text = format_blocks(cleaned)
+    return {
+        'invoice_totals': extract_invoice_totals(text),
+        'line_items': extract_invoice_line_items(text),
+        'contract_dates': extract_contract_dates(text),
+        'contract_value': extract_contract_value(text),
+    }
+
+def check_rule_financials(rules):
+    """Programmatic consistency check of the rule-extracted invoice figures ({} when there are none)."""
+    from ..utils.financial_validator import validate_invoice_financials
+    totals = rules.get('invoice_totals') or {}
+    if not totals.get('grand_total') and not rules.get('line_items'):
+        return {}
+    return validate_invoice_financials(dict(totals, line_items=rules.get('line_items') or []))
+
+def build_pipeline_stages(evidence, top_k=None, stream=False):
+    """
+    The pipeline as a dependency graph. Each stage names the stage outputs
+    it consumes; the scheduler starts it as soon as they exist, so the
+    deterministic rule stages and the BM25 index build run alongside the
+    LLM stages instead of in a fixed sequence.
     
-    partial_results = []
-    total_chunks = len(chunks)
+        cleaned -> index, chunks, rules
+        chunks -> partials -> analysis
+        rules -> financial_checks
+        analysis + index -> risks
+        analysis + risks -> summary
+        summary + index -> verification
     
-    for i, chunk in enumerate(chunks):
-        update_status(f"🔍 Analyst Agent: Processing Part {i+1}/{total_chunks}...")
-        try:
-            # Add context header to chunk
-            chunk_context = f"[PART {i+1} OF {total_chunks}]\n" + chunk
-            res = analyst.analyze(chunk_context)
-            if res:
-                partial_results.append(res)
-        except Exception as e:
-            logger.error(f"Failed to analyze chunk {i}: {e}")
-            
-    # Aggregate Results using LLM (Map-Reduce)
-    update_status("🔍 Analyst Agent: Aggregating partially extracted data into Master Record...")
-    # Clean partial results to be just the JSONs
-    valid_partials = [p for p in partial_results if isinstance(p, dict)]
-    analysis_result = analyst.aggregate(valid_partials)
-    analysis_text = str(analysis_result)
-    
-    # 3. Risk Phase (Multi-Agent)
+    With `stream`, the risk roles stream their responses and the risks
+    stage reports each risk as a status message and a partial result the
+    moment the model has closed it. A role that then fails is reported as
+    a partial result that retracts its risks.
+    """
+    ingestion = IngestionAgent()
+    analyst = AnalystAgent()
     risk_agent = RiskAgent()
-    logger.info("⚠️ Risk Agents working (Compliance, Financial, Legal)...")
+    summarizer = SummarizerAgent()
+    verifier = VerifierAgent()
+    timeout = Config.PIPELINE_STAGE_TIMEOUT or None
+    retries = Config.PIPELINE_STAGE_RETRIES
     
-    all_risks = []
+    def summarize(analysis, risks):
+        analysis_text = str(analysis)
+        risk_text = str({"risks": risks["risks"]})
+        # Truncate inputs for summarizer to prevent token overflow
+        return summarizer.run(f"Create an executive summary based on the following Analysis and Risk Report:\n\nANALYSIS:\n{analysis_text[:10000]}\n\nRISKS:\n{risk_text[:10000]}")
     
-    # Role 1: Compliance
-    update_status("👮 Compliance Analyst: Checking regulatory... (Step 1/3)")
-    r_comp = risk_agent.assess_risk(analysis_text, role="Compliance Analyst")
-    if isinstance(r_comp, dict) and 'risks' in r_comp: all_risks.extend(r_comp['risks'])
+    def assess_risks(analysis, index, emit, partial):
+        on_risk = on_role_failed = None
+        if stream:
+            def on_risk(role, risk):
+                title = str(risk.get('risk') or risk.get('title') or 'Risk identified')[:80]
+                emit(f"{ROLE_ICONS.get(role, '🛡️')} {role}: {title} (severity {risk.get('severity', '?')})")
+                partial({'role': role, 'risk': risk})
+            def on_role_failed(role, error):
+                partial({'role': role, 'status': 'failed', 'error': error, 'retract': True})
+        return assess_risk_roles(risk_agent, str(analysis), Config.RISK_ROLES, emit,
+                                 index=index, top_k=top_k, on_risk=on_risk, on_role_failed=on_role_failed)
     
-    # Role 2: Financial
-    update_status("💰 Financial Reviewer: Checking fiscal... (Step 2/3)")
-    r_fin = risk_agent.assess_risk(analysis_text, role="Financial Reviewer")
-    if isinstance(r_fin, dict) and 'risks' in r_fin: all_risks.extend(r_fin['risks'])
+    stages = [
+        # 1. Ingestion: only blocks the deterministic cleaner left noisy go to the LLM
+        Stage('cleaned', lambda emit: clean_noisy_blocks(ingestion, evidence['blocks'], emit),
+              emits=True, timeout=timeout, retries=retries),
+        # BM25 index over the CLEANED evidence, shared by the retrieval-based stages
+        Stage('index', lambda cleaned: BM25Index(cleaned), inputs=['cleaned']),
+        # Pack whole evidence blocks into token-budgeted chunks (never splits a [block_id] line)
+        Stage('chunks', lambda cleaned: chunk_blocks(cleaned), inputs=['cleaned']),
+        # Deterministic extraction and validation, off the LLM critical path
+        Stage('rules', extract_rule_hints, inputs=['cleaned'], default={}),
+        Stage('financial_checks', check_rule_financials, inputs=['rules'], default={}),
+        # 2. Analyst map phase, then deterministic aggregation into a Master Record
+        Stage('partials', lambda chunks, emit: analyze_chunks(analyst, chunks, emit),
+              inputs=['chunks'], emits=True, timeout=timeout, retries=retries,
+              status="🔍 Analyst Agent working (Chunked Mode)..."),
+        Stage('analysis', lambda partials: analyst.aggregate([p for p in partials if isinstance(p, dict)]),
+              inputs=['partials'], status="🔍 Analyst Agent: Aggregating partially extracted data into Master Record..."),
+        # 3. Risk roles in parallel, each with its own retrieved evidence
+        Stage('risks', assess_risks,
+              inputs=['analysis', 'index'], emits=True, partials=True, timeout=timeout, retries=retries,
+              status=f"⚠️ Risk Agents working ({', '.join(Config.RISK_ROLES)})..."),
+        # 4. Summarizer
+        Stage('summary', summarize, inputs=['analysis', 'risks'], timeout=timeout, retries=retries,
+              status="📝 Summarizer Agent: Drafting executive report..."),
+        # 5. Claim-level verification: each claim is checked against the blocks it
+        # cites plus its top-k retrieved blocks, wherever they are in the document
+        Stage('verification', lambda summary, index: verifier.verify_claims(summary, index, top_k=top_k),
+              inputs=['summary', 'index'], timeout=timeout, retries=retries,
+              status="✅ Verifier Agent: Auditing citations..."),
+    ]
+    return stages, {'ingestion': ingestion, 'verifier': verifier}
 
-    # Role 3: Legal
-    update_status("⚖️ Legal Expert: Checking contractual... (Step 3/3)")
-    r_legal = risk_agent.assess_risk(analysis_text, role="Legal Expert")
-    if isinstance(r_legal, dict) and 'risks' in r_legal: all_risks.extend(r_legal['risks'])
+def run_pipeline(evidence, status_callback=None, top_k=None, stream=None, partial_callback=None):
+    """
+    Run the DocuPilot Multi-Agent Pipeline.
+    
+    Flow:
+    1. Ingestion Agent -> Cleans and Structures OCR
+    2. Analyst Agent -> Extracts structured facts
+    3. Risk Agent -> Evaluates facts for risks
+    4. Summarizer Agent -> Creates executive summary
+    5. Verifier Agent -> Checks validity
     
-    risk_result = {"risks": all_risks}
-    risk_text = str(risk_result)
+    The stages are declared in build_pipeline_stages and run by
+    StageScheduler, which starts each one as soon as its inputs are ready.
+    `top_k` is the number of evidence blocks each retrieval query returns
+    (default Config.RETRIEVAL_TOP_K).
     
-    # 4. Summarizer Phase
-    summarizer = SummarizerAgent()
-    logger.info("📝 Summarizer Agent working...")
-    update_status("📝 Summarizer Agent: Drafting executive report...")
-    # Truncate inputs for summarizer to prevent token overflow
-    summarizer_input = f"Create an executive summary based on the following Analysis and Risk Report:\n\nANALYSIS:\n{analysis_text[:10000]}\n\nRISKS:\n{str(risk_text)[:10000]}"
-    summary_result = summarizer.run(summarizer_input)
+    With `stream` (default Config.LLM_STREAMING), risks are forwarded
+    through `status_callback` as they arrive and passed to
+    partial_callback('risks', {'role': ..., 'risk': {...}}), both on the
+    calling thread, before the risk stage has finished. Partial results
+    with 'retract' withdraw earlier ones: {'role': ..., 'retract': True}
+    those of a role whose review failed, {'retract': True} all of them
+    (the stage attempt failed; a retry streams its risks again).
+    """
     
-    # 5. Verification Phase
-    verifier = VerifierAgent()
-    logger.info("✅ Verifier Agent working...")
-    update_status("✅ Verifier Agent: Auditing citations...")
-    # Verify the Summary against the Evidence
-    # Use the RAW FULL TEXT as evidence for verification.
-    # This ensures the Verifier checks against the actual document content,
-    # not just the potentially flawed/empty analysis JSON.
-    verifier_evidence = full_text[:15000] # Safe slice for context window
-    verification_report = verifier.verify(summary_result, verifier_evidence)
+    logger.info("🚀 Starting Multi-Agent Pipeline...")
+    
+    stream = Config.LLM_STREAMING if stream is None else stream
+    stages, agents = build_pipeline_stages(evidence, top_k=top_k, stream=stream)
+    scheduler = StageScheduler(stages, status_callback=status_callback, partial_callback=partial_callback)
+    out = scheduler.run()
+    logger.info("⏱️ Stage timings: " + ", ".join(f"{k} {v['seconds']}s" for k, v in scheduler.report.items()))
     
+    verification_report = out['verification']
     # Combine into Report
     # Note: verification_report from Verifier Agent is supposed to be "Corrected Content" according to prompt.
     # So we might want to use that as the final summary if it rewrites it.
@@ -129,10 +277,16 @@ See `Identified Risks` tab for the verified Risk Register.
 """
 
     results = {
-        "analysis": analysis_result,
-        "risks": risk_result,
+        "analysis": out['analysis'],
+        "risks": out['risks'],
         "report": final_report,
         'verification': verification_report,
-        'cleaned_evidence': cleaned_evidence
+        'cleaned_evidence': out['cleaned'],
+        'deterministic': {'rules': out['rules'], 'financial_checks': out['financial_checks']},
+        'metrics': {
+            'ingestion': agents['ingestion'].last_stats,
+            'verification': dict(Counter(c.verdict for c in agents['verifier'].last_claims)),
+            'stages': scheduler.report,
+        }
     }
     return results
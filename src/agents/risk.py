@@ -1,17 +1,22 @@
 
 from pathlib import Path
-from .base import BaseAgent
+from .base import AsyncBaseAgent
+from ..utils.json_repair import JSONRepairError, parse_json
 
-import json
 from loguru import logger
 
-class RiskAgent(BaseAgent):
+class RiskAgent(AsyncBaseAgent):
     def __init__(self):
         super().__init__(name="RiskAgent", role="Compliance Risk Officer")
         prompt_path = Path(__file__).parent / 'prompts' / 'risk.txt'
         self.set_system_prompt(prompt_path.read_text())
 
-    def assess_risk(self, analysis_text, role=None):
+    def assess_risk(self, analysis_text, role=None, evidence_text=None, on_risk=None):
+        """
+        Risk register for the analysis, as parsed JSON ([] when unparseable).
+        With `on_risk`, the response is streamed and each risk object is
+        passed to on_risk(risk) as soon as the model has closed it.
+        """
         if role:
             # specialized role injection
             prompt = f"As a {role}, review this analysis and identify risks strictly within your domain:\n\n{analysis_text}"
@@ -23,16 +28,22 @@ class RiskAgent(BaseAgent):
                 f"No markdown, no conversation. JUST JSON.\n\n"
                 f"Analysis:\n{analysis_text}"
             )
+        if evidence_text:
+            # Retrieved source blocks, so risks can cite evidence_block_ids directly
+            prompt += f"\n\nRelevant source blocks:\n{evidence_text}"
             
-        response = self.run(prompt)
+        if on_risk is None:
+            response = self.run(prompt)
+        else:
+            def on_element(key, value):
+                if key in ('risks', None) and isinstance(value, dict):
+                    on_risk(value)
+            response = self.run(prompt, on_element=on_element)
         try:
-            # Clean potential markdown
-            cleaned = response.strip()
-            if cleaned.startswith("```json"):
-                cleaned = cleaned[7:]
-            if cleaned.endswith("```"):
-                cleaned = cleaned[:-3]
-            return json.loads(cleaned.strip())
-        except Exception as e:
+            data, repairs = parse_json(response)
+        except JSONRepairError as e:
             logger.error(f"Failed to parse Risk JSON: {e}")
             return []
+        if repairs:
+            logger.info(f"Repaired Risk JSON{f' ({role})' if role else ''}: {', '.join(repairs)}")
+        return data
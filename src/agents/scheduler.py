@@ -0,0 +1,193 @@
+"""Dependency-graph scheduler for pipeline stages."""
+
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from loguru import logger
+
+_NO_DEFAULT = object()
+
+class StageError(RuntimeError):
+    """A stage without a fallback value failed; the pipeline cannot continue."""
+    def __init__(self, stage, error):
+        super().__init__(f"Stage '{stage}' failed: {error}")
+        self.stage = stage
+        self.error = error
+
+class Stage:
+    """
+    One node of the pipeline graph.
+
+    `fn` is called with the outputs of `inputs` as keyword arguments (plus
+    `emit`, a thread-safe status reporter, when `emits` is set, and
+    `partial`, a thread-safe reporter of partial results, when `partials`
+    is set) and its return value becomes this stage's output under `name`.
+    A failed stage with a `default` outputs the default and the run continues.
+    Errors are retried up to `retries` times; timeouts are not retried.
+    """
+    def __init__(self, name, fn, inputs=(), timeout=None, retries=0, default=_NO_DEFAULT,
+                 status=None, emits=False, partials=False):
+        self.name = name
+        self.fn = fn
+        self.inputs = tuple(inputs)
+        self.timeout = timeout
+        self.retries = retries
+        self.default = default
+        self.status = status
+        self.emits = emits
+        self.partials = partials
+
+class StageScheduler:
+    """
+    Runs stages on a thread pool, starting each one as soon as all of its
+    inputs are available. Status messages (the stages' own and those they
+    `emit`) are delivered to `status_callback` from the calling thread only,
+    as are partial results (partial_callback(stage name, item)), so callers
+    can act on them while the stage is still running.
+    Messages from an attempt that failed or timed out are dropped once it
+    has; if it had already delivered partial results, the caller gets
+    partial_callback(stage name, {'retract': True}) and should discard them,
+    since a retry reports its own.
+    Per-stage wall time, attempts and outcome end up in `report`.
+    """
+    def __init__(self, stages, status_callback=None, max_workers=None, partial_callback=None):
+        self.stages = {s.name: s for s in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Duplicate stage names")
+        for s in stages:
+            missing = [i for i in s.inputs if i not in self.stages]
+            if missing:
+                raise ValueError(f"Stage '{s.name}' depends on unknown stage(s): {', '.join(missing)}")
+        self._check_acyclic()
+        self.status_callback = status_callback
+        self.partial_callback = partial_callback
+        self.max_workers = max_workers or len(stages)
+        self.report = {}
+        self._messages = queue.Queue()
+        self._stale = set()         # (stage name, attempt) whose messages are dropped
+        self._delivered = set()     # (stage name, attempt) with partials already delivered
+
+    def _check_acyclic(self):
+        state = {}
+        def visit(name, path):
+            if state.get(name) == "done":
+                return
+            if state.get(name) == "visiting":
+                raise ValueError(f"Stage graph has a cycle: {' -> '.join(path + [name])}")
+            state[name] = "visiting"
+            for dep in self.stages[name].inputs:
+                visit(dep, path + [name])
+            state[name] = "done"
+        for name in self.stages:
+            visit(name, [])
+
+    def emit(self, msg, attempt=None):
+        """Queue a status message; safe to call from any stage thread."""
+        self._messages.put((attempt, None, msg))
+
+    def emit_partial(self, stage, item, attempt=None):
+        """Queue a partial result of `stage`; safe to call from any stage thread."""
+        self._messages.put((attempt, stage, item))
+
+    def _flush_messages(self):
+        while True:
+            try:
+                attempt, stage, msg = self._messages.get_nowait()
+            except queue.Empty:
+                return
+            if attempt in self._stale:
+                continue
+            if stage is None:
+                if self.status_callback:
+                    self.status_callback(msg)
+            elif self.partial_callback:
+                self._delivered.add(attempt)
+                self.partial_callback(stage, msg)
+
+    def _retract(self, stage, attempt):
+        """Drop the still-queued messages of a failed attempt and retract its delivered partials."""
+        self._stale.add((stage.name, attempt))
+        if (stage.name, attempt) in self._delivered and self.partial_callback:
+            self.partial_callback(stage.name, {'retract': True})
+
+    def _call(self, stage, outputs, attempt):
+        kwargs = {name: outputs[name] for name in stage.inputs}
+        tag = (stage.name, attempt)
+        if stage.emits:
+            kwargs['emit'] = lambda msg: self.emit(msg, attempt=tag)
+        if stage.partials:
+            kwargs['partial'] = lambda item: self.emit_partial(stage.name, item, attempt=tag)
+        return stage.fn(**kwargs)
+
+    def run(self, initial=None):
+        """Run every stage; returns {stage name: output} (plus `initial` values)."""
+        outputs = dict(initial or {})
+        pending = {name for name in self.stages if name not in outputs}
+        running = {}  # future -> (stage, started, deadline, attempt)
+
+        def start(stage, attempt=1):
+            if stage.status and attempt == 1:
+                self.emit(stage.status)
+            started = time.perf_counter()
+            deadline = started + stage.timeout if stage.timeout else None
+            running[pool.submit(self._call, stage, outputs, attempt)] = (stage, started, deadline, attempt)
+
+        def finish(stage, started, attempt, value=_NO_DEFAULT, error=None, retry=True):
+            elapsed = round(time.perf_counter() - started, 3)
+            if error is None:
+                outputs[stage.name] = value
+                self.report[stage.name] = {'status': 'ok', 'seconds': elapsed, 'attempts': attempt}
+                return
+            self._retract(stage, attempt)
+            if retry and attempt <= stage.retries:
+                logger.warning(f"Stage {stage.name} failed ({error}); retrying ({attempt}/{stage.retries})")
+                start(stage, attempt + 1)
+                return
+            self.report[stage.name] = {'status': 'failed', 'seconds': elapsed, 'attempts': attempt, 'error': str(error)}
+            if stage.default is _NO_DEFAULT:
+                raise StageError(stage.name, error)
+            logger.error(f"Stage {stage.name} failed ({error}); continuing with its default")
+            outputs[stage.name] = stage.default
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            while pending or running:
+                for name in sorted(pending):
+                    stage = self.stages[name]
+                    if all(dep in outputs for dep in stage.inputs):
+                        pending.discard(name)
+                        start(stage)
+                self._flush_messages()
+                if not running:
+                    continue
+
+                now = time.perf_counter()
+                deadlines = [d for _, _, d, _ in running.values() if d is not None]
+                wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+                # Wake up regularly so queued status messages reach the caller promptly
+                wait_for = 0.1 if wait_for is None else min(wait_for, 0.1)
+                done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    stage, started, _, attempt = running.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        finish(stage, started, attempt, error=e)
+                    else:
+                        finish(stage, started, attempt, value=value)
+
+                now = time.perf_counter()
+                for future, (stage, started, deadline, attempt) in list(running.items()):
+                    if deadline is not None and now >= deadline and not future.done():
+                        # The worker thread cannot be interrupted; its result is ignored.
+                        # No retry: a second attempt would run alongside the orphan,
+                        # doubling LLM spend and racing on the same agent state.
+                        running.pop(future)
+                        future.cancel()
+                        finish(stage, started, attempt, error=TimeoutError(f"timed out after {stage.timeout}s"),
+                               retry=False)
+            self._flush_messages()
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return outputs
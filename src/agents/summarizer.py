@@ -1,8 +1,8 @@
 
 from pathlib import Path
-from .base import BaseAgent
+from .base import AsyncBaseAgent
 
-class SummarizerAgent(BaseAgent):
+class SummarizerAgent(AsyncBaseAgent):
     def __init__(self):
         super().__init__(name="SummarizerAgent", role="Executive Summarizer")
         prompt_path = Path(__file__).parent / 'prompts' / 'summarizer.txt'
@@ -1,21 +1,67 @@
 
 from pathlib import Path
-from .base import BaseAgent
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from .base import AsyncBaseAgent
+from ..config import Config
 import json
+import re
 from loguru import logger
 from ..utils.financial_validator import validate_invoice_financials
+from ..utils.retrieval import format_blocks
 
-class VerifierAgent(BaseAgent):
+# Block ids cited in claims, e.g. [p3_b12] or (p3_b12, p4_b1)
+_CITED_ID_RE = re.compile(r'\bp\d+_b\d+\b')
+# Verdict line from the audit prompt: "<n>|supported|..." 
+_VERDICT_RE = re.compile(r'^\s*(\d+)\s*\|\s*(supported|weak|unsupported)\s*\|?(.*)$', re.IGNORECASE)
+_BULLET_RE = re.compile(r'^(\s*(?:[-*+]|\d+[.)])\s+)')
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+(?=[A-Z(\[])')
+
+class Claim:
+    """One checkable statement of a report, with its evidence and verdict."""
+    def __init__(self, text, prefix=""):
+        self.text = text
+        self.prefix = prefix
+        self.cited_ids = _CITED_ID_RE.findall(text)
+        self.evidence = []
+        self.verdict = "unverified"
+        self.rewrite = None
+
+def split_claims(report_text):
+    """
+    Split a markdown report into lines of segments. Headings, rules, table
+    rows and short fragments stay plain strings; bullets and prose are split
+    into sentence Claims (a bullet's marker is kept on its first claim).
+    """
+    lines = []
+    for line in report_text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped.startswith(('#', '|', '---', '```')) or len(stripped.split()) < 3:
+            lines.append([line])
+            continue
+        bullet = _BULLET_RE.match(line)
+        prefix = bullet.group(1) if bullet else ""
+        body = line[len(prefix):] if bullet else stripped
+        sentences = [s for s in _SENTENCE_SPLIT_RE.split(body) if s.strip()]
+        lines.append([Claim(sent, prefix if i == 0 else "") for i, sent in enumerate(sentences)])
+    return lines
+
+class VerifierAgent(AsyncBaseAgent):
     def __init__(self):
         super().__init__(name="VerifierAgent", role="Quality Assurance Auditor")
         prompt_path = Path(__file__).parent / 'prompts' / 'verifier.txt'
         self.set_system_prompt(prompt_path.read_text())
+        self.last_claims = []
 
     def verify(self, report_text, evidence_text):
         # 1. Standard LLM Semantic Audit
         llm_audit = self.run(f"Audit the following report against the provided evidence:\n\nEVIDENCE:\n{evidence_text}\n\nREPORT TO AUDIT:\n{report_text}")
         
         # 2. Programmatic Financial Validation (if applicable)
+        return llm_audit + self.financial_note(report_text)
+
+    def financial_note(self, report_text):
+        """Programmatic financial consistency check of a JSON report; '' when not applicable."""
         validation_note = ""
         try:
             # Try to extract JSON from report_text to check for financials
@@ -53,4 +99,82 @@ class VerifierAgent(BaseAgent):
         except Exception as e:
             logger.warning(f"Programmatic verification skipped due to error: {e}")
 
-        return llm_audit + validation_note
+        return validation_note
+
+    def verify_claims(self, report_text, index, top_k=None, batch_size=None, max_workers=None):
+        """
+        Claim-level audit: split the report into claims, give each claim its
+        own evidence (the blocks it cites plus its top-k BM25 hits from
+        `index`) and audit claims in small batches in parallel.
+        
+        Supported claims are kept, weak ones replaced by the conservative
+        rewrite, unsupported ones removed. Claims whose batch fails are kept
+        as written and counted as unverified. Per-claim verdicts are left in
+        `last_claims`.
+        """
+        batch_size = batch_size or Config.VERIFIER_BATCH_CLAIMS
+        if report_text.strip().startswith(('{', '[', '```')):
+            # Structured (JSON) reports are audited whole, against retrieved evidence
+            self.last_claims = []
+            return self.verify(report_text, format_blocks(index.search(report_text, (top_k or Config.RETRIEVAL_TOP_K) * 4)))
+        lines = split_claims(report_text)
+        claims = [seg for line in lines for seg in line if isinstance(seg, Claim)]
+        self.last_claims = claims
+        if not claims:
+            return report_text + self.financial_note(report_text)
+        
+        by_id = {b.get('id'): b for b in index.blocks}
+        for claim in claims:
+            cited = [by_id[i] for i in claim.cited_ids if i in by_id]
+            hits = index.search(claim.text, top_k)
+            claim.evidence = list({b.get('id'): b for b in cited + hits}.values())
+        
+        batches = [claims[i:i + batch_size] for i in range(0, len(claims), batch_size)]
+        workers = max(1, min(max_workers or Config.MAX_WORKERS, len(batches)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(self._audit_batch, batches))
+        
+        out_lines = []
+        for line in lines:
+            parts = []
+            for seg in line:
+                if not isinstance(seg, Claim):
+                    parts.append(seg)
+                elif seg.verdict != "unsupported":
+                    parts.append(seg.prefix + (seg.rewrite or seg.text))
+            text = " ".join(p for p in parts if p)
+            # Drop lines whose only content was removed claims (e.g. a bullet)
+            if text.strip() or not any(isinstance(seg, Claim) for seg in line):
+                out_lines.append(text)
+        
+        counts = Counter(c.verdict for c in claims)
+        logger.info(f"✅ Verified {len(claims)} claims in {len(batches)} batch(es): {dict(counts)}")
+        return "\n".join(out_lines) + self.financial_note(report_text)
+
+    def _audit_batch(self, claims):
+        blocks = "\n\n".join(
+            f"CLAIM {n}: {c.text}\nEVIDENCE {n}:\n{format_blocks(c.evidence) or '(no matching evidence)'}"
+            for n, c in enumerate(claims, start=1)
+        )
+        prompt = (
+            "Audit each numbered claim strictly against its own evidence blocks.\n"
+            "Answer with one line per claim, in this exact format:\n"
+            "<claim number>|supported|\n"
+            "<claim number>|weak|<conservative rewrite citing block_id(s)>\n"
+            "<claim number>|unsupported|\n"
+            "No other text.\n\n" + blocks
+        )
+        try:
+            response = self.run(prompt)
+        except Exception as e:
+            logger.error(f"Claim batch verification failed: {e}")
+            return
+        for line in response.splitlines():
+            match = _VERDICT_RE.match(line)
+            if not match:
+                continue
+            n = int(match.group(1))
+            if 1 <= n <= len(claims):
+                claims[n - 1].verdict = match.group(2).lower()
+                if claims[n - 1].verdict == "weak" and match.group(3).strip():
+                    claims[n - 1].rewrite = match.group(3).strip()
@@ -9,12 +9,14 @@ import pandas as pd
 import requests
 from io import BytesIO
 import sys
+import threading
 from pathlib import Path
 
 # Ensure src module is accessible
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.ocr import extract_document
+from src.ocr import extract_document, warm_up_ocr
+from src.config import Config
 from src.normalize import create_evidence_store
 from src.agents.orchestrator import run_pipeline
 
@@ -26,6 +28,36 @@ def get_safe_text(obj, key='description'):
         return obj.get(key, 'N/A')
     return str(obj)
 
+def live_risk_renderer(placeholder):
+    """
+    partial_callback for run_pipeline: shows streamed risks in `placeholder`
+    as each one closes, dropping those a retraction withdraws.
+    """
+    streamed = []  # (role, risk) in arrival order
+
+    def on_partial(stage, item):
+        if stage != 'risks' or not isinstance(item, dict):
+            return
+        if item.get('retract'):
+            # Role-scoped retraction, or the whole attempt when no role is given
+            role = item.get('role')
+            streamed[:] = [(r, risk) for r, risk in streamed if role is not None and r != role]
+        elif isinstance(item.get('risk'), dict):
+            streamed.append((item.get('role'), item['risk']))
+        else:
+            return
+        if not streamed:
+            placeholder.empty()
+            return
+        rows = [{
+            "role": role,
+            "risk": risk.get('risk') or risk.get('title') or 'Risk identified',
+            "severity": risk.get('severity'),
+        } for role, risk in streamed]
+        placeholder.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+    return on_partial
+
 def parse_agent_json(json_str):
     """Robustly parses JSON from LLM output, handling markdown fences and preambles."""
     if not json_str:
@@ -71,6 +103,16 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+@st.cache_resource(show_spinner=False)
+def start_ocr_warmup():
+    """Preload OCR engines once per server process, off the UI thread."""
+    thread = threading.Thread(target=warm_up_ocr, name="ocr-warmup", daemon=True)
+    thread.start()
+    return thread
+
+if Config.OCR_WARMUP:
+    start_ocr_warmup()
+
 # Custom CSS for "Premium" feel
 st.markdown("""
 <style>
@@ -307,7 +349,12 @@ if final_file_payload is not None:
             progress_bar.progress(70)
             # We could pass 'jurisdiction' to the agents here if we updated the orchestrator.
             # For now, it serves as UI context.
-            results = run_pipeline(evidence, status_callback=lambda msg: status_text.text(msg))
+            # Risks are streamed and listed as each one closes, long before the report is ready
+            live_risks = st.empty()
+            results = run_pipeline(evidence, status_callback=lambda msg: status_text.text(msg),
+                                   stream=True, partial_callback=live_risk_renderer(live_risks))
+            # The verified register is in the Identified Risks tab
+            live_risks.empty()
             
             progress_bar.progress(100)
             status_text.text("✅ Analysis Complete.")
@@ -17,11 +17,53 @@ class Config:
     # PaddleOCR Configuration
     PADDLE_OCR_LANG = os.getenv('PADDLE_OCR_LANG', 'en')
     PADDLE_OCR_USE_GPU = os.getenv('PADDLE_OCR_USE_GPU', 'false').lower() == 'true'
+    # Pages whose native text layer has fewer characters than this are OCR'd
+    OCR_MIN_PAGE_CHARS = int(os.getenv('OCR_MIN_PAGE_CHARS', '50'))
+    # Rendered pages buffered ahead of recognition in streaming OCR
+    OCR_PREFETCH_PAGES = int(os.getenv('OCR_PREFETCH_PAGES', '2'))
+    # Batched OCR: pages per recognition batch (1 = per-page), bitmap memory cap, rec mini-batch
+    PADDLE_OCR_BATCH_PAGES = int(os.getenv('PADDLE_OCR_BATCH_PAGES', '1'))
+    PADDLE_OCR_BATCH_MAX_MB = int(os.getenv('PADDLE_OCR_BATCH_MAX_MB', '512'))
+    PADDLE_OCR_REC_BATCH = int(os.getenv('PADDLE_OCR_REC_BATCH', '6'))
+    # Shared engine pool: engines per (lang, gpu, angle_cls) key, and preload at app start
+    PADDLE_OCR_POOL_SIZE = int(os.getenv('PADDLE_OCR_POOL_SIZE', '1'))
+    # Seconds a caller waits for a busy engine before giving up
+    PADDLE_OCR_ACQUIRE_TIMEOUT = float(os.getenv('PADDLE_OCR_ACQUIRE_TIMEOUT', '300'))
+    OCR_WARMUP = os.getenv('OCR_WARMUP', 'false').lower() == 'true'
+    # Adaptive render resolution: probe DPI, clamp range, target text line height in pixels
+    OCR_ADAPTIVE_DPI = os.getenv('OCR_ADAPTIVE_DPI', 'false').lower() == 'true'
+    OCR_PROBE_DPI = int(os.getenv('OCR_PROBE_DPI', '50'))
+    OCR_MIN_DPI = int(os.getenv('OCR_MIN_DPI', '100'))
+    OCR_MAX_DPI = int(os.getenv('OCR_MAX_DPI', '300'))
+    OCR_TARGET_LINE_PX = int(os.getenv('OCR_TARGET_LINE_PX', '32'))
+    OCR_GRAYSCALE = os.getenv('OCR_GRAYSCALE', 'false').lower() == 'true'
+    
+    # Per-user cache root (XDG_CACHE_HOME or ~/.cache), not the working directory
+    CACHE_ROOT = os.getenv('DOCUPILOT_CACHE_DIR', os.path.join(
+        os.getenv('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'docupilot'))
+    
+    # Extraction cache (content-addressed by PDF hash + extractor settings, LRU by size; opt-in)
+    EXTRACTION_CACHE_ENABLED = os.getenv('EXTRACTION_CACHE_ENABLED', 'false').lower() == 'true'
+    EXTRACTION_CACHE_DIR = os.getenv('EXTRACTION_CACHE_DIR', os.path.join(CACHE_ROOT, 'extraction'))
+    EXTRACTION_CACHE_MAX_MB = int(os.getenv('EXTRACTION_CACHE_MAX_MB', '512'))
+    
+    # LLM response cache (SQLite, keyed by model + prompts + sampling params; opt-in)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'false').lower() == 'true'
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', os.path.join(CACHE_ROOT, 'llm.sqlite'))
+    LLM_CACHE_MAX_MB = int(os.getenv('LLM_CACHE_MAX_MB', '256'))
+    LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '168'))
     
     # Cloud OCR Configuration (Baidu)
     CLOUD_OCR_ENABLED = os.getenv('CLOUD_OCR_ENABLED', 'false').lower() == 'true'
     CLOUD_OCR_URL = os.getenv('CLOUD_OCR_URL', "https://g49fgd0070pda7k8.aistudio-app.com/layout-parsing")
     CLOUD_OCR_TOKEN = os.getenv('CLOUD_OCR_TOKEN', '')
+    # Split uploads into page-range chunks (0 = one request), sent concurrently with retry
+    CLOUD_OCR_CHUNK_PAGES = int(os.getenv('CLOUD_OCR_CHUNK_PAGES', '20'))
+    CLOUD_OCR_MAX_WORKERS = int(os.getenv('CLOUD_OCR_MAX_WORKERS', '4'))
+    CLOUD_OCR_MAX_RETRIES = int(os.getenv('CLOUD_OCR_MAX_RETRIES', '3'))
+    CLOUD_OCR_BACKOFF_SECONDS = float(os.getenv('CLOUD_OCR_BACKOFF_SECONDS', '1.0'))
+    # Raw bytes read per step when streaming the base64 request body
+    CLOUD_OCR_STREAM_CHUNK = int(os.getenv('CLOUD_OCR_STREAM_CHUNK', str(256 * 1024)))
     
     # CAMEL AI Configuration
     CAMEL_MODEL_TYPE = os.getenv('CAMEL_MODEL_TYPE', 'ernie')
@@ -30,6 +72,18 @@ class Config:
     # Processing Configuration
     OUTPUT_DIR = os.getenv('OUTPUT_DIR', 'output')
     MAX_WORKERS = int(os.getenv('MAX_WORKERS', '4'))
+    # Pipeline stage scheduler: per-stage timeout for LLM stages (0 = none) and retry count (errors only; timeouts are final)
+    PIPELINE_STAGE_TIMEOUT = float(os.getenv('PIPELINE_STAGE_TIMEOUT', '0'))
+    PIPELINE_STAGE_RETRIES = int(os.getenv('PIPELINE_STAGE_RETRIES', '0'))
+    # Requests per minute allowed to the ERNIE endpoint across all workers (0 = unlimited)
+    ERNIE_RPM = int(os.getenv('ERNIE_RPM', '0'))
+    # LLM HTTP clients (ChatLLM, AsyncChatLLM): OpenAI-style chat endpoint, pooled connections, in-flight cap, timeouts.
+    # With ERNIE_BASE_URL set, the pipeline agents use it (on one shared event loop) instead of the erniebot SDK
+    ERNIE_BASE_URL = os.getenv('ERNIE_BASE_URL', '')
+    LLM_MAX_CONNECTIONS = int(os.getenv('LLM_MAX_CONNECTIONS', '10'))
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+    LLM_KEEPALIVE_SECONDS = float(os.getenv('LLM_KEEPALIVE_SECONDS', '60'))
+    LLM_TIMEOUT_SECONDS = float(os.getenv('LLM_TIMEOUT_SECONDS', '120'))
     
     # Document Analysis Configuration
     RISK_CATEGORIES = [
@@ -40,6 +94,34 @@ class Config:
         'reputational'
     ]
     
+    # Reviewer roles run (in parallel) by the risk phase; e.g. append
+    # "Operations Manager,Reputation Analyst" to cover every RISK_CATEGORIES entry
+    RISK_ROLES = [
+        role.strip() for role in
+        os.getenv('RISK_ROLES', 'Compliance Analyst,Financial Reviewer,Legal Expert').split(',')
+        if role.strip()
+    ]
+    
+    # Ingestion: estimated-token budget per compact id|page|text chunk
+    INGESTION_CHUNK_TOKENS = int(os.getenv('INGESTION_CHUNK_TOKENS', '3000'))
+    # Only blocks whose normalize.noise_score is at least this go to the Ingestion LLM
+    INGESTION_NOISE_THRESHOLD = float(os.getenv('INGESTION_NOISE_THRESHOLD', '0.15'))
+    # Analyst map phase: estimated-token budget per chunk and blocks repeated between chunks
+    ANALYST_CHUNK_TOKENS = int(os.getenv('ANALYST_CHUNK_TOKENS', '3000'))
+    ANALYST_CHUNK_OVERLAP_BLOCKS = int(os.getenv('ANALYST_CHUNK_OVERLAP_BLOCKS', '0'))
+    
+    # Stream LLM responses in the pipeline's risk phase, reporting each risk as soon as it is complete
+    LLM_STREAMING = os.getenv('LLM_STREAMING', 'false').lower() == 'true'
+    
+    # docupilot normalize_document: pages per LLM window and pages shared by neighbouring windows
+    NORMALIZE_WINDOW_PAGES = int(os.getenv('NORMALIZE_WINDOW_PAGES', '4'))
+    NORMALIZE_WINDOW_OVERLAP = int(os.getenv('NORMALIZE_WINDOW_OVERLAP', '1'))
+    
+    # Evidence blocks retrieved (BM25) per agent query; overridden by main.py --top_k
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '8'))
+    # Claims audited per Verifier call (batches run in parallel)
+    VERIFIER_BATCH_CLAIMS = int(os.getenv('VERIFIER_BATCH_CLAIMS', '4'))
+    
     CONFIDENCE_THRESHOLD = float(os.getenv('CONFIDENCE_THRESHOLD', '0.7'))
     
     # Logging Configuration
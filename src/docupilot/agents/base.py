@@ -1,6 +1,7 @@
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
+from .scanner import DocumentView
 
 @dataclass
 class RiskFinding:
@@ -14,6 +15,12 @@ class RiskFinding:
 class RiskAgent:
     name: str = "base"
     category: str = "general"
+    # Phrases this agent looks for; scanned for all agents at once via DocumentView
+    triggers: Tuple[str, ...] = ()
 
-    def analyze(self, normalized_doc: Dict[str, Any]) -> List[RiskFinding]:
+    def document_view(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> DocumentView:
+        """The shared view if one was passed in, else a private one for this agent's triggers."""
+        return view if view is not None else DocumentView(normalized_doc, self.triggers)
+
+    def analyze(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> List[RiskFinding]:
         raise NotImplementedError
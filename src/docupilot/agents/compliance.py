@@ -1,26 +1,28 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import RiskAgent, RiskFinding
+from .scanner import DocumentView
 
 class ComplianceRiskAgent(RiskAgent):
     name = "compliance-agent"
     category = "compliance"
+    triggers = ("gdpr", "ccpa", "audit")
 
-    def analyze(self, normalized_doc: Dict[str, Any]) -> List[RiskFinding]:
+    def analyze(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> List[RiskFinding]:
         findings: List[RiskFinding] = []
-        blob = " ".join([s.get("text", "") for s in normalized_doc.get("sections", [])]).lower()
+        view = self.document_view(normalized_doc, view)
 
-        if "gdpr" in blob or "ccpa" in blob:
+        if view.contains("gdpr", "ccpa"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Privacy regulation triggers present",
                 severity=55,
                 rationale="Document references privacy laws; ensure required notices, DPA terms, and subprocessors are covered.",
-                evidence=[],
+                evidence=view.evidence("gdpr", "ccpa"),
                 recommendation="Validate DPA obligations, breach notification timelines, and data transfer mechanisms."
             ))
 
-        if "audit" not in blob:
+        if not view.contains("audit"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Audit rights not explicit",
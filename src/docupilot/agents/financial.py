@@ -1,26 +1,28 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import RiskAgent, RiskFinding
+from .scanner import DocumentView
 
 class FinancialRiskAgent(RiskAgent):
     name = "financial-agent"
     category = "financial"
+    triggers = ("late fee", "interest", "invoice", "payment")
 
-    def analyze(self, normalized_doc: Dict[str, Any]) -> List[RiskFinding]:
+    def analyze(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> List[RiskFinding]:
         findings: List[RiskFinding] = []
-        blob = " ".join([s.get("text", "") for s in normalized_doc.get("sections", [])]).lower()
+        view = self.document_view(normalized_doc, view)
 
-        if "late fee" in blob or "interest" in blob:
+        if view.contains("late fee", "interest"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Late fee / interest terms present",
                 severity=35,
                 rationale="Payment enforcement terms may create cost exposure.",
-                evidence=[],
+                evidence=view.evidence("late fee", "interest"),
                 recommendation="Confirm acceptable rates, grace periods, and dispute windows."
             ))
 
-        if "invoice" not in blob and "payment" not in blob:
+        if not view.contains("invoice", "payment"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Payment terms unclear",
@@ -1,18 +1,20 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import RiskAgent, RiskFinding
+from .scanner import DocumentView
 
 class LegalRiskAgent(RiskAgent):
     name = "legal-agent"
     category = "legal"
+    triggers = ("limitation of liability", "indemn")
 
-    def analyze(self, normalized_doc: Dict[str, Any]) -> List[RiskFinding]:
+    def analyze(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> List[RiskFinding]:
         findings: List[RiskFinding] = []
 
         # Heuristic examples (replace/extend with LLM-driven extraction if desired)
-        text_blob = " ".join([s.get("text", "") for s in normalized_doc.get("sections", [])]).lower()
+        view = self.document_view(normalized_doc, view)
 
-        if "limitation of liability" not in text_blob:
+        if not view.contains("limitation of liability"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Missing limitation of liability",
@@ -22,7 +24,7 @@ class LegalRiskAgent(RiskAgent):
                 recommendation="Add or confirm a limitation of liability clause aligned to your risk posture."
             ))
 
-        if "indemn" not in text_blob:
+        if not view.contains("indemn"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Indemnification unclear or missing",
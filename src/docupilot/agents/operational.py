@@ -1,16 +1,18 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import RiskAgent, RiskFinding
+from .scanner import DocumentView
 
 class OperationalRiskAgent(RiskAgent):
     name = "operational-agent"
     category = "operational"
+    triggers = ("sla", "service level", "termination", "transition")
 
-    def analyze(self, normalized_doc: Dict[str, Any]) -> List[RiskFinding]:
+    def analyze(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> List[RiskFinding]:
         findings: List[RiskFinding] = []
-        blob = " ".join([s.get("text", "") for s in normalized_doc.get("sections", [])]).lower()
+        view = self.document_view(normalized_doc, view)
 
-        if "sla" not in blob and "service level" not in blob:
+        if not view.contains("sla", "service level"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Service levels not defined",
@@ -20,13 +22,13 @@ class OperationalRiskAgent(RiskAgent):
                 recommendation="Define uptime targets, incident response times, and remedies."
             ))
 
-        if "termination" in blob and "transition" not in blob:
+        if view.contains("termination") and not view.contains("transition"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Termination without transition support",
                 severity=45,
                 rationale="Termination language exists but transition assistance is not obvious.",
-                evidence=[],
+                evidence=view.evidence("termination"),
                 recommendation="Add exit support terms: data return, run-off, and knowledge transfer."
             ))
 
@@ -1,26 +1,28 @@
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from .base import RiskAgent, RiskFinding
+from .scanner import DocumentView
 
 class ReputationalRiskAgent(RiskAgent):
     name = "reputational-agent"
     category = "reputational"
+    triggers = ("publicity", "press release", "confidential")
 
-    def analyze(self, normalized_doc: Dict[str, Any]) -> List[RiskFinding]:
+    def analyze(self, normalized_doc: Dict[str, Any], view: Optional[DocumentView] = None) -> List[RiskFinding]:
         findings: List[RiskFinding] = []
-        blob = " ".join([s.get("text", "") for s in normalized_doc.get("sections", [])]).lower()
+        view = self.document_view(normalized_doc, view)
 
-        if "publicity" in blob or "press release" in blob:
+        if view.contains("publicity", "press release"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Publicity / press terms present",
                 severity=35,
                 rationale="Public communications may be permitted; brand exposure risk depends on approval controls.",
-                evidence=[],
+                evidence=view.evidence("publicity", "press release"),
                 recommendation="Require prior written approval for name/logo use and press releases."
             ))
 
-        if "confidential" not in blob:
+        if not view.contains("confidential"):
             findings.append(RiskFinding(
                 category=self.category,
                 title="Confidentiality language not detected",
@@ -0,0 +1,127 @@
+from __future__ import annotations
+from bisect import bisect_right
+from collections import deque
+from typing import Dict, Any, Iterable, Iterator, List, Tuple
+
+def fold_case(text: str) -> str:
+    """
+    Lower-case `text` without changing its length, so offsets found in the
+    result index the original text. A character whose full lower-case form
+    is longer ('İ' -> 'i' + combining dot) maps to its first character,
+    as in the simple case mapping `re.IGNORECASE` uses.
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch.lower()[0] for ch in text)
+
+class PhraseMatcher:
+    """
+    Aho-Corasick automaton: finds every occurrence of every phrase in one
+    left-to-right pass over the text, however many phrases there are.
+    Matching is on raw substrings (like `phrase in text`), so callers
+    fold both sides (fold_case) for case-insensitive search.
+    """
+    def __init__(self, phrases: Iterable[str]):
+        self.phrases: List[str] = list(dict.fromkeys(p for p in phrases if p))
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+        for idx, phrase in enumerate(self.phrases):
+            node = 0
+            for ch in phrase:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append(idx)
+
+        # Breadth-first failure links; outputs inherit their fallback's outputs
+        pending = deque(self._goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for ch, child in self._goto[node].items():
+                pending.append(child)
+                fallback = self._fail[node]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """Yield (start offset, phrase) for every match, in order of match end."""
+        goto, fail, out, phrases = self._goto, self._fail, self._out, self.phrases
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for idx in out[node]:
+                phrase = phrases[idx]
+                yield i - len(phrase) + 1, phrase
+
+class DocumentView:
+    """
+    Shared, precomputed view of a normalized document for the risk agents.
+
+    Section texts are case-folded (fold_case) and joined once; one matcher pass finds
+    every trigger phrase of every agent. Each hit records its section
+    number, heading and offset inside the section, plus a short quote, so
+    findings can cite evidence without re-scanning.
+    """
+    QUOTE_CONTEXT = 60
+
+    def __init__(self, normalized_doc: Dict[str, Any], phrases: Iterable[str]):
+        self.sections = normalized_doc.get("sections", []) or []
+        texts = [str(s.get("text", "") or "") for s in self.sections]
+        self._starts: List[int] = []
+        offset = 0
+        for t in texts:
+            self._starts.append(offset)
+            offset += len(t) + 1
+        # Newline separator: no trigger phrase can match across two sections
+        self._raw = "\n".join(texts)
+        self.blob = fold_case(self._raw)
+        # phrase -> [(absolute offset, hit)]
+        self._hits: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+        self.scan(phrases)
+
+    def scan(self, phrases: Iterable[str]) -> None:
+        """Add hits for phrases not scanned yet (one pass for all of them)."""
+        new = [fold_case(p) for p in phrases if p and fold_case(p) not in self._hits]
+        if not new:
+            return
+        for p in new:
+            self._hits[p] = []
+        for start, phrase in PhraseMatcher(new).iter_matches(self.blob):
+            self._hits[phrase].append((start, self._hit(start, phrase)))
+
+    def _hit(self, start: int, phrase: str) -> Dict[str, Any]:
+        i = bisect_right(self._starts, start) - 1
+        section = self.sections[i]
+        sec_start = self._starts[i]
+        sec_end = sec_start + len(str(section.get("text", "") or ""))
+        lo = max(sec_start, start - self.QUOTE_CONTEXT)
+        hi = min(sec_end, start + len(phrase) + self.QUOTE_CONTEXT)
+        return {
+            "section": section.get("number"),
+            "heading": section.get("heading"),
+            "offset": start - sec_start,
+            "match": phrase,
+            "quote": self._raw[lo:hi].strip(),
+        }
+
+    def contains(self, *phrases: str) -> bool:
+        """True if any of the phrases occurs anywhere in the document."""
+        self.scan(phrases)
+        return any(self._hits[fold_case(p)] for p in phrases)
+
+    def evidence(self, *phrases: str, limit: int = 3) -> List[Dict[str, Any]]:
+        """Up to `limit` hits for the phrases, in document order."""
+        self.scan(phrases)
+        found = sorted((pos, i, hit) for i, p in enumerate(phrases) for pos, hit in self._hits[fold_case(p)])
+        return [dict(hit) for _, _, hit in found[:limit]]
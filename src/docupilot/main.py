@@ -4,6 +4,9 @@ from typing import Dict, Any
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
+from loguru import logger
+
+from src.config import Config
 from .config import settings
 from .models.ocr_paddle import PaddleOCRExtractor
 from .models.llm_adapter import ChatLLM
@@ -23,7 +26,10 @@ def run(pdf_path: str, out_path: str) -> None:
         base_url=settings.ernie_base_url,
         model=settings.ernie_model,
     )
-    normalized = normalize_document(llm, pages_payload)
+    def on_element(key, value):
+        if key == "sections" and isinstance(value, dict):
+            logger.info(f"Normalized section {value.get('number') or ''} {value.get('heading') or ''}".rstrip())
+    normalized = normalize_document(llm, pages_payload, on_element=on_element if Config.LLM_STREAMING else None)
 
     # 3) Risk analysis via agents
     orchestrator = CAMELStyleOrchestrator()
@@ -1,7 +1,11 @@
 from __future__ import annotations
-from typing import Dict, Any, List
-import json
+from typing import Callable, Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import os
+from loguru import logger
+
+from src.config import Config
+from src.utils.json_repair import JSONRepairError, parse_json
 from .llm_adapter import ChatLLM
 
 NORMALIZE_SYSTEM = """You are a document normalization engine.
@@ -9,7 +13,25 @@ You convert OCR text into clean structured JSON.
 Preserve clause numbering, headings, and defined terms when present.
 Return ONLY valid JSON. No markdown. No commentary."""
 
-def normalize_document(llm: ChatLLM, pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+def normalize_document(llm: ChatLLM, pages: List[Dict[str, Any]], window_pages: Optional[int] = None,
+                       overlap: Optional[int] = None, max_workers: Optional[int] = None,
+                       on_element: Optional[Callable[[Optional[str], Any], None]] = None) -> Dict[str, Any]:
+    """
+    Normalize OCR pages into the structured document JSON.
+
+    Pages are split into windows of `window_pages` (default
+    Config.NORMALIZE_WINDOW_PAGES) that share `overlap` pages with their
+    neighbour, the windows are normalized in parallel, and the results are
+    merged deterministically by merge_normalized. A window that fails is
+    recorded in raw_extraction_notes and the rest of the document still
+    counts; only when every window fails is the error raised.
+
+    With `on_element`, each window's response is streamed and every
+    completed element of its arrays (e.g. ("sections", {...})) is passed to
+    on_element(key, value) from the worker threads as soon as it closes.
+    These are per-window results: overlapping pages repeat, and a section
+    spanning windows arrives in fragments that only the merge joins.
+    """
     if os.getenv("MOCK_OCR_ENV"):
         # Match the keys requested in the prompt
         return {
@@ -30,9 +52,55 @@ def normalize_document(llm: ChatLLM, pages: List[Dict[str, Any]]) -> Dict[str, A
             "obligations": [],
             "raw_extraction_notes": ["Mock extraction"]
         }
-    ocr_text = "\n\n".join([f"--- PAGE {p['page_index']} ---\n{p['text']}" for p in pages])
+    window_pages = max(1, window_pages or Config.NORMALIZE_WINDOW_PAGES)
+    overlap = Config.NORMALIZE_WINDOW_OVERLAP if overlap is None else overlap
+    windows = page_windows(pages, window_pages, overlap)
+    if not windows:
+        return merge_normalized([])
+
+    # Map: every window is normalized independently, so latency is bounded by
+    # the slowest window instead of growing with the whole document
+    results: List[Optional[Dict[str, Any]]] = [None] * len(windows)
+    failed: Dict[int, Exception] = {}
+    max_workers = max(1, min(max_workers or Config.MAX_WORKERS, len(windows)))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(_normalize_window, llm, w, len(pages), on_element): i for i, w in enumerate(windows)}
+        for future in as_completed(futures):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                logger.error(f"Normalization of {_window_label(windows[i])} failed: {e}")
+                failed[i] = e
+    if len(failed) == len(windows):
+        raise failed[0]
+
+    # Reduce: deterministic merge in page order
+    merged = merge_normalized([r for r in results if isinstance(r, dict)])
+    merged["raw_extraction_notes"].extend(
+        f"{_window_label(windows[i])} could not be normalized: {e}" for i, e in sorted(failed.items()))
+    return merged
+
+def page_windows(pages: List[Dict[str, Any]], window_pages: int, overlap: int = 0) -> List[List[Dict[str, Any]]]:
+    """Split pages into windows of `window_pages`, each repeating the last `overlap` pages of the previous one."""
+    overlap = max(0, min(overlap, window_pages - 1))
+    step = window_pages - overlap
+    windows = []
+    for start in range(0, len(pages), step):
+        windows.append(pages[start:start + window_pages])
+        if start + window_pages >= len(pages):
+            break
+    return windows
 
-    user = f"""Normalize this output output into JSON with these keys:
+def _window_label(window: List[Dict[str, Any]]) -> str:
+    first, last = window[0].get("page_index"), window[-1].get("page_index")
+    return f"page {first}" if first == last else f"pages {first}-{last}"
+
+def _normalize_window(llm: ChatLLM, window: List[Dict[str, Any]], total_pages: int,
+                      on_element: Optional[Callable[[Optional[str], Any], None]] = None) -> Dict[str, Any]:
+    ocr_text = "\n\n".join([f"--- PAGE {p['page_index']} ---\n{p['text']}" for p in window])
+
+    user = f"""Normalize this OCR output into JSON with these keys:
 - document_type (string)
 - parties (array of {{"name": string, "role": string}})
 - effective_date (string|null)
@@ -42,22 +110,26 @@ def normalize_document(llm: ChatLLM, pages: List[Dict[str, Any]]) -> Dict[str, A
 - obligations (array of {{"party": string, "obligation": string, "section_ref": string|null}})
 - raw_extraction_notes (array of string) for OCR uncertainties
 
+This is {_window_label(window)} of a {total_pages}-page document. Extract only what appears
+on these pages; sections may begin or end outside them.
+
 OCR:
 {ocr_text}
 """
-    content = llm.chat(
-        messages=[
-            {"role": "system", "content": NORMALIZE_SYSTEM},
-            {"role": "user", "content": user},
-        ],
-        temperature=0.1,
-        max_tokens=4096,
-    )
+    messages = [
+        {"role": "system", "content": NORMALIZE_SYSTEM},
+        {"role": "user", "content": user},
+    ]
+    if on_element is None:
+        content = llm.chat(messages=messages, temperature=0.1, max_tokens=4096)
+    else:
+        content = llm.chat(messages=messages, temperature=0.1, max_tokens=4096, on_element=on_element)
 
     try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        # Best-effort repair: ask model to fix JSON
+        return _parse_window_json(content, window)
+    except JSONRepairError as e:
+        # Last resort, only when local repair cannot recover anything: ask model to fix JSON
+        logger.warning(f"Local JSON repair failed for {_window_label(window)} ({e}); asking the model to fix it")
         fix = llm.chat(
             messages=[
                 {"role": "system", "content": "Fix invalid JSON. Return ONLY valid JSON."},
@@ -66,4 +138,118 @@ OCR:
             temperature=0.0,
             max_tokens=4096,
         )
-        return json.loads(fix)
+        return _parse_window_json(fix, window)
+
+def _parse_window_json(content: str, window: List[Dict[str, Any]]) -> Dict[str, Any]:
+    data, repairs = parse_json(content)
+    if not isinstance(data, dict):
+        raise JSONRepairError(f"Expected a JSON object, got {type(data).__name__}")
+    if repairs:
+        logger.info(f"Repaired JSON for {_window_label(window)}: {', '.join(repairs)}")
+    return data
+
+def _key(value: Any) -> str:
+    return " ".join(str(value or "").split()).lower()
+
+# Shorter suffix/prefix matches are coincidence, not text of a shared page
+_MIN_OVERLAP_CHARS = 20
+
+def _join_fragments(first: str, second: str) -> str:
+    """
+    Join two fragments of one section from successive windows. The text of
+    the shared pages appears at the end of `first` and the start of
+    `second`; it is kept once. A fragment contained in the other adds nothing.
+    """
+    a, b = " ".join(first.split()), " ".join(second.split())
+    if b in a:
+        return a
+    if a in b:
+        return b
+    # Longest suffix of `a` that `b` starts with
+    probe = b[:_MIN_OVERLAP_CHARS]
+    pos = a.find(probe)
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return a[:pos] + b
+        pos = a.find(probe, pos + 1)
+    return f"{a} {b}"
+
+def merge_normalized(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Merge per-window normalizations (in page order) into one document.
+
+    Scalars take the first non-empty value. Fragments of one section number
+    from successive windows are joined (see _join_fragments), so a section
+    longer than the window overlap is kept whole; unnumbered sections are
+    deduplicated by heading and text. Parties and defined terms are unioned
+    by name/term; obligations are concatenated with their section_ref,
+    dropping exact repeats from overlapping pages.
+    """
+    merged: Dict[str, Any] = {
+        "document_type": None,
+        "parties": [],
+        "effective_date": None,
+        "term": None,
+        "sections": [],
+        "defined_terms": [],
+        "obligations": [],
+        "raw_extraction_notes": [],
+    }
+    sections: Dict[str, int] = {}
+    parties, terms, obligations, notes = set(), {}, set(), set()
+
+    for part in parts:
+        for field in ("document_type", "effective_date", "term"):
+            if not merged[field] and part.get(field):
+                merged[field] = part[field]
+
+        for party in part.get("parties") or []:
+            if not isinstance(party, dict):
+                continue
+            key = (_key(party.get("name")), _key(party.get("role")))
+            if key not in parties:
+                parties.add(key)
+                merged["parties"].append(party)
+
+        for section in part.get("sections") or []:
+            if not isinstance(section, dict):
+                continue
+            number = _key(section.get("number"))
+            key = f"#{number}" if number else f"{_key(section.get('heading'))}|{_key(section.get('text'))}"
+            if key not in sections:
+                sections[key] = len(merged["sections"])
+                merged["sections"].append(section)
+                continue
+            kept = merged["sections"][sections[key]]
+            merged["sections"][sections[key]] = dict(
+                kept,
+                heading=kept.get("heading") or section.get("heading"),
+                text=_join_fragments(str(kept.get("text") or ""), str(section.get("text") or "")),
+            )
+
+        for term in part.get("defined_terms") or []:
+            if not isinstance(term, dict):
+                continue
+            key = _key(term.get("term"))
+            if key not in terms:
+                terms[key] = len(merged["defined_terms"])
+                merged["defined_terms"].append(term)
+            elif len(str(term.get("definition") or "")) > len(str(merged["defined_terms"][terms[key]].get("definition") or "")):
+                merged["defined_terms"][terms[key]] = term
+
+        for ob in part.get("obligations") or []:
+            if not isinstance(ob, dict):
+                continue
+            key = (_key(ob.get("party")), _key(ob.get("obligation")), _key(ob.get("section_ref")))
+            if key not in obligations:
+                obligations.add(key)
+                merged["obligations"].append(dict(ob, section_ref=ob.get("section_ref")))
+
+        for note in part.get("raw_extraction_notes") or []:
+            if note not in notes:
+                notes.add(note)
+                merged["raw_extraction_notes"].append(note)
+
+    if merged["document_type"] is None:
+        merged["document_type"] = "Unknown"
+    return merged
@@ -1,11 +1,59 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Optional
+from typing import Callable, Dict, Any, List, Optional, Tuple
+import asyncio
+import json
+import threading
+import weakref
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+
+from src.config import Config
+from src.utils.json_stream import JSONArrayStream
+from src.utils.rate_limit import get_rate_limiter
+from src.utils.llm_cache import get_llm_cache
+
+try:
+    import h2  # noqa: F401  (enables httpx HTTP/2 support)
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+def get_session() -> requests.Session:
+    """
+    The process-wide keep-alive session for synchronous calls; its
+    connection pool is shared by every ChatLLM and thread.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Config.LLM_MAX_CONNECTIONS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _SESSION = session
+        return _SESSION
+
+def _element_forwarder(on_element: Callable[[Optional[str], Any], None],
+                       on_delta: Optional[Callable[[str], None]]) -> Callable[[str], None]:
+    """An on_delta that also parses the stream and passes each completed array element to on_element."""
+    stream = JSONArrayStream()
+
+    def forward(delta: str) -> None:
+        if on_delta is not None:
+            on_delta(delta)
+        for key, value in stream.feed(delta):
+            on_element(key, value)
+    return forward
 
 class ChatLLM:
     """
     Thin HTTP adapter to an ERNIE-compatible chat endpoint.
     Adjust payload keys to match your provider's schema.
+    Requests go through the shared keep-alive session (get_session).
     """
     def __init__(self, api_key: str, base_url: str, model: str):
         if not api_key:
@@ -16,7 +64,7 @@ class ChatLLM:
         self.base_url = base_url
         self.model = model
 
-    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 2048) -> str:
+    def _request(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
@@ -27,15 +75,195 @@ class ChatLLM:
             "temperature": temperature,
             "max_tokens": max_tokens,
         }
+        return headers, payload
 
-        r = requests.post(self.base_url, headers=headers, json=payload, timeout=60)
-        r.raise_for_status()
-        data = r.json()
-
+    @staticmethod
+    def _content(data: Any) -> Optional[str]:
         # Common chat completion shape:
         # data["choices"][0]["message"]["content"]
         try:
             return data["choices"][0]["message"]["content"]
         except Exception:
+            return None
+
+    @staticmethod
+    def _delta(line: str) -> Optional[str]:
+        """Text carried by one server-sent event line ('' for none, None at [DONE])."""
+        line = line.strip()
+        if not line.startswith("data:"):
+            return ""
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return None
+        try:
+            event = json.loads(data)
+        except ValueError:
+            return ""
+        try:
+            return event["choices"][0]["delta"].get("content") or ""
+        except Exception:
+            # ERNIE-native streams carry the increment in "result"
+            return (event.get("result") or "") if isinstance(event, dict) else ""
+
+    def chat(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 2048,
+             on_delta: Optional[Callable[[str], None]] = None,
+             on_element: Optional[Callable[[Optional[str], Any], None]] = None) -> str:
+        """
+        Return the completion text. With `on_delta`, the response is streamed
+        (server-sent events) and every text increment is passed to it as it
+        arrives; the full text is still returned (and cached) at the end.
+        With `on_element`, the streamed JSON is also parsed as it arrives and
+        every completed element of a top-level array, or of an array under a
+        top-level key, is passed to on_element(key, value) (see JSONArrayStream).
+        """
+        if on_element is not None:
+            on_delta = _element_forwarder(on_element, on_delta)
+        headers, payload = self._request(messages, temperature, max_tokens)
+
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = cache.make_key(self.model, None, messages, temperature=temperature, max_tokens=max_tokens)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                if on_delta is not None:
+                    on_delta(cached)
+                return cached
+
+        get_rate_limiter("ernie").acquire()
+        if on_delta is not None:
+            payload["stream"] = True
+            parts = []
+            with get_session().post(self.base_url, headers=headers, json=payload,
+                                    timeout=Config.LLM_TIMEOUT_SECONDS, stream=True) as r:
+                r.raise_for_status()
+                # SSE is always UTF-8; requests would fall back to ISO-8859-1
+                # for a text/* type without a charset
+                r.encoding = "utf-8"
+                for line in r.iter_lines(decode_unicode=True):
+                    delta = self._delta(line or "")
+                    if delta is None:
+                        break
+                    if delta:
+                        parts.append(delta)
+                        on_delta(delta)
+            content = "".join(parts)
+            if cache is not None and content:
+                cache.put(cache_key, content)
+            return content
+
+        r = get_session().post(self.base_url, headers=headers, json=payload, timeout=Config.LLM_TIMEOUT_SECONDS)
+        r.raise_for_status()
+        data = r.json()
+
+        content = self._content(data)
+        if content is None:
+            # Fallback
+            return str(data)
+        if cache is not None:
+            cache.put(cache_key, content)
+        return content
+
+# One pooled client (and concurrency gate) per event loop: httpx connections
+# are bound to the loop that opened them.
+_ASYNC_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+
+def _loop_client() -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+    loop = asyncio.get_running_loop()
+    entry = _ASYNC_CLIENTS.get(loop)
+    if entry is None or entry[0].is_closed:
+        client = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=Config.LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.LLM_MAX_CONNECTIONS,
+                keepalive_expiry=Config.LLM_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(Config.LLM_TIMEOUT_SECONDS, connect=10.0),
+        )
+        entry = (client, asyncio.Semaphore(Config.LLM_MAX_CONCURRENCY))
+        _ASYNC_CLIENTS[loop] = entry
+    return entry
+
+def get_async_client() -> httpx.AsyncClient:
+    """The shared keep-alive client for the running event loop."""
+    return _loop_client()[0]
+
+async def aclose_async_client() -> None:
+    """Close the running loop's shared client (call before the loop shuts down)."""
+    entry = _ASYNC_CLIENTS.pop(asyncio.get_running_loop(), None)
+    if entry is not None:
+        await entry[0].aclose()
+
+_SHARED_LOOP: Optional[asyncio.AbstractEventLoop] = None
+_SHARED_LOOP_LOCK = threading.Lock()
+
+def run_coroutine(coro: Any) -> Any:
+    """
+    Run `coro` on the process-wide background event loop and wait for its
+    result. Calls made from any number of threads are scheduled on that one
+    loop, so they share its pooled client and concurrency limit.
+    """
+    global _SHARED_LOOP
+    with _SHARED_LOOP_LOCK:
+        if _SHARED_LOOP is None or _SHARED_LOOP.is_closed():
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _SHARED_LOOP = loop
+        loop = _SHARED_LOOP
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+class AsyncChatLLM(ChatLLM):
+    """
+    Async ChatLLM. Every instance on a loop shares one pooled httpx client
+    (keep-alive, HTTP/2 when `h2` is installed), and in-flight requests are
+    capped at Config.LLM_MAX_CONCURRENCY per loop.
+    """
+    async def chat(self, messages: List[Dict[str, str]], temperature: float = 0.2, max_tokens: int = 2048,
+                   on_delta: Optional[Callable[[str], None]] = None,
+                   on_element: Optional[Callable[[Optional[str], Any], None]] = None) -> str:
+        if on_element is not None:
+            on_delta = _element_forwarder(on_element, on_delta)
+        headers, payload = self._request(messages, temperature, max_tokens)
+
+        cache = get_llm_cache()
+        if cache is not None:
+            cache_key = cache.make_key(self.model, None, messages, temperature=temperature, max_tokens=max_tokens)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                if on_delta is not None:
+                    on_delta(cached)
+                return cached
+
+        client, gate = _loop_client()
+        if on_delta is not None:
+            payload["stream"] = True
+            parts = []
+            async with gate:
+                await get_rate_limiter("ernie").acquire_async()
+                async with client.stream("POST", self.base_url, headers=headers, json=payload) as r:
+                    r.raise_for_status()
+                    async for line in r.aiter_lines():
+                        delta = self._delta(line)
+                        if delta is None:
+                            break
+                        if delta:
+                            parts.append(delta)
+                            on_delta(delta)
+            content = "".join(parts)
+            if cache is not None and content:
+                cache.put(cache_key, content)
+            return content
+
+        async with gate:
+            await get_rate_limiter("ernie").acquire_async()
+            r = await client.post(self.base_url, headers=headers, json=payload)
+        r.raise_for_status()
+        data = r.json()
+
+        content = self._content(data)
+        if content is None:
             # Fallback
             return str(data)
+        if cache is not None:
+            cache.put(cache_key, content)
+        return content
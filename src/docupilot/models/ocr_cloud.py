@@ -1,66 +1,208 @@
 import base64
+import io
+import random
+import threading
+import time
 import requests
 import json
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, BinaryIO, Union
 from loguru import logger
 from src.config import Config
 
+# HTTP statuses worth retrying: rate limiting and transient server/gateway errors
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+class CloudOCRError(Exception):
+    """Cloud OCR request failed. `retryable` marks transient failures."""
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+class Base64JSONBody:
+    """
+    File-like JSON request body: {"file": "<base64 of fileobj>", **fields}.
+    
+    The base64 text is produced chunk by chunk as the HTTP client reads the
+    body, so the raw bytes, the base64 string and the serialized JSON are
+    never all in memory at once; peak memory is a few chunks regardless of
+    document size. The exact length is known up front, so the request is
+    sent with a Content-Length header rather than chunked encoding.
+    """
+    def __init__(self, fileobj: BinaryIO, fields: Dict[str, Any], chunk_size: Optional[int] = None):
+        self._src = fileobj
+        # Read in multiples of 3 bytes so each chunk encodes without padding
+        self._read_size = max((chunk_size or Config.CLOUD_OCR_STREAM_CHUNK) // 3, 1) * 3
+        rest = json.dumps(fields)[1:-1]
+        self._prefix = b'{"file": "'
+        self._suffix = ('"' + (", " + rest if rest else "") + "}").encode("ascii")
+        
+        start = fileobj.tell()
+        size = fileobj.seek(0, io.SEEK_END) - start
+        fileobj.seek(start)
+        self._length = len(self._prefix) + 4 * ((size + 2) // 3) + len(self._suffix)
+        self._buffer = bytearray(self._prefix)
+        self._carry = b""
+        self._src_done = False
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _fill(self) -> bool:
+        """Append the next encoded chunk (or the suffix) to the buffer; False when exhausted."""
+        if self._src_done:
+            return False
+        raw = self._carry + self._src.read(self._read_size)
+        if len(raw) <= len(self._carry):
+            # Source exhausted: flush the last partial group (with padding) and close the JSON
+            self._buffer += base64.b64encode(raw) + self._suffix
+            self._src_done = True
+            return True
+        cut = len(raw) - len(raw) % 3
+        self._buffer += base64.b64encode(raw[:cut])
+        self._carry = raw[cut:]
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        while (size is None or size < 0 or len(self._buffer) < size) and self._fill():
+            pass
+        if size is None or size < 0:
+            size = len(self._buffer)
+        out = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return out
+
 class CloudOCRExtractor:
     def __init__(self):
         self.api_url = Config.CLOUD_OCR_URL
         self.token = Config.CLOUD_OCR_TOKEN
+        self.chunk_pages = Config.CLOUD_OCR_CHUNK_PAGES
+        self.max_workers = max(Config.CLOUD_OCR_MAX_WORKERS, 1)
+        self.max_retries = Config.CLOUD_OCR_MAX_RETRIES
+        self.backoff = Config.CLOUD_OCR_BACKOFF_SECONDS
+        
+        # One pooled session shared by all chunk uploads (keep-alive, reused TLS)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # PyMuPDF is not thread-safe; chunk documents are built one at a time
+        self._pdf_lock = threading.Lock()
         
         if not self.token:
             logger.warning("Cloud OCR Token not found. Please set CLOUD_OCR_TOKEN in .env")
 
-    def extract_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
+    def extract_pdf(self, pdf_path: str, pages: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Extract text and layout from PDF using Baidu Cloud Layout Parsing API.
+        If `pages` (1-based) is given, only those pages are uploaded; block
+        page numbers and ids still refer to the original document.
+        
+        Documents longer than CLOUD_OCR_CHUNK_PAGES are split into page-range
+        sub-documents, uploaded concurrently (CLOUD_OCR_MAX_WORKERS) with
+        per-chunk retry and backoff, and stitched back in page order.
         """
-        logger.info(f"Uploading {pdf_path} to Baidu Cloud OCR...")
+        page_numbers = list(pages) if pages else None
+        if self.chunk_pages > 0:
+            if page_numbers is None:
+                import fitz
+                with fitz.open(pdf_path) as doc:
+                    page_numbers = list(range(1, doc.page_count + 1))
+            chunks = [page_numbers[i:i + self.chunk_pages] for i in range(0, len(page_numbers), self.chunk_pages)]
+        else:
+            chunks = [page_numbers]
         
-        with open(pdf_path, "rb") as file:
-            file_bytes = file.read()
-            file_data = base64.b64encode(file_bytes).decode("ascii")
+        logger.info(f"Uploading {pdf_path} to Baidu Cloud OCR in {len(chunks)} chunk(s)...")
+        if len(chunks) == 1:
+            # Whole document in one request: upload the original file as-is
+            return self._extract_chunk(pdf_path, list(pages) if pages else None)
+        
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(chunks))) as pool:
+            futures = [pool.submit(self._extract_chunk, pdf_path, chunk) for chunk in chunks]
+            # Collect in submission order so blocks stay in page order
+            chunk_blocks = [f.result() for f in futures]
+        
+        blocks = []
+        for part in chunk_blocks:
+            blocks.extend(part)
+        return blocks
 
+    def _extract_chunk(self, pdf_path: str, pages: Optional[List[int]]) -> List[Dict[str, Any]]:
+        """Upload one page range (None = whole file) and parse it, retrying transient failures."""
+        if pages:
+            with self._pdf_lock:
+                source = self._subset_pdf(pdf_path, pages)
+        else:
+            # Stream the original file from disk; never held in memory whole
+            source = pdf_path
+        
+        label = f"pages {pages[0]}-{pages[-1]}" if pages else "document"
+        for attempt in range(self.max_retries + 1):
+            try:
+                result = self._post(source)
+                return self._parse_response(result, pages)
+            except CloudOCRError as e:
+                if not e.retryable or attempt == self.max_retries:
+                    logger.error(f"Cloud OCR Request Failed ({label}): {e}")
+                    raise
+                # Exponential backoff with jitter so parallel chunks don't retry in lockstep
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                logger.warning(f"Cloud OCR {label} failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _post(self, source: Union[str, bytes]) -> Dict[str, Any]:
+        """POST one document (a file path or in-memory PDF bytes) and return the parsed JSON."""
         headers = {
             "Authorization": f"token {self.token}",
             "Content-Type": "application/json"
         }
 
         # fileType 0 for PDF
-        payload = {
-            "file": file_data,
+        options = {
             "fileType": 0, 
             "useDocOrientationClassify": False,
             "useDocUnwarping": False,
             "useChartRecognition": False,
         }
 
+        # A fresh body per attempt: the payload is encoded while it is being sent
+        fileobj = open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
         try:
-            response = requests.post(self.api_url, json=payload, headers=headers, timeout=120)
+            body = Base64JSONBody(fileobj, options)
+            response = self.session.post(self.api_url, data=body, headers=headers, timeout=120)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise CloudOCRError(f"Network error: {e}", retryable=True) from e
+        finally:
+            fileobj.close()
             
-            if response.status_code != 200:
-                logger.error(f"Cloud OCR Failed: {response.text}")
-                raise Exception(f"Cloud OCR Error: {response.status_code}")
-                
-            result = response.json()
-            if result.get("errorCode") != 0:
-                 logger.error(f"Cloud OCR API Error: {result.get('errorMsg')}")
-                 raise Exception(f"API Error: {result.get('errorMsg')}")
-                 
-            return self._parse_response(result)
+        if response.status_code != 200:
+            logger.error(f"Cloud OCR Failed: {response.text[:500]}")
+            raise CloudOCRError(f"Cloud OCR Error: {response.status_code}",
+                                retryable=response.status_code in _RETRYABLE_STATUS)
             
-        except Exception as e:
-            logger.error(f"Cloud OCR Request Failed: {e}")
-            raise e
+        result = response.json()
+        if result.get("errorCode") != 0:
+             logger.error(f"Cloud OCR API Error: {result.get('errorMsg')}")
+             raise CloudOCRError(f"API Error: {result.get('errorMsg')}")
+        return result
+
+    @staticmethod
+    def _subset_pdf(pdf_path: str, pages: List[int]) -> bytes:
+        """Build an in-memory PDF holding only the given 1-based pages."""
+        import fitz
+        with fitz.open(pdf_path) as src, fitz.open() as subset:
+            for page_num in pages:
+                subset.insert_pdf(src, from_page=page_num - 1, to_page=page_num - 1)
+            return subset.tobytes()
 
-    def _parse_response(self, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _parse_response(self, result: Dict[str, Any], page_numbers: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         blocks = []
         
         layout_results = result.get("result", {}).get("layoutParsingResults", [])
         
-        for page_idx, page_res in enumerate(layout_results):
+        for res_idx, page_res in enumerate(layout_results):
+            # Map the n-th returned page back to its page in the source document
+            page_idx = page_numbers[res_idx] - 1 if page_numbers else res_idx
             pruned = page_res.get("prunedResult", {})
             parsing_list = pruned.get("parsing_res_list", [])
             
@@ -2,40 +2,168 @@ import pypdfium2 as pdfium
 from paddleocr import PaddleOCR
 from PIL import Image
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, Tuple
+import queue
+import sys
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from loguru import logger
 
 from src.config import Config
+from .render import render_page
 
-class PaddleOCRExtractor:
-    def __init__(self, lang: str = "en"):
-        # Initialize PaddleOCR
-        # Use GPU if valid in Config
-        print(f"DEBUG: Initializing PaddleOCR (Config.PADDLE_OCR_USE_GPU={Config.PADDLE_OCR_USE_GPU})")
+# Queue sentinel marking the end of the render stream
+_RENDER_DONE = object()
+# Recognition confidence below which PaddleOCR discards a line
+_DROP_SCORE = 0.5
+
+class OCREnginePool:
+    """
+    Process-wide pool of PaddleOCR engines keyed by (lang, use_gpu, angle_cls).
+    
+    Engines load lazily on first use and are reused across extractor
+    instances, so model weights are read once per process instead of once
+    per document. Up to `size` engines exist per key; concurrent callers
+    beyond that wait for an engine to be released, for at most
+    Config.PADDLE_OCR_ACQUIRE_TIMEOUT seconds.
+    """
+    def __init__(self, size: int = 1):
+        self.size = max(size, 1)
+        self._lock = threading.Lock()
+        self._idle: Dict[Tuple[str, bool, bool], "queue.LifoQueue"] = {}
+        self._created: Dict[Tuple[str, bool, bool], int] = {}
+
+    @staticmethod
+    def _load_engine(lang: str, use_gpu: bool, angle_cls: bool) -> PaddleOCR:
+        print(f"DEBUG: Initializing PaddleOCR (lang={lang}, use_gpu={use_gpu}, angle_cls={angle_cls})")
         
         # Explicitly check and print
-        if Config.PADDLE_OCR_USE_GPU:
+        if use_gpu:
              print("\n" + "="*50)
              print("  🚀 OCR ENGINE: GPU ACCELERATION ENABLED! (FAST MODE)")
              print("="*50 + "\n")
-             use_gpu = True
         else:
              print("\n" + "="*50)
              print("  🐢 OCR ENGINE: CPU MODE (SLOW MODE)")
              print("     Set PADDLE_OCR_USE_GPU=true to enable acceleration.")
              print("="*50 + "\n")
-             use_gpu = False
         
-        self.ocr = PaddleOCR(
-            use_angle_cls=True,
+        return PaddleOCR(
+            use_angle_cls=angle_cls,
             lang=lang,
-            use_gpu=use_gpu
+            use_gpu=use_gpu,
+            # Recognition mini-batch; only matters for batched mode, where
+            # text lines from several pages are recognised in one call
+            rec_batch_num=Config.PADDLE_OCR_REC_BATCH,
         )
 
-    def extract_pdf(self, pdf_path: str, dpi: int = 200) -> List[Dict[str, Any]]:
+    @contextmanager
+    def acquire(self, lang: str = "en", use_gpu: Optional[bool] = None, angle_cls: bool = True,
+                timeout: Optional[float] = None) -> Iterator[PaddleOCR]:
+        """
+        Lease an engine for the duration of the `with` block. Raises
+        TimeoutError when none is released within `timeout` seconds
+        (default Config.PADDLE_OCR_ACQUIRE_TIMEOUT).
+        """
+        timeout = Config.PADDLE_OCR_ACQUIRE_TIMEOUT if timeout is None else timeout
+        key = (lang, Config.PADDLE_OCR_USE_GPU if use_gpu is None else use_gpu, angle_cls)
+        with self._lock:
+            idle = self._idle.setdefault(key, queue.LifoQueue())
+            create = idle.empty() and self._created.get(key, 0) < self.size
+            if create:
+                self._created[key] = self._created.get(key, 0) + 1
+
+        if create:
+            try:
+                engine = self._load_engine(*key)
+            except Exception:
+                with self._lock:
+                    self._created[key] -= 1
+                raise
+        else:
+            try:
+                engine = idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"No PaddleOCR engine (lang={key[0]}) became free within {timeout:g}s; "
+                    f"all {self.size} are busy. Raise PADDLE_OCR_POOL_SIZE or PADDLE_OCR_ACQUIRE_TIMEOUT."
+                ) from None
+
+        try:
+            yield engine
+        finally:
+            idle.put(engine)
+
+    def warm_up(self, lang: str = "en", use_gpu: Optional[bool] = None, angle_cls: bool = True,
+                instances: Optional[int] = None) -> int:
+        """
+        Load `instances` engines (default: pool size) and run one tiny image
+        through each so lazy predictor setup happens now, not on first request.
+        Returns the number of engines warmed.
+        """
+        instances = min(instances or self.size, self.size)
+        blank = np.full((32, 96, 3), 255, dtype=np.uint8)
+        with ExitStack() as stack:
+            engines = [stack.enter_context(self.acquire(lang, use_gpu, angle_cls)) for _ in range(instances)]
+            for engine in engines:
+                engine.ocr(blank)
+        logger.debug(f"Warmed {instances} PaddleOCR engine(s) for lang={lang}")
+        return instances
+
+ENGINE_POOL = OCREnginePool(size=Config.PADDLE_OCR_POOL_SIZE)
+
+def warm_up(lang: str = "en", instances: Optional[int] = None) -> int:
+    """Boot-time hook: preload the shared OCR engines (app.py runs it when OCR_WARMUP is set)."""
+    return ENGINE_POOL.warm_up(lang=lang, instances=instances)
+
+class PaddleOCRExtractor:
+    def __init__(self, lang: str = "en"):
+        # Engines come from the process-wide pool; nothing is loaded here
+        self.lang = lang
+        self.use_gpu = Config.PADDLE_OCR_USE_GPU
+        self.use_angle_cls = True
+
+    def extract_pdf(self, pdf_path: str, dpi: int = 200, pages: Optional[List[int]] = None) -> List[Dict[str, Any]]:
         """
         Extract text from a PDF file using PaddleOCR with pypdfium2 for rendering.
-        Returns a list of dictionaries, one per page.
+        Returns a list of block dictionaries in page order.
+        If `pages` (1-based) is given, only those pages are rendered and OCR'd.
+        """
+        pages_text = []
+        for _, page_blocks in self.iter_pdf(pdf_path, dpi=dpi, pages=pages):
+            pages_text.extend(page_blocks)
+        return pages_text
+
+    def iter_pdf(self, pdf_path: str, dpi: int = 200, pages: Optional[List[int]] = None,
+                 prefetch: Optional[int] = None, batch_pages: Optional[int] = None,
+                 batch_max_mb: Optional[int] = None, adaptive_dpi: Optional[bool] = None,
+                 grayscale: Optional[bool] = None,
+                 stats: Optional[Dict[str, Any]] = None) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
         """
+        Stream OCR results as (page_number, blocks) tuples, one page at a time.
+        
+        A background thread renders upcoming pages into a bounded queue while
+        the caller's thread runs recognition, so rendering page N+1 overlaps
+        with OCR on page N and at most `prefetch` bitmaps are held in memory.
+        
+        With `batch_pages` > 1, up to that many rendered pages (capped at
+        `batch_max_mb` of bitmap memory) are detected page by page and their
+        text-line crops recognised together in one batched call.
+        
+        With `adaptive_dpi`, each page is probed at low resolution and rendered
+        at a DPI chosen from its text height (Config.OCR_MIN_DPI..OCR_MAX_DPI)
+        instead of the fixed `dpi`. `grayscale` renders single-channel bitmaps.
+        Block bboxes are always reported in PDF points.
+        
+        When the stream ends, `stats['ocr_throughput']` (if `stats` is given)
+        holds pages, seconds and pages_per_sec with the device, batch size,
+        DPI mode and peak RSS they were measured under.
+        """
+        adaptive_dpi = Config.OCR_ADAPTIVE_DPI if adaptive_dpi is None else adaptive_dpi
+        grayscale = Config.OCR_GRAYSCALE if grayscale is None else grayscale
+        batch_pages = batch_pages or Config.PADDLE_OCR_BATCH_PAGES
+        batch_max_bytes = (batch_max_mb or Config.PADDLE_OCR_BATCH_MAX_MB) * 1024 * 1024
         print(f"DEBUG: Opening PDF {pdf_path} with pypdfium2")
         try:
             pdf = pdfium.PdfDocument(pdf_path)
@@ -43,47 +171,187 @@ class PaddleOCRExtractor:
             print(f"ERROR: Failed to open PDF with pypdfium2. Error: {e}")
             raise e
 
-        pages_text = []
-        scale = dpi / 72.0
-
-        print(f"DEBUG: Processing {len(pdf)} pages...")
-        for i, page in enumerate(pdf):
-            print(f"DEBUG: Rendering page {i+1}")
-            # Render page to PIL image
-            bitmap = page.render(scale=scale)
-            pil_image = bitmap.to_pil()
-            
-            # Convert to numpy array for PaddleOCR
-            img_np = np.array(pil_image)
-
-            print(f"DEBUG: Running OCR on page {i+1}")
-            result = self.ocr.ocr(img_np)
-
-            if result and result[0]:
-                for item_idx, block in enumerate(result[0]):
-                    # block structure: [ [x1,y1], [x2,y2], ... ], (text, confidence)
-                    points = block[0]
-                    text_res = block[1]
-                    text, confidence = text_res
-                    
-                    # specific output format
-                    # Convert points to [x0, y0, x1, y1] for compatibility if needed
-                    # But points are usually [[x,y], [x,y], [x,y], [x,y]]
-                    # We'll keep bbox as is or convert to [x0, y0, x1, y1]
-                    xs = [p[0] for p in points]
-                    ys = [p[1] for p in points]
-                    x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
-                    
-                    pages_text.append({
-                        "block_id": f"p{i+1}_b{item_idx}",
-                        "page": i + 1,
-                        "type": "text",
-                        "text": text,
-                        "confidence": confidence,
-                        "bbox": [x0, y0, x1, y1]
-                    })
-            
-        return pages_text
+        page_numbers = list(pages or range(1, len(pdf) + 1))
+        # Buffer at least one batch ahead so the next batch renders during recognition
+        rendered: "queue.Queue" = queue.Queue(maxsize=max(prefetch or Config.OCR_PREFETCH_PAGES, batch_pages))
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Poll so an abandoned generator can't leave the renderer blocked forever
+            while not stop.is_set():
+                try:
+                    rendered.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def render_worker():
+            # pdfium is not thread-safe; this thread is its only user until join()
+            try:
+                for page_num in page_numbers:
+                    # Render page to a numpy array for PaddleOCR
+                    img_np, scale = render_page(pdf[page_num - 1], dpi=dpi, adaptive=adaptive_dpi,
+                                                grayscale=grayscale)
+                    logger.debug(f"Rendered page {page_num} at {scale * 72:.0f} DPI")
+                    if not put((page_num, img_np, scale)):
+                        return
+                put(_RENDER_DONE)
+            except Exception as e:
+                put(e)
+
+        print(f"DEBUG: Processing {len(page_numbers)} pages...")
+        renderer = threading.Thread(target=render_worker, name="pdf-render", daemon=True)
+        renderer.start()
+        started = time.perf_counter()
+        done_pages = 0
+        try:
+            with ENGINE_POOL.acquire(self.lang, self.use_gpu, self.use_angle_cls) as engine:
+                finished = False
+                while not finished:
+                    # Collect a batch: always at least one page, then more while
+                    # under both the page count and the bitmap memory cap
+                    batch, batch_bytes = [], 0
+                    while len(batch) < batch_pages:
+                        item = rendered.get()
+                        if item is _RENDER_DONE:
+                            finished = True
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        batch.append(item)
+                        batch_bytes += item[1].nbytes
+                        if batch_bytes >= batch_max_bytes:
+                            break
+                    if not batch:
+                        break
+
+                    if len(batch) == 1:
+                        page_num, img_np, scale = batch[0]
+                        logger.debug(f"Running OCR on page {page_num}")
+                        results = [(page_num, self._ocr_image(engine, img_np, page_num, scale))]
+                    else:
+                        logger.debug(f"Running batched OCR on pages {batch[0][0]}-{batch[-1][0]}")
+                        results = self._ocr_batch(engine, batch)
+                    for page_num, page_blocks in results:
+                        done_pages += 1
+                        yield page_num, page_blocks
+        finally:
+            stop.set()
+            renderer.join()
+            pdf.close()
+            elapsed = time.perf_counter() - started
+            if done_pages and elapsed > 0:
+                throughput = {
+                    'pages': done_pages,
+                    'seconds': round(elapsed, 3),
+                    'pages_per_sec': round(done_pages / elapsed, 3),
+                    'device': "GPU" if self.use_gpu else "CPU",
+                    'batch_pages': batch_pages,
+                    'dpi': "adaptive" if adaptive_dpi else f"fixed-{dpi}",
+                    'grayscale': grayscale,
+                    'peak_rss_mb': round(peak_rss_mb()),
+                }
+                if stats is not None:
+                    stats['ocr_throughput'] = throughput
+                logger.info(f"OCR throughput: {done_pages} pages in {elapsed:.1f}s "
+                            f"({throughput['pages_per_sec']:.2f} pages/sec on {throughput['device']}, "
+                            f"batch={batch_pages}, dpi={throughput['dpi']}{', gray' if grayscale else ''}, "
+                            f"peak RSS={throughput['peak_rss_mb']} MB)")
+
+    def _ocr_batch(self, engine: PaddleOCR, batch: List[Tuple[int, np.ndarray, float]]) -> List[Tuple[int, List[Dict[str, Any]]]]:
+        """Detect lines per page, then recognise all pages' line crops in one call."""
+        crops, owners = [], []
+        for page_num, img_np, scale in batch:
+            det = engine.ocr(img_np, rec=False, cls=False)
+            boxes = _sorted_boxes(det[0]) if det and det[0] else []
+            for box in boxes:
+                # Axis-aligned crop of the detected quad; fine for upright scans
+                xs = [p[0] for p in box]
+                ys = [p[1] for p in box]
+                x0, y0 = max(int(min(xs)), 0), max(int(min(ys)), 0)
+                x1, y1 = int(max(xs)) + 1, int(max(ys)) + 1
+                crop = img_np[y0:y1, x0:x1]
+                if crop.size == 0:
+                    continue
+                if crop.ndim == 2:
+                    # The recogniser expects 3 channels; expand only the small crop
+                    crop = np.repeat(crop[:, :, None], 3, axis=2)
+                crops.append(crop)
+                owners.append((page_num, [x0 / scale, y0 / scale, x1 / scale, y1 / scale]))
+
+        rec = engine.ocr([crops], det=False, cls=self.use_angle_cls) if crops else [[]]
+        rec_lines = rec[0] if rec and rec[0] else []
+
+        per_page: Dict[int, List[Dict[str, Any]]] = {item[0]: [] for item in batch}
+        for (page_num, bbox), (text, confidence) in zip(owners, rec_lines):
+            # Same filter PaddleOCR applies in its own det+rec pipeline
+            if confidence < _DROP_SCORE:
+                continue
+            page_blocks = per_page[page_num]
+            page_blocks.append({
+                "block_id": f"p{page_num}_b{len(page_blocks)}",
+                "page": page_num,
+                "type": "text",
+                "text": text,
+                "confidence": confidence,
+                "bbox": bbox
+            })
+        return [(item[0], per_page[item[0]]) for item in batch]
+
+    def _ocr_image(self, engine: PaddleOCR, img_np: np.ndarray, page_num: int,
+                   scale: float = 1.0) -> List[Dict[str, Any]]:
+        """Run PaddleOCR on one rendered page and convert lines to blocks."""
+        blocks = []
+        result = engine.ocr(img_np)
+
+        if result and result[0]:
+            for item_idx, block in enumerate(result[0]):
+                # block structure: [ [x1,y1], [x2,y2], ... ], (text, confidence)
+                points = block[0]
+                text_res = block[1]
+                text, confidence = text_res
+                
+                # specific output format
+                # Convert points to [x0, y0, x1, y1] for compatibility if needed
+                # But points are usually [[x,y], [x,y], [x,y], [x,y]]
+                # We'll keep bbox as is or convert to [x0, y0, x1, y1]
+                # Pixel coordinates are divided by the render scale -> PDF points
+                xs = [p[0] / scale for p in points]
+                ys = [p[1] / scale for p in points]
+                x0, y0, x1, y1 = min(xs), min(ys), max(xs), max(ys)
+                
+                blocks.append({
+                    "block_id": f"p{page_num}_b{item_idx}",
+                    "page": page_num,
+                    "type": "text",
+                    "text": text,
+                    "confidence": confidence,
+                    "bbox": [x0, y0, x1, y1]
+                })
+        return blocks
+
+def _sorted_boxes(boxes: List[Any]) -> List[Any]:
+    """Order detected boxes top-to-bottom, left-to-right (as PaddleOCR does)."""
+    boxes = sorted(boxes, key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            same_line = abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10
+            if same_line and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process in MB (0 where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
 # Standalone function for compatibility
 def ocr_pdf(pdf_path: str):
@@ -0,0 +1,71 @@
+from __future__ import annotations
+from typing import Optional, Tuple
+import numpy as np
+
+from src.config import Config
+
+# Pixel value below which a grayscale probe pixel counts as ink
+_INK_THRESHOLD = 160
+# Fraction of a row's pixels that must be ink for the row to count as text
+_ROW_INK_FRACTION = 0.005
+
+def estimate_line_height_pt(page, probe_dpi: Optional[int] = None) -> Optional[float]:
+    """
+    Estimate the typical text line height of a pdfium page, in PDF points.
+
+    Renders a cheap grayscale thumbnail, finds horizontal runs of inked rows
+    (one run per text line, roughly) and returns the median run height.
+    Returns None for pages with no detectable text (blank or pure graphics).
+    """
+    probe_dpi = probe_dpi or Config.OCR_PROBE_DPI
+    probe = page.render(scale=probe_dpi / 72.0, grayscale=True)
+    gray = np.asarray(probe.to_pil().convert("L"))
+
+    inked_rows = (gray < _INK_THRESHOLD).mean(axis=1) > _ROW_INK_FRACTION
+    heights = []
+    run = 0
+    for inked in inked_rows:
+        if inked:
+            run += 1
+        elif run:
+            heights.append(run)
+            run = 0
+    if run:
+        heights.append(run)
+
+    # Single-pixel runs at probe resolution are rules or specks, not text
+    heights = [h for h in heights if h >= 2]
+    if not heights:
+        return None
+    return float(np.median(heights)) * 72.0 / probe_dpi
+
+def choose_render_dpi(line_height_pt: Optional[float], min_dpi: Optional[int] = None,
+                      max_dpi: Optional[int] = None, target_px: Optional[int] = None) -> int:
+    """
+    Pick a render DPI so a typical text line is about `target_px` pixels tall,
+    clamped to [min_dpi, max_dpi]. Large-font pages render smaller; fine print
+    renders larger. Unknown line height falls back to the upper bound.
+    """
+    min_dpi = min_dpi or Config.OCR_MIN_DPI
+    max_dpi = max_dpi or Config.OCR_MAX_DPI
+    target_px = target_px or Config.OCR_TARGET_LINE_PX
+    if not line_height_pt:
+        return max_dpi
+    dpi = target_px * 72.0 / line_height_pt
+    return int(min(max(dpi, min_dpi), max_dpi))
+
+def render_page(page, dpi: int = 200, adaptive: bool = False,
+                grayscale: bool = False) -> Tuple[np.ndarray, float]:
+    """
+    Render a pdfium page for OCR. Returns (image array, scale), where scale
+    is pixels per PDF point. Grayscale output is a single channel, a third
+    of the RGB buffer size.
+    """
+    if adaptive:
+        dpi = choose_render_dpi(estimate_line_height_pt(page))
+    scale = dpi / 72.0
+    bitmap = page.render(scale=scale, grayscale=grayscale)
+    pil_image = bitmap.to_pil()
+    if grayscale:
+        pil_image = pil_image.convert("L")
+    return np.array(pil_image), scale
@@ -2,6 +2,7 @@ from __future__ import annotations
 from typing import Dict, Any, List
 from dataclasses import asdict
 from ..agents.base import RiskAgent, RiskFinding
+from ..agents.scanner import DocumentView
 from ..agents.compliance import ComplianceRiskAgent
 from ..agents.financial import FinancialRiskAgent
 from ..agents.legal import LegalRiskAgent
@@ -26,9 +27,11 @@ class CAMELStyleOrchestrator:
         ]
 
     def run(self, normalized_doc: Dict[str, Any]) -> Dict[str, Any]:
+        # One shared document view: every agent's trigger phrases found in a single pass
+        view = DocumentView(normalized_doc, [t for agent in self.agents for t in agent.triggers])
         all_findings: List[RiskFinding] = []
         for agent in self.agents:
-            all_findings.extend(agent.analyze(normalized_doc))
+            all_findings.extend(agent.analyze(normalized_doc, view=view))
 
         # Score aggregation: max severity per category + overall weighted mean
         by_cat: Dict[str, List[RiskFinding]] = {}
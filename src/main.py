@@ -3,6 +3,7 @@ import os
 import sys
 import json
 import click
+from dataclasses import asdict
 from pathlib import Path
 from loguru import logger
 from dotenv import load_dotenv
@@ -13,8 +14,11 @@ load_dotenv()
 # Ensure we can import from src
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.ocr import extract_document
+from src.ocr import iter_document
 from src.normalize import create_evidence_store
+from src.utils.extraction_cache import get_extraction_cache
+from src.utils.llm_cache import get_llm_cache
+from src.utils.rule_engine import load_rules
 from src.agents.orchestrator import run_pipeline
 
 @click.command()
@@ -23,7 +27,9 @@ from src.agents.orchestrator import run_pipeline
 @click.option('--out', required=True, type=click.Path(), help='Output directory')
 @click.option('--rules', type=click.Path(exists=True), help='Optional YAML rules file')
 @click.option('--top_k', default=8, help='Number of evidence blocks to retrieve')
-def main(pdf, domain, out, rules, top_k):
+@click.option('--no-cache', 'no_cache', is_flag=True, help='Bypass the extraction cache for this run (when EXTRACTION_CACHE_ENABLED=true)')
+@click.option('--purge-cache', 'purge_cache', is_flag=True, help='Delete all cached extractions (and LLM responses) before running')
+def main(pdf, domain, out, rules, top_k, no_cache, purge_cache):
     """DocuPilot: Multi-Agent Contract Review System"""
     
     print(r"""
@@ -35,21 +41,41 @@ def main(pdf, domain, out, rules, top_k):
                                               
     """)
     logger.info(f"Stats: Processing {pdf} | Domain: {domain}")
+    rule_set = None
     if rules:
-        logger.info(f"Loaded rules from: {rules}")
+        # Compiled once per file content; every rule then runs in a single pass over the evidence
+        rule_set = load_rules(rules)
+        logger.info(f"Loaded {len(rule_set)} rule(s) from: {rules}")
     
-    # 1. Perception Layer
-    blocks = extract_document(pdf)
-    if not blocks:
+    if purge_cache:
+        removed = get_extraction_cache().purge()
+        logger.info(f"Purged {removed} cached extraction(s).")
+        if get_llm_cache() is not None:
+            logger.info(f"Purged {get_llm_cache().purge()} cached LLM response(s).")
+    
+    # 1 + 2. Perception -> Normalization Layer
+    # Blocks are streamed page by page, so normalization starts on the first
+    # pages while OCR is still working through the rest of the document.
+    extraction_stats = {}
+    evidence = create_evidence_store(iter_document(pdf, stats=extraction_stats, use_cache=False if no_cache else None))
+    if extraction_stats:
+        logger.info(f"Pages handled: {extraction_stats.get('native_pages', 0)} native, {extraction_stats.get('ocr_pages', 0)} OCR")
+    if not evidence['blocks']:
         logger.error("No blocks extracted. Exiting.")
         return
-
-    # 2. Normalization Layer
-    evidence = create_evidence_store(blocks)
+    evidence['metadata']['extraction'] = extraction_stats
     logger.info(f"Evidence prepared: {evidence['metadata']['total_blocks']} blocks")
     
+    rule_findings = []
+    if rule_set is not None:
+        rule_findings = rule_set.evaluate(evidence['blocks'])
+        logger.info(f"Rule engine: {len(rule_findings)} finding(s) from {len(rule_set)} rule(s)")
+    
     # 3. Agent Layer
-    results = run_pipeline(evidence)
+    results = run_pipeline(evidence, top_k=top_k)
+    llm_cache = get_llm_cache()
+    if llm_cache is not None:
+        logger.info(f"LLM cache: {llm_cache.hits} hit(s), {llm_cache.misses} miss(es)")
     
     # 4. Storage Layer
     output_path = Path(out)
@@ -58,9 +84,14 @@ def main(pdf, domain, out, rules, top_k):
     # Writing outputs as requested
     (output_path / 'evidence.json').write_text(json.dumps(results.get('cleaned_evidence', evidence), indent=2))
     (output_path / 'report.md').write_text(results['report'])
+    if rule_set is not None:
+        (output_path / 'rule_findings.json').write_text(json.dumps([asdict(f) for f in rule_findings], indent=2))
     
     # Risk Register CSV
     risks = results['risks']
+    if isinstance(risks, dict):
+        # assess_risk_roles returns {"risks": [...], "roles": {...}}
+        risks = risks.get('risks', [])
     if isinstance(risks, list) and risks:
         import csv
         import io
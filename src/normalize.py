@@ -1,25 +1,154 @@
-
 """Normalize OCR output into structured evidence store"""
 
-def create_evidence_store(blocks):
+import re
+from collections import defaultdict
+
+# Standalone page numbers: "3", "- 3 -", "Page 3", "Page 3 of 10", "3/10"
+# (only ever tested against the edge blocks of a page)
+_PAGE_NUMBER_RE = re.compile(r'^(?:page\s*)?[-–—]?\s*\d{1,4}\s*[-–—]?(?:\s*(?:of|/)\s*\d{1,4})?$', re.IGNORECASE)
+# Page references inside a running header/footer: "Page 3", "Page 3 of 10", "3 of 10"
+_PAGE_REF_RE = re.compile(r'\bpage\s*\d{1,4}(?:\s*(?:of|/)\s*\d{1,4})?\b|\b\d{1,4}\s+of\s+\d{1,4}\b', re.IGNORECASE)
+# Word broken across a line end: "agree-\nment" -> "agreement"
+_HYPHEN_BREAK_RE = re.compile(r'(\w)-\s*\n\s*([a-z])')
+# Leading clause numbering with stray spaces: "1 . 2 ." -> "1.2.", "( a )" -> "(a)"
+_DOTTED_NUMBER_RE = re.compile(r'^(\d+(?:\s*\.\s*\d+)*)\s*([.)])(?=\s|$)')
+_PAREN_NUMBER_RE = re.compile(r'^\(\s*([0-9]{1,3}|[a-zA-Z]|[ivxlcdm]{1,6})\s*\)')
+# Characters that rarely appear in clean legal/business text
+_JUNK_CHAR_RE = re.compile(r'[^\w\s.,;:!?()\[\]{}"\'%$€£¥§&/@#*+=<>\-–—’‘“”…]')
+_MIXED_CASE_RE = re.compile(r'\b[a-z]+[A-Z]+[a-zA-Z]*\b')
+_DIGIT_IN_WORD_RE = re.compile(r'\b[a-zA-Z]+\d+[a-zA-Z]+\b')
+_SENTENCE_END = ('.', ':', ';', '!', '?', '。', '：', '；')
+
+# Header/footer candidates: this many blocks at the top and bottom of each page
+_EDGE_BLOCKS = 2
+# ...repeated on at least this share of pages (and on at least 2 pages)
+_REPEAT_PAGE_SHARE = 0.5
+# Longer blocks are body text, not running headers
+_MAX_HEADER_CHARS = 150
+
+def _header_key(text):
+    """
+    Compare headers/footers modulo page references and case. Other digits
+    are kept, so blocks that differ only in amounts, dates or years
+    ("Monthly fee: USD 1000" / "USD 2000") are not mistaken for one header.
+    """
+    return _PAGE_REF_RE.sub('#', text.lower())
+
+def _edge_blocks(page_blocks):
+    """The blocks of one page that may be a header, footer or page number."""
+    # Short pages: only the very first and last block can be a header/footer
+    n = _EDGE_BLOCKS if len(page_blocks) > 2 * _EDGE_BLOCKS else 1
+    return page_blocks[:n] + page_blocks[-n:]
+
+def _by_page(blocks):
+    by_page = defaultdict(list)
+    for b in blocks:
+        by_page[b['page']].append(b)
+    return by_page
+
+def remove_page_numbers(blocks):
+    """Drop standalone page numbers; only a page's edge blocks are candidates."""
+    kept = []
+    for page_blocks in _by_page(blocks).values():
+        edge_ids = {id(b) for b in _edge_blocks(page_blocks)}
+        kept.extend(b for b in page_blocks if not (id(b) in edge_ids and _PAGE_NUMBER_RE.match(b['text'])))
+    return kept, len(blocks) - len(kept)
+
+def normalize_numbering(text):
+    text = _DOTTED_NUMBER_RE.sub(lambda m: re.sub(r'\s+', '', m.group(1)) + m.group(2), text)
+    return _PAREN_NUMBER_RE.sub(lambda m: f"({m.group(1)})", text)
+
+def clean_text(text):
+    """Per-block cleanup: join hyphenated line breaks, collapse whitespace, tidy numbering."""
+    text = _HYPHEN_BREAK_RE.sub(r'\1\2', text)
+    # Clean up text - remove excessive newlines/spaces
+    text = " ".join(text.split())
+    return normalize_numbering(text)
+
+def noise_score(text):
+    """
+    0.0 (clean) .. 1.0 (garbage) estimate of how much a block still needs
+    LLM cleanup: junk symbols, replacement characters, mixed-case or
+    digit-infested words and runs of single-character tokens.
+    """
+    if not text:
+        return 0.0
+    words = text.split()
+    junk = len(_JUNK_CHAR_RE.findall(text)) / len(text)
+    replacement = 1.0 if '\ufffd' in text else 0.0
+    odd_words = (len(_MIXED_CASE_RE.findall(text)) + len(_DIGIT_IN_WORD_RE.findall(text))) / len(words)
+    singles = sum(1 for w in words if len(w) == 1 and w.isalpha() and w not in ('a', 'A', 'I')) / len(words)
+    return round(min(1.0, 3 * junk + replacement + odd_words + singles), 3)
+
+def remove_repeated_edges(blocks, total_pages):
+    """Drop running headers/footers: edge blocks whose text repeats across pages."""
+    if total_pages < 2:
+        return blocks, 0
+    by_page = _by_page(blocks)
+
+    pages_with = defaultdict(set)
+    for page, page_blocks in by_page.items():
+        for b in _edge_blocks(page_blocks):
+            if len(b['text']) <= _MAX_HEADER_CHARS:
+                pages_with[_header_key(b['text'])].add(page)
+
+    threshold = max(2, _REPEAT_PAGE_SHARE * total_pages)
+    repeated = {key for key, pages in pages_with.items() if len(pages) >= threshold}
+    if not repeated:
+        return blocks, 0
+
+    kept = []
+    for page, page_blocks in by_page.items():
+        edge_ids = {id(b) for b in _edge_blocks(page_blocks)}
+        kept.extend(b for b in page_blocks if not (id(b) in edge_ids and _header_key(b['text']) in repeated))
+    return kept, len(blocks) - len(kept)
+
+def join_split_lines(blocks):
+    """
+    Merge a block into the previous one on the same page when the previous
+    one stops mid-sentence (no closing punctuation, or a trailing hyphen)
+    and this one continues in lower case.
+    """
+    joined = []
+    merges = 0
+    for b in blocks:
+        prev = joined[-1] if joined else None
+        if (prev and prev['page'] == b['page'] and b['text'][:1].islower()
+                and not prev['text'].endswith(_SENTENCE_END)):
+            if prev['text'].endswith('-') and prev['text'][-2:-1].isalpha():
+                prev['text'] = prev['text'][:-1] + b['text']
+            else:
+                prev['text'] = f"{prev['text']} {b['text']}"
+            prev.setdefault('merged_ids', []).append(b['id'])
+            merges += 1
+            continue
+        joined.append(b)
+    return joined, merges
+
+def create_evidence_store(blocks, clean=True):
     """Create structured evidence store from OCR blocks.
-    
+
     Args:
-        blocks (list): List of block dictionaries from ocr.py
-        
+        blocks (iterable): Block dictionaries from ocr.py. May be a stream
+            (e.g. ocr.iter_document); it is consumed in a single pass.
+        clean (bool): Apply the deterministic cleaner (page numbers, running
+            headers/footers, de-hyphenation, split-line joins, numbering) and
+            score each block's remaining noise.
+
     Returns:
         dict: Evidence dictionary with 'blocks' and 'metadata'
     """
-    
+
     cleaned_blocks = []
-    
+    total_pages = 0
+    page_numbers_removed = 0
+
     for b in blocks:
+        total_pages = max(total_pages, b.get('page', 1))
         text = b.get('text', '').strip()
-        # Clean up text - remove excessive newlines/spaces
-        text = " ".join(text.split())
-        
-        # Simple heuristic to skip noise or empty blocks
-        if text and len(text) > 2:
+        text = clean_text(text) if clean else " ".join(text.split())
+
+        if text:
             cleaned_blocks.append({
                 'id': b['block_id'],
                 'page': b['page'],
@@ -28,17 +157,32 @@ def create_evidence_store(blocks):
                 # We intentionally omit bbox/image data here to save context window size
                 # The 'id' links back to the original OCR result if we need visual highlighting later
             })
-            
-    # Calculate metadata
-    total_pages = 0
-    if blocks:
-        total_pages = max((b.get('page', 1) for b in blocks), default=1)
-        
+
+    if clean:
+        # Page numbers sit at the top or bottom of a page; a lone "2024" or
+        # "150" in the body is content and stays
+        cleaned_blocks, page_numbers_removed = remove_page_numbers(cleaned_blocks)
+    # Simple heuristic to skip noise or empty blocks
+    cleaned_blocks = [b for b in cleaned_blocks if len(b['text']) > 2]
+
+    metadata = {
+        'total_blocks': 0,
+        'total_pages': total_pages,
+        'source_validation': 'PaddleOCR-VL'
+    }
+    if clean:
+        cleaned_blocks, headers_removed = remove_repeated_edges(cleaned_blocks, total_pages)
+        cleaned_blocks, lines_joined = join_split_lines(cleaned_blocks)
+        for block in cleaned_blocks:
+            block['noise'] = noise_score(block['text'])
+        metadata['cleaning'] = {
+            'page_numbers_removed': page_numbers_removed,
+            'headers_footers_removed': headers_removed,
+            'lines_joined': lines_joined,
+        }
+    metadata['total_blocks'] = len(cleaned_blocks)
+
     return {
         'blocks': cleaned_blocks,
-        'metadata': {
-            'total_blocks': len(cleaned_blocks),
-            'total_pages': total_pages,
-            'source_validation': 'PaddleOCR-VL'
-        }
+        'metadata': metadata
     }
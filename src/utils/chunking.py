@@ -0,0 +1,129 @@
+"""Block-aware, token-budgeted chunking of evidence for the analyst map phase."""
+
+import math
+import re
+from typing import Any, Dict, List, Optional
+
+from src.config import Config
+
+# CJK ideographs, kana, hangul and full-width forms: roughly one token per character
+_CJK_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]')
+_PAGE_FROM_ID_RE = re.compile(r'^p(\d+)_')
+# Preferred split points when a single block exceeds the budget
+_BREAK_RE = re.compile(r'(?<=[.;:!?。；：！？])\s*|\s+')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap local token estimate: one token per CJK character, one per four
+    characters of everything else. Close enough to budget prompts without
+    calling the model's tokenizer.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+def _block_page(block: Dict[str, Any]) -> Optional[int]:
+    page = block.get('page')
+    if page is None:
+        match = _PAGE_FROM_ID_RE.match(str(block.get('id', '')))
+        page = int(match.group(1)) if match else None
+    return page
+
+def _split_text(text: str, budget: int) -> List[str]:
+    """Split one over-long block into pieces of at most `budget` tokens, at sentence/word breaks where possible."""
+    pieces = []
+    while estimate_tokens(text) > budget:
+        # Longest prefix under budget (tokens grow monotonically with length)
+        lo, hi = 1, len(text)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if estimate_tokens(text[:mid]) <= budget:
+                lo = mid
+            else:
+                hi = mid - 1
+        cut = lo
+        breaks = [m.end() for m in _BREAK_RE.finditer(text, 0, cut) if m.end() > cut // 2]
+        if breaks:
+            cut = breaks[-1]
+        pieces.append(text[:cut].strip())
+        text = text[cut:].lstrip()
+    if text:
+        pieces.append(text)
+    return pieces
+
+def chunk_blocks(blocks: List[Dict[str, Any]], max_tokens: Optional[int] = None,
+                 overlap_blocks: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Pack whole evidence blocks, as "[block_id] text" lines, into chunks of
+    at most `max_tokens` estimated tokens. Blocks are never cut unless a
+    single block is over budget on its own; its pieces then keep the block id.
+    The last `overlap_blocks` lines of a chunk are repeated at the start of
+    the next one.
+
+    Returns a list of dicts: text, tokens, block_ids, first_block, last_block,
+    first_page, last_page.
+    """
+    max_tokens = max_tokens or Config.ANALYST_CHUNK_TOKENS
+    overlap_blocks = Config.ANALYST_CHUNK_OVERLAP_BLOCKS if overlap_blocks is None else overlap_blocks
+
+    # (block_id, page, line, tokens) for every line to place
+    lines = []
+    for b in blocks:
+        block_id = b.get('id', 'N/A')
+        prefix = f"[{block_id}] "
+        text = b.get('text', '')
+        line = prefix + text
+        tokens = estimate_tokens(line)
+        if tokens <= max_tokens:
+            lines.append((block_id, _block_page(b), line, tokens))
+            continue
+        for piece in _split_text(text, max(max_tokens - estimate_tokens(prefix), 1)):
+            line = prefix + piece
+            lines.append((block_id, _block_page(b), line, estimate_tokens(line)))
+
+    chunks = []
+    current = []
+    current_tokens = 0
+    new_in_current = 0
+
+    def flush():
+        pages = [page for _, page, _, _ in current if page is not None]
+        chunks.append({
+            'text': "\n".join(line for _, _, line, _ in current),
+            'tokens': current_tokens,
+            'block_ids': list(dict.fromkeys(block_id for block_id, _, _, _ in current)),
+            'first_block': current[0][0],
+            'last_block': current[-1][0],
+            'first_page': min(pages) if pages else None,
+            'last_page': max(pages) if pages else None,
+        })
+
+    for entry in lines:
+        tokens = entry[3]
+        # +1 for the joining newline
+        if current and current_tokens + tokens + 1 > max_tokens and new_in_current:
+            flush()
+            carried = current[-overlap_blocks:] if overlap_blocks else []
+            # Drop carried lines that would leave no room for new content
+            while carried and sum(t for _, _, _, t in carried) + len(carried) + tokens > max_tokens:
+                carried = carried[1:]
+            current = list(carried)
+            current_tokens = sum(t for _, _, _, t in current) + max(len(current) - 1, 0)
+            new_in_current = 0
+        current_tokens += tokens + (1 if current else 0)
+        current.append(entry)
+        new_in_current += 1
+
+    if new_in_current:
+        flush()
+    return chunks
+
+def chunk_label(chunk: Dict[str, Any]) -> str:
+    """Human-readable range tag, e.g. 'pages 3-5 | blocks p3_b1..p5_b7'."""
+    parts = []
+    if chunk.get('first_page') is not None:
+        first, last = chunk['first_page'], chunk['last_page']
+        parts.append(f"page {first}" if first == last else f"pages {first}-{last}")
+    parts.append(f"blocks {chunk['first_block']}..{chunk['last_block']}")
+    return " | ".join(parts)
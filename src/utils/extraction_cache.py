@@ -0,0 +1,121 @@
+"""Content-addressed disk cache for document extraction results."""
+
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from loguru import logger
+
+from src.config import Config
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    """SHA-256 of a file's bytes, read in fixed-size chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ExtractionCache:
+    """
+    Stores extraction results as gzip-compressed compact JSON, one file per key.
+
+    Keys are SHA-256 digests of the PDF bytes plus the extractor settings, so
+    a renamed copy of a file still hits and any settings change misses.
+    Eviction is least-recently-used by total bytes on disk (file mtime is
+    refreshed on every hit).
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key_for(namespace: str, content_digest: str, settings: Dict[str, Any]) -> str:
+        """Key from an already computed content digest (e.g. a page fingerprint)."""
+        payload = json.dumps(settings, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(f"{namespace}|{content_digest}|{payload}".encode()).hexdigest()
+
+    @classmethod
+    def make_key(cls, pdf_path, settings: Dict[str, Any], namespace: str = "doc") -> str:
+        return cls.key_for(namespace, file_sha256(pdf_path), settings)
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logger.warning(f"Discarding unreadable cache entry {path.name}: {e}")
+            path.unlink(missing_ok=True)
+            self.misses += 1
+            return None
+        os.utime(path)  # LRU touch
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, evict: bool = True) -> None:
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial entry
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp, path)
+        except Exception:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        if evict:
+            self.evict()
+
+    def _entries(self):
+        if not self.root.exists():
+            return []
+        entries = []
+        for path in self.root.glob("*/*.json.gz"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def total_bytes(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Delete least-recently-used entries until the cache fits in max_bytes."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def purge(self) -> int:
+        """Delete every entry. Returns the number of entries removed."""
+        entries = self._entries()
+        for _, _, path in entries:
+            path.unlink(missing_ok=True)
+        return len(entries)
+
+def get_extraction_cache():
+    """Cache instance configured from Config (EXTRACTION_CACHE_DIR / _MAX_MB)."""
+    return ExtractionCache(Config.EXTRACTION_CACHE_DIR, Config.EXTRACTION_CACHE_MAX_MB * 1024 * 1024)
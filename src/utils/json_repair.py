@@ -0,0 +1,233 @@
+"""Local recovery of malformed JSON from LLM responses."""
+
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_FENCE_RE = re.compile(r"```[ \t]*(?:json|javascript|js)?[ \t]*\n?(.*?)(?:```|\Z)", re.DOTALL | re.IGNORECASE)
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_NUMBER_RE = re.compile(r"[-+0-9.eE]+")
+_PY_LITERALS = {'True': 'true', 'False': 'false', 'None': 'null'}
+_CLOSERS = {'{': '}', '[': ']'}
+# JSON starts tried when a response holds several bracketed spans
+_MAX_CANDIDATES = 20
+# Cut points tried (newest first) when a truncated response does not close cleanly
+_MAX_CUTS = 3
+# A response cut inside one of these words is truncated, not malformed
+_LITERAL_WORDS = ('true', 'false', 'null') + tuple(_PY_LITERALS)
+
+class JSONRepairError(ValueError):
+    """No JSON value could be recovered from the text."""
+
+def parse_json(text: Optional[str]) -> Tuple[Any, List[str]]:
+    """
+    Parse model output as JSON, repairing it locally when needed.
+
+    Handles code fences, JSON embedded in prose, trailing or doubled
+    commas, single-quoted strings, Python literals, bare keys, // comments
+    and truncated responses. A truncated response is cut back to its last
+    complete value: an array element the cut fell inside (an object missing
+    its later fields, a string or number that may be short) is dropped
+    whole, as is the last member of an object outside any array, and the
+    open containers are closed. When the text holds several JSON values,
+    the first complete object wins. Returns (value, actions), where actions
+    lists the repairs made ([] for valid JSON). Raises JSONRepairError
+    otherwise.
+    """
+    if text is None or not str(text).strip():
+        raise JSONRepairError("Empty response")
+    body = str(text).strip()
+    try:
+        return json.loads(body), []
+    except json.JSONDecodeError:
+        pass
+
+    actions: List[str] = []
+    if '```' in body:
+        match = _FENCE_RE.search(body)
+        if match and match.group(1).strip():
+            body = match.group(1).strip()
+            actions.append("stripped code fence")
+            try:
+                return json.loads(body), actions
+            except json.JSONDecodeError:
+                pass
+
+    # Several bracketed spans (e.g. "see [1]" before the object, or two
+    # objects in a row): prefer complete over truncated, objects over
+    # arrays, then the earliest
+    candidates = []
+    end = 0
+    starts = [i for i, ch in enumerate(body) if ch in _CLOSERS][:_MAX_CANDIDATES]
+    for start in starts:
+        if start < end:
+            continue
+        try:
+            value, end, repairs, truncated = _repair_from(body, start)
+        except JSONRepairError:
+            continue
+        candidates.append(((truncated, not isinstance(value, dict), start), end, value, repairs))
+    if not candidates:
+        raise JSONRepairError("No recoverable JSON found")
+
+    (_, _, start), end, value, repairs = min(candidates, key=lambda c: c[0])
+    if body[:start].strip() or body[end:].strip():
+        actions.append("extracted JSON from surrounding text")
+    return value, actions + repairs
+
+def _repair_from(text: str, start: int) -> Tuple[Any, int, List[str], bool]:
+    """
+    Rewrite the container opening at `start` as strict JSON; returns
+    (value, end offset, actions, truncated).
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    actions: List[str] = []
+    # (len(out), open containers) at each point where the innermost container
+    # could be closed: after it opens and after each of its complete values
+    cuts: List[Tuple[int, Tuple[str, ...]]] = []
+    truncated = False
+    cut_mid_token = False
+
+    def note(action):
+        if action not in actions:
+            actions.append(action)
+
+    i, n = start, len(text)
+    while i < n:
+        ch = text[i]
+        if ch in '"\'':
+            token, i, closed = _read_string(text, i)
+            if ch == "'":
+                note("converted single-quoted strings")
+            if not closed:
+                truncated = cut_mid_token = True
+                break
+            is_value = stack[-1] == '[' or out[-1] == ':'
+            out.append(token)
+            if is_value:
+                cuts.append((len(out), tuple(stack)))
+            continue
+        if ch in _CLOSERS:
+            stack.append(ch)
+            out.append(ch)
+            cuts.append((len(out), tuple(stack)))
+        elif ch in '}]':
+            if not stack or ch not in (_CLOSERS[o] for o in stack):
+                note("dropped unmatched closing bracket")
+                i += 1
+                continue
+            while _CLOSERS[stack[-1]] != ch:
+                out.append(_CLOSERS[stack.pop()])
+                note("closed mismatched brackets")
+            if out[-1] == ',':
+                out.pop()
+                note("removed trailing commas")
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                i += 1
+                break
+            cuts.append((len(out), tuple(stack)))
+        elif ch == ',':
+            if out[-1] in ',[{':
+                note("removed stray commas")
+            else:
+                cuts.append((len(out), tuple(stack)))
+                out.append(ch)
+        elif ch == ':':
+            out.append(ch)
+        elif ch.isspace():
+            pass
+        elif text.startswith('//', i):
+            end = text.find('\n', i)
+            i = n if end < 0 else end
+            note("removed comments")
+            continue
+        elif ch.isalpha() or ch == '_':
+            word = _WORD_RE.match(text, i).group(0)
+            i += len(word)
+            if word in _PY_LITERALS:
+                out.append(_PY_LITERALS[word])
+                cuts.append((len(out), tuple(stack)))
+                note("converted Python literals")
+            elif word in ('true', 'false', 'null'):
+                out.append(word)
+                cuts.append((len(out), tuple(stack)))
+            elif i == n and any(w.startswith(word) for w in _LITERAL_WORDS):
+                truncated = cut_mid_token = True
+                break
+            elif stack[-1] == '{' and out[-1] in '{,' and text[i:].lstrip().startswith(':'):
+                out.append(json.dumps(word))
+                note("quoted bare keys")
+            else:
+                raise JSONRepairError(f"Unexpected token {word!r}")
+            continue
+        elif ch in '-+.' or ch.isdigit():
+            number = _NUMBER_RE.match(text, i).group(0)
+            out.append(number)
+            i += len(number)
+            continue
+        else:
+            raise JSONRepairError(f"Unexpected character {ch!r}")
+        i += 1
+    else:
+        truncated = bool(stack)
+
+    if not truncated:
+        return _loads(out), i, actions, False
+
+    # Truncated: cut back to the last complete element of the outermost open
+    # array, or, when no array is open, to the last complete member of the
+    # innermost object that has one
+    open_stack = tuple(stack)
+    if '[' in open_stack:
+        level = open_stack[:open_stack.index('[') + 1]
+    else:
+        level = open_stack
+        while len(level) > 1 and out[_last_cut(cuts, level) - 1] == '{':
+            level = level[:-1]
+    note(f"closed {len(level)} truncated container(s)")
+    attempts = [length for length, cut_stack in cuts if cut_stack == level][::-1][:_MAX_CUTS]
+    for length in attempts:
+        body = out[:length]
+        if body[-1] == ',':
+            body = body[:-1]
+        try:
+            value = _loads(body + [_CLOSERS[o] for o in reversed(level)])
+        except JSONRepairError:
+            continue
+        if cut_mid_token or any(tok != ',' for tok in out[length:]):
+            note("dropped incomplete trailing element")
+        return value, n, actions, True
+    raise JSONRepairError("Truncated JSON could not be closed")
+
+def _last_cut(cuts: List[Tuple[int, Tuple[str, ...]]], level: Tuple[str, ...]) -> int:
+    return next(length for length, cut_stack in reversed(cuts) if cut_stack == level)
+
+def _read_string(text: str, i: int) -> Tuple[str, int, bool]:
+    """Read the string literal at `i`; returns (double-quoted JSON token, next offset, closed)."""
+    quote = text[i]
+    buf = []
+    j, n = i + 1, len(text)
+    while j < n:
+        c = text[j]
+        if c == '\\':
+            if j + 1 >= n:
+                break
+            nxt = text[j + 1]
+            buf.append("'" if nxt == "'" else c + nxt)
+            j += 2
+            continue
+        if c == quote:
+            return '"' + ''.join(buf) + '"', j + 1, True
+        buf.append('\\"' if c == '"' else c)
+        j += 1
+    return '"' + ''.join(buf) + '"', n, False
+
+def _loads(tokens: List[str]) -> Any:
+    try:
+        # strict=False: raw newlines and tabs inside strings are accepted
+        return json.loads(''.join(tokens), strict=False)
+    except json.JSONDecodeError as e:
+        raise JSONRepairError(str(e)) from e
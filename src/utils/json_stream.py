@@ -0,0 +1,104 @@
+"""Incremental JSON parsing of streamed LLM output."""
+
+from typing import Any, List, Optional, Tuple
+
+from loguru import logger
+
+from src.utils.json_repair import JSONRepairError, parse_json
+
+class JSONArrayStream:
+    """
+    Feed a JSON response chunk by chunk; every element of a top-level array,
+    or of an array that is a value of the top-level object, is returned as
+    soon as it closes.
+
+    feed('{"risks": [{"risk": "A"}, {"ri') -> [("risks", {"risk": "A"})]
+
+    Elements come back as (key, value) pairs, with key None for a top-level
+    array. Text before the first bracket (fences, prose) is skipped, and
+    elements go through parse_json, so single quotes and the like are
+    tolerated. Only string and bracket structure is tracked while scanning;
+    each element is parsed once, when it completes.
+    """
+    def __init__(self):
+        self.buf = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._quote = None      # open string delimiter, if inside a string
+        self._escape = False
+        self._stack: List[str] = []
+        self._last_string: Optional[str] = None  # last string seen in the top-level object (its key)
+        self._string_start = 0
+        self._key: Optional[str] = None
+        self._element_start: Optional[int] = None
+
+    def _target(self) -> bool:
+        """True when the innermost container is an array whose elements are emitted."""
+        return self._stack in (['['], ['{', '['])
+
+    def feed(self, chunk: str) -> List[Tuple[Optional[str], Any]]:
+        """Consume more text; returns the elements completed by it, in order."""
+        self.buf += chunk or ""
+        found = []
+        buf, stack = self.buf, self._stack
+        i = self._pos
+        while i < len(buf) and not self._done:
+            ch = buf[i]
+            if self._quote:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == self._quote:
+                    self._quote = None
+                    if stack == ['{']:
+                        self._last_string = buf[self._string_start + 1:i]
+            elif not self._started:
+                if ch in '{[':
+                    self._started = True
+                    stack.append(ch)
+                    if ch == '[':
+                        self._key = None
+            elif ch in '"\'':
+                self._quote = ch
+                self._string_start = i
+                self._begin_element(i)
+            elif ch in '{[':
+                self._begin_element(i)
+                stack.append(ch)
+                if ch == '[' and stack == ['{', '[']:
+                    self._key = self._last_string
+            elif ch in '}]':
+                if self._target():
+                    self._end_element(i, found)
+                if stack:
+                    stack.pop()
+                if not stack:
+                    self._done = True
+            elif ch == ',':
+                if self._target():
+                    self._end_element(i, found)
+            elif not ch.isspace():
+                self._begin_element(i)
+            i += 1
+        self._pos = i
+        return found
+
+    def _begin_element(self, i: int) -> None:
+        if self._target() and self._element_start is None:
+            self._element_start = i
+
+    def _end_element(self, i: int, found: list) -> None:
+        start, self._element_start = self._element_start, None
+        if start is None:
+            return
+        text = self.buf[start:i].strip()
+        try:
+            value, _ = parse_json(text) if text[:1] in '{[' else parse_json(f"[{text}]")
+        except JSONRepairError as e:
+            logger.debug(f"Skipping unparseable streamed element: {e}")
+            return
+        if text[:1] not in '{[':
+            value = value[0] if value else None
+        found.append((self._key, value))
@@ -0,0 +1,136 @@
+"""Persistent, content-addressed cache of LLM responses (SQLite)."""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from loguru import logger
+
+from src.config import Config
+
+# Responses starting with these are failures reported as text, never cached
+_ERROR_PREFIXES = ("Error executing task",)
+
+def is_cacheable(response) -> bool:
+    return isinstance(response, str) and bool(response.strip()) and not response.startswith(_ERROR_PREFIXES)
+
+class LLMCache:
+    """
+    Maps (model, system prompt, messages, sampling params) to the response text.
+
+    Entries expire after `ttl_seconds`; when the stored text exceeds
+    `max_bytes`, least-recently-used entries are evicted. One connection per
+    call keeps the cache safe to share between worker threads and processes.
+    """
+
+    def __init__(self, path, max_bytes, ttl_seconds):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+
+    @contextmanager
+    def _connect(self):
+        """A short-lived connection: commits (or rolls back) on exit and is always closed."""
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def make_key(model: str, system_prompt: Optional[str], messages: Any, **params) -> str:
+        payload = json.dumps(
+            {"model": model, "system": system_prompt, "messages": messages, "params": params},
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and self.ttl_seconds and now - row[1] > self.ttl_seconds:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row:
+                db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        with self._lock:
+            if row:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row[0] if row else None
+
+    def put(self, key: str, value: str) -> bool:
+        """Store a response. Returns False (and stores nothing) for error/empty responses."""
+        if not is_cacheable(value):
+            return False
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(db, now)
+        return True
+
+    def _evict(self, db, now):
+        if self.ttl_seconds:
+            db.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def __len__(self) -> int:
+        with self._connect() as db:
+            return db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def purge(self) -> int:
+        """Delete every entry. Returns the number of entries removed."""
+        with self._connect() as db:
+            return db.execute("DELETE FROM responses").rowcount
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """Shared cache configured from Config (LLM_CACHE_*), or None when disabled."""
+    if not Config.LLM_CACHE_ENABLED:
+        return None
+    with _CACHES_LOCK:
+        cache = _CACHES.get(Config.LLM_CACHE_PATH)
+        if cache is None:
+            try:
+                cache = LLMCache(
+                    Config.LLM_CACHE_PATH,
+                    Config.LLM_CACHE_MAX_MB * 1024 * 1024,
+                    Config.LLM_CACHE_TTL_HOURS * 3600,
+                )
+            except sqlite3.Error as e:
+                logger.warning(f"LLM cache unavailable ({e}); continuing without it")
+                return None
+            _CACHES[Config.LLM_CACHE_PATH] = cache
+        return cache
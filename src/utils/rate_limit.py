@@ -0,0 +1,55 @@
+"""Process-wide request rate limits for LLM providers."""
+
+import asyncio
+import threading
+import time
+from typing import Dict
+
+from src.config import Config
+
+class RateLimiter:
+    """
+    Spaces calls at least 60/requests_per_minute seconds apart, across all
+    threads. A limit of 0 (or less) disables the limiter.
+    """
+
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _reserve(self) -> float:
+        """Claim the next slot; returns how long the caller must wait for it."""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        return slot - now
+
+    def acquire(self) -> None:
+        """Block until this caller may send its request."""
+        if not self.interval:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        """Like acquire(), but yields to the event loop while waiting."""
+        if not self.interval:
+            return
+        delay = self._reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+_LIMITERS: Dict[str, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """Shared limiter for `provider`, configured from Config.<PROVIDER>_RPM."""
+    with _LIMITERS_LOCK:
+        limiter = _LIMITERS.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(getattr(Config, f"{provider.upper()}_RPM", 0))
+            _LIMITERS[provider] = limiter
+        return limiter
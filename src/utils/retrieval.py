@@ -0,0 +1,74 @@
+"""In-memory BM25 retrieval over evidence blocks."""
+
+import heapq
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional
+
+from src.config import Config
+
+# Latin words/numbers as whole tokens; CJK characters one token each
+_TOKEN_RE = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[^\W_]+')
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(text.lower()) if t not in _STOPWORDS]
+
+class BM25Index:
+    """
+    Okapi BM25 over evidence blocks ({'id', 'page', 'text', ...}).
+
+    Built once per document as an inverted index (term -> [(block, tf)]),
+    so a query only touches the postings of its own terms.
+    """
+
+    def __init__(self, blocks: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.blocks = list(blocks)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[tuple]] = defaultdict(list)
+        self.doc_len = []
+        for i, block in enumerate(self.blocks):
+            tokens = tokenize(str(block.get('text', '')))
+            self.doc_len.append(len(tokens))
+            for term, tf in Counter(tokens).items():
+                self.postings[term].append((i, tf))
+        n = len(self.blocks)
+        self.avg_len = (sum(self.doc_len) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+        # Per-block length normalisation, precomputed so queries only multiply and add
+        avg_len = self.avg_len or 1.0
+        self._norm = [k1 * (1 - b + b * length / avg_len) for length in self.doc_len]
+
+    def __len__(self) -> int:
+        return len(self.blocks)
+
+    def scores(self, query: str) -> Dict[int, float]:
+        """BM25 score of every block sharing at least one term with the query."""
+        scores: Dict[int, float] = defaultdict(float)
+        norm = self._norm
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            weight = idf * (self.k1 + 1)
+            for i, tf in self.postings[term]:
+                scores[i] += weight * tf / (tf + norm[i])
+        return scores
+
+    def search(self, query: str, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Top-k blocks for the query, best first, each with a 'score' key added."""
+        top_k = top_k or Config.RETRIEVAL_TOP_K
+        scores = self.scores(query)
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [dict(self.blocks[i], score=round(score, 4)) for i, score in best]
+
+def format_blocks(blocks: List[Dict[str, Any]]) -> str:
+    """Evidence lines in the pipeline's usual '[block_id] text' form."""
+    return "\n".join(f"[{b.get('id', 'N/A')}] {b.get('text', '')}" for b in blocks)
@@ -0,0 +1,260 @@
+"""Declarative YAML rule packs compiled into a single-pass matcher over evidence blocks."""
+
+import hashlib
+import re
+import threading
+from bisect import bisect_right
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set
+
+import yaml
+from loguru import logger
+
+# CPython's regex parser is private and may change between versions; without
+# it (or if its output changes shape) regex rules simply get no anchor
+try:
+    import re._parser as _sre_parse  # Python 3.11+
+    from re._constants import LITERAL as _LITERAL
+except ImportError:
+    try:
+        import sre_parse as _sre_parse
+        from sre_constants import LITERAL as _LITERAL
+    except ImportError:
+        _sre_parse = _LITERAL = None
+
+from src.docupilot.agents.base import RiskFinding
+from src.docupilot.agents.scanner import PhraseMatcher, fold_case
+
+_MIN_ANCHOR = 3
+_QUOTE_CONTEXT = 60
+
+class RuleError(ValueError):
+    """A rule pack is malformed."""
+
+class Rule:
+    """
+    One compiled rule.
+
+    kind 'keyword' fires when any of its phrases occurs (case-insensitive),
+    'regex' when its pattern matches, 'absence' when none of its phrases
+    occurs anywhere in the document.
+    """
+    def __init__(self, rule_id, kind, severity, category, title, description,
+                 recommendation, phrases=(), regex=None):
+        self.id = rule_id
+        self.kind = kind
+        self.severity = severity
+        self.category = category
+        self.title = title
+        self.description = description
+        self.recommendation = recommendation
+        self.phrases = [fold_case(p) for p in phrases]
+        self.regex = regex
+        self.anchor = _regex_anchor(regex.pattern) if regex is not None else None
+
+def _regex_anchor(pattern: str) -> Optional[str]:
+    """
+    Longest literal run a regex match must contain, case-folded, or None.
+
+    Runs are read from the parsed pattern, so escapes (\\x41, \\u00e9,
+    \\N{...}, octal) resolve to the characters they match. Only top-level
+    LITERAL nodes count: anything quantified, grouped, alternated or a class
+    ends a run, since no single literal is guaranteed there. Without a
+    usable parser the rule has no anchor and runs on every block.
+    """
+    if _sre_parse is None:
+        return None
+    try:
+        runs, run = [], []
+        for op, arg in _sre_parse.parse(pattern):
+            if op == _LITERAL:
+                run.append(chr(arg))
+                continue
+            # e.g. "fees{,2}": the quantified "s" may be absent, so the run stops at "fee"
+            runs.append("".join(run))
+            run = []
+        runs.append("".join(run))
+    except Exception:
+        # re.error, or parser internals that no longer look like this
+        return None
+    runs = [r for r in runs if len(r) >= _MIN_ANCHOR]
+    return fold_case(max(runs, key=len)) if runs else None
+
+def _severity(value) -> int:
+    """Rule severities may be 1-5 (as in data/samples/rules.yaml) or 0-100."""
+    value = float(value)
+    return int(value * 20) if value <= 5 else int(min(value, 100))
+
+class RuleSet:
+    """
+    All rules of a pack behind one combined Aho-Corasick matcher.
+
+    Keyword and absence phrases, and a literal anchor of each regex, are
+    found in a single pass over the evidence; a regex is only run on blocks
+    where its anchor occurs (or on every block when it has no anchor).
+    Cost therefore grows with document size and hit count, not rule count.
+    """
+    def __init__(self, rules: List[Rule], name: str = "rules"):
+        self.rules = rules
+        self.name = name
+        self._by_phrase: Dict[str, List[Rule]] = defaultdict(list)
+        self._unanchored: Set[Rule] = set()
+        for rule in rules:
+            if rule.kind == 'regex':
+                if rule.anchor:
+                    self._by_phrase[rule.anchor].append(rule)
+                else:
+                    self._unanchored.add(rule)
+            else:
+                for phrase in rule.phrases:
+                    self._by_phrase[phrase].append(rule)
+        self.matcher = PhraseMatcher(self._by_phrase)
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def evaluate(self, blocks: List[Dict[str, Any]], max_evidence: int = 3) -> List[RiskFinding]:
+        """Evaluate every rule over evidence blocks ({'id', 'page', 'text'}) in one pass."""
+        texts = [str(b.get('text', '') or '') for b in blocks]
+        starts, offset = [], 0
+        for t in texts:
+            starts.append(offset)
+            offset += len(t) + 1
+        raw = "\n".join(texts)
+        # Length-preserving, so match offsets in the blob index `raw` too
+        blob = fold_case(raw)
+
+        def evidence(block_idx, start, length):
+            base = starts[block_idx]
+            lo = max(base, base + start - _QUOTE_CONTEXT)
+            hi = min(base + len(texts[block_idx]), base + start + length + _QUOTE_CONTEXT)
+            block = blocks[block_idx]
+            return {"block_id": block.get('id'), "page": block.get('page'), "quote": raw[lo:hi].strip()}
+
+        hits: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        present = set()
+        regex_blocks: Dict[str, set] = defaultdict(set)
+        for pos, phrase in self.matcher.iter_matches(blob):
+            i = bisect_right(starts, pos) - 1
+            for rule in self._by_phrase[phrase]:
+                if rule.kind == 'regex':
+                    regex_blocks[rule.id].add(i)
+                elif rule.kind == 'absence':
+                    present.add(rule.id)
+                elif len(hits[rule.id]) < max_evidence:
+                    hits[rule.id].append(evidence(i, pos - starts[i], len(phrase)))
+
+        for rule in self.rules:
+            if rule.kind != 'regex':
+                continue
+            candidates = range(len(texts)) if rule in self._unanchored else sorted(regex_blocks.get(rule.id, ()))
+            for i in candidates:
+                for m in rule.regex.finditer(texts[i]):
+                    hits[rule.id].append(evidence(i, m.start(), m.end() - m.start()))
+                    if len(hits[rule.id]) >= max_evidence:
+                        break
+                if len(hits[rule.id]) >= max_evidence:
+                    break
+
+        findings = []
+        for rule in self.rules:
+            if rule.kind == 'absence':
+                if rule.id in present:
+                    continue
+                ev = []
+            elif hits.get(rule.id):
+                ev = hits[rule.id]
+            else:
+                continue
+            findings.append(RiskFinding(
+                category=rule.category,
+                title=rule.title,
+                severity=rule.severity,
+                rationale=rule.description,
+                evidence=ev,
+                recommendation=rule.recommendation,
+            ))
+        return findings
+
+def compile_rules(spec: Dict[str, Any], name: str = "rules") -> RuleSet:
+    """
+    Compile a rule pack. Supported keys:
+
+    red_flags: [{pattern, severity, description, category, recommendation?, regex?}]
+        Keyword (or, with `regex: true`, regex) triggers.
+    required_sections: [name, ...]
+        Absence checks; the text before any "(...)" is searched for.
+    rules: [{id?, type: keyword|regex|absence, pattern | patterns, severity,
+             category?, title?, description?, recommendation?}]
+        The general form.
+    """
+    if not isinstance(spec, dict):
+        raise RuleError("Rule pack must be a mapping")
+    rules: List[Rule] = []
+
+    def add(entry, kind, default_id):
+        if not isinstance(entry, dict):
+            raise RuleError(f"Rule {default_id} must be a mapping")
+        patterns = entry.get('patterns') or ([entry['pattern']] if entry.get('pattern') else [])
+        if not patterns:
+            raise RuleError(f"Rule {entry.get('id', default_id)} has no pattern")
+        rule_id = str(entry.get('id', default_id))
+        description = entry.get('description', '')
+        regex = None
+        if kind == 'regex':
+            try:
+                regex = re.compile(patterns[0], re.IGNORECASE)
+            except re.error as e:
+                raise RuleError(f"Rule {rule_id}: invalid regex {patterns[0]!r}: {e}") from e
+        rules.append(Rule(
+            rule_id, kind,
+            severity=_severity(entry.get('severity', 3)),
+            category=entry.get('category', 'rules'),
+            title=entry.get('title') or (f"Missing: {patterns[0]}" if kind == 'absence' else f"Red flag: {patterns[0]}"),
+            description=description,
+            recommendation=entry.get('recommendation', ''),
+            phrases=patterns if kind != 'regex' else (),
+            regex=regex,
+        ))
+
+    for n, entry in enumerate(spec.get('red_flags') or []):
+        add(entry, 'regex' if isinstance(entry, dict) and entry.get('regex') else 'keyword', f"red_flag_{n}")
+    for n, section in enumerate(spec.get('required_sections') or []):
+        phrase = str(section).split('(')[0].strip() or str(section)
+        add({
+            'pattern': phrase,
+            'severity': 3,
+            'category': 'Missing Section',
+            'title': f"Required section not found: {section}",
+            'description': f"No text matching the required section '{section}' was found.",
+            'recommendation': f"Confirm the document includes '{section}'.",
+        }, 'absence', f"required_section_{n}")
+    for n, entry in enumerate(spec.get('rules') or []):
+        kind = entry.get('type', 'keyword') if isinstance(entry, dict) else None
+        if kind not in ('keyword', 'regex', 'absence'):
+            raise RuleError(f"Rule {n}: unknown type {kind!r}")
+        add(entry, kind, f"rule_{n}")
+
+    return RuleSet(rules, name=spec.get('rule_set', name))
+
+_COMPILED: Dict[str, RuleSet] = {}
+_COMPILED_LOCK = threading.Lock()
+
+def load_rules(path) -> RuleSet:
+    """Load and compile a YAML rule pack; compiled packs are cached by file hash."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha256(data).hexdigest()
+    with _COMPILED_LOCK:
+        cached = _COMPILED.get(digest)
+    if cached is not None:
+        return cached
+    try:
+        spec = yaml.safe_load(data)
+    except yaml.YAMLError as e:
+        raise RuleError(f"Invalid YAML in {path}: {e}") from e
+    rule_set = compile_rules(spec, name=str(path))
+    logger.info(f"Compiled {len(rule_set)} rule(s) from {path}")
+    with _COMPILED_LOCK:
+        _COMPILED[digest] = rule_set
+    return rule_set
@@ -8,11 +8,15 @@ def start_app():
     # 1. Start Streamlit in the background with Native Port 8000
     print(f"🚀 Starting Streamlit App via {sys.executable} on Port 8000...")
     
+    # The app process owns the OCR engine pool; have it preload the models on boot
+    app_env = dict(os.environ, OCR_WARMUP="true")
+    
     # NOVITA NATIVE PORT IS 8000
     streamlit_process = subprocess.Popen(
         [sys.executable, "-m", "streamlit", "run", "src/app.py", "--server.port", "8000", "--server.address", "0.0.0.0", "--server.headless", "true"],
         stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
+        stderr=subprocess.PIPE,
+        env=app_env
     )
     
     # Wait a moment for Streamlit to boot
@@ -65,3 +65,300 @@ def test_orchestrator_pipeline():
         assert isinstance(results, dict)
         assert 'report' in results
         assert 'risks' in results
+
+def test_analyze_chunks_runs_concurrently_and_keeps_order():
+    """Map phase overlaps chunk calls but returns results in chunk order."""
+    import threading
+    import time
+    from src.agents.orchestrator import analyze_chunks
+    
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+    
+    class SlowAnalyst:
+        def analyze(self, text):
+            with lock:
+                in_flight.append(text)
+                peak.append(len(in_flight))
+            # Earlier parts finish last
+            part = int(text.split()[1])
+            time.sleep(0.05 * (5 - part))
+            with lock:
+                in_flight.remove(text)
+            return {"part": part}
+    
+    statuses = []
+    caller = threading.current_thread()
+    def status(msg):
+        assert threading.current_thread() is caller
+        statuses.append(msg)
+    
+    results = analyze_chunks(SlowAnalyst(), ["a", "b", "c", "d"], status, max_workers=4)
+    
+    assert [r["part"] for r in results] == [1, 2, 3, 4]
+    assert max(peak) > 1
+    assert statuses[-1].endswith("Processed Part 4/4...")
+
+def test_rate_limiter_spaces_calls():
+    import time
+    from src.utils.rate_limit import RateLimiter
+    
+    limiter = RateLimiter(requests_per_minute=1200)  # one call per 50 ms
+    started = time.monotonic()
+    for _ in range(4):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.15
+
+def test_risk_roles_run_in_parallel_and_report_failures_per_role():
+    import time
+    from src.agents.orchestrator import assess_risk_roles
+    
+    class FakeRiskAgent:
+        def assess_risk(self, analysis_text, role=None, evidence_text=None):
+            time.sleep(0.1)
+            if role == "Legal Expert":
+                raise RuntimeError("timeout")
+            if role == "Reputation Analyst":
+                return []  # unparseable response
+            return {"risks": [{"risk": f"{role} risk", "severity": 5}]}
+    
+    roles = ["Compliance Analyst", "Financial Reviewer", "Legal Expert", "Reputation Analyst"]
+    started = time.monotonic()
+    failed = []
+    result = assess_risk_roles(FakeRiskAgent(), "analysis", roles, lambda msg: None,
+                               on_role_failed=lambda role, error: failed.append(role))
+    
+    assert time.monotonic() - started < 0.3
+    assert [r["risk"] for r in result["risks"]] == ["Compliance Analyst risk", "Financial Reviewer risk"]
+    assert list(result["roles"]) == roles
+    assert result["roles"]["Financial Reviewer"] == {"status": "ok", "risks": 1}
+    assert result["roles"]["Legal Expert"]["status"] == "failed"
+    assert result["roles"]["Reputation Analyst"]["status"] == "failed"
+    # Failed roles are reported as they finish, so streamed risks can be withdrawn
+    assert sorted(failed) == ["Legal Expert", "Reputation Analyst"]
+
+def _start_chat_stand_in():
+    """OpenAI-style chat endpoint on localhost (keep-alive) that echoes the task and records its peers."""
+    import json
+    import threading
+    import time
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    
+    state = {"active": 0, "peak": 0, "ports": set()}
+    lock = threading.Lock()
+    
+    class ChatStandIn(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive
+        
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                state["ports"].add(self.client_address[1])
+            time.sleep(0.05)
+            with lock:
+                state["active"] -= 1
+            task = payload["messages"][0]["content"]
+            body = json.dumps({"choices": [{"message": {"content": f"echo {task}"}}]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/chat", state
+
+def test_async_llm_shares_pooled_client_and_caps_concurrency(monkeypatch):
+    """Concurrent async calls reuse keep-alive connections and respect LLM_MAX_CONCURRENCY."""
+    import asyncio
+    from src.config import Config
+    from src.docupilot.models.llm_adapter import AsyncChatLLM, aclose_async_client
+    
+    server, url, state = _start_chat_stand_in()
+    monkeypatch.setattr(Config, "LLM_MAX_CONCURRENCY", 2)
+    
+    async def main():
+        llm = AsyncChatLLM(api_key="k", base_url=url, model="ernie-3.5")
+        try:
+            return await asyncio.gather(*(llm.chat([{"role": "user", "content": f"task {i}"}]) for i in range(8)))
+        finally:
+            await aclose_async_client()
+    
+    try:
+        results = asyncio.run(main())
+    finally:
+        server.shutdown()
+    
+    assert results == [f"echo task {i}" for i in range(8)]
+    assert state["peak"] == 2
+    assert len(state["ports"]) <= 2
+
+def test_pipeline_agents_share_one_event_loop_and_pool(monkeypatch):
+    """With ERNIE_BASE_URL, the map phase's threaded calls all run on the shared loop's pooled client."""
+    from src.config import Config
+    from src.agents.analyst import AnalystAgent
+    from src.agents.orchestrator import analyze_chunks
+    
+    server, url, state = _start_chat_stand_in()
+    monkeypatch.setattr(Config, "ERNIE_BASE_URL", url)
+    monkeypatch.setattr(Config, "ERNIE_API_KEY", "k")
+    monkeypatch.setattr(Config, "LLM_MAX_CONCURRENCY", 2)
+    seen = []
+    try:
+        analyst = AnalystAgent()
+        with patch.object(AnalystAgent, 'analyze', lambda self, text: seen.append(self.run(text)) or {}):
+            analyze_chunks(analyst, [f"chunk {i}" for i in range(6)], lambda msg: None, max_workers=6)
+    finally:
+        server.shutdown()
+    
+    assert len(seen) == 6 and all(r.startswith("echo System Instruction:") for r in seen)
+    # Six worker threads, one loop: the loop's concurrency cap and connection pool apply to all of them
+    assert state["peak"] == 2
+    assert len(state["ports"]) <= 2
+
+def test_chat_llm_reuses_one_connection():
+    from src.docupilot.models.llm_adapter import ChatLLM
+    
+    server, url, state = _start_chat_stand_in()
+    try:
+        llm = ChatLLM(api_key="k", base_url=url, model="ernie-3.5")
+        results = [llm.chat([{"role": "user", "content": f"task {i}"}]) for i in range(3)]
+    finally:
+        server.shutdown()
+    
+    assert results == [f"echo task {i}" for i in range(3)]
+    assert len(state["ports"]) == 1
+
+def test_ingestion_uses_compact_chunks_and_merges_by_id():
+    from src.agents.ingestion import IngestionAgent
+    
+    blocks = [{'id': f"p1_b{i}", 'page': 1, 'text': f"clause  {i} | term", 'type': 'text'} for i in range(12)]
+    prompts = []
+    
+    def fake_run(message):
+        prompts.append(message)
+        lines = message.split("\n\n", 1)[1].splitlines()
+        # Upper-case every block except p1_b3, which the agent "drops"
+        return "\n".join(l.upper().replace("P1_B", "p1_b") for l in lines if not l.startswith("p1_b3|"))
+    
+    with patch.object(IngestionAgent, 'run', side_effect=fake_run):
+        agent = IngestionAgent()
+        cleaned = agent.process(blocks, max_tokens=30)
+    
+    assert len(prompts) > 1
+    assert "p1_b0|1|clause 0 | term" in prompts[0]
+    assert [b['id'] for b in cleaned] == [b['id'] for b in blocks]
+    assert cleaned[0]['text'] == "CLAUSE 0 | TERM" and cleaned[0]['type'] == 'text'
+    assert cleaned[3]['text'] == blocks[3]['text']
+    assert agent.last_stats['tokens_saved'] > 0
+    assert agent.last_stats['chunks'] == len(prompts)
+
+def test_verifier_checks_each_claim_against_retrieved_evidence():
+    from src.agents.verifier import VerifierAgent
+    from src.utils.retrieval import BM25Index
+    
+    blocks = [{'id': f"p{i}_b0", 'page': i, 'text': f"Filler clause number {i} about general matters."} for i in range(1, 40)]
+    blocks.append({'id': 'p40_b0', 'page': 40, 'text': "The Buyer must pay a late fee of 5% per month."})
+    index = BM25Index(blocks)
+    report = (
+        "## Summary\n"
+        "- The Buyer must pay a late fee of 5% per month [p40_b0].\n"
+        "- The Seller owns the moon outright.\n"
+        "- Filler clause number 3 covers general matters."
+    )
+    prompts = []
+    
+    def fake_run(message):
+        prompts.append(message)
+        verdicts = []
+        for n, chunk in enumerate(message.split("CLAIM ")[1:], start=1):
+            if "late fee" in chunk:
+                assert "[p40_b0] The Buyer must pay a late fee" in chunk
+                verdicts.append(f"{n}|supported|")
+            elif "moon" in chunk:
+                verdicts.append(f"{n}|unsupported|")
+            else:
+                verdicts.append(f"{n}|weak|Clause 3 covers general matters [p3_b0].")
+        return "\n".join(verdicts)
+    
+    with patch.object(VerifierAgent, 'run', side_effect=fake_run):
+        agent = VerifierAgent()
+        verified = agent.verify_claims(report, index, top_k=2, batch_size=2)
+    
+    assert len(prompts) == 2
+    assert verified.splitlines() == [
+        "## Summary",
+        "- The Buyer must pay a late fee of 5% per month [p40_b0].",
+        "- Clause 3 covers general matters [p3_b0].",
+    ]
+    assert [c.verdict for c in agent.last_claims] == ["supported", "unsupported", "weak"]
+
+def test_chat_llm_streams_server_sent_events():
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from src.docupilot.models.llm_adapter import ChatLLM
+    
+    # Non-ASCII text arrives as raw UTF-8 bytes, with no charset on the content type
+    pieces = ['{"sections": [', '{"number": "1"}', ', {"number": "2", "text": "违约金 €500 — due"}', ']}']
+    
+    class StreamStandIn(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            assert payload["stream"] is True
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for piece in pieces:
+                event = {"choices": [{"delta": {"content": piece}}]}
+                self.wfile.write(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        
+        def log_message(self, *args):
+            pass
+    
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StreamStandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        llm = ChatLLM(api_key="k", base_url=f"http://127.0.0.1:{server.server_address[1]}/chat", model="ernie-3.5")
+        deltas = []
+        content = llm.chat([{"role": "user", "content": "hi"}], on_delta=deltas.append)
+        elements = []
+        llm.chat([{"role": "user", "content": "hi"}], on_element=lambda key, value: elements.append((key, value)))
+    finally:
+        server.shutdown()
+    
+    assert deltas == pieces
+    assert content == "".join(pieces)
+    assert elements == [("sections", {"number": "1"}), ("sections", {"number": "2", "text": "违约金 €500 — due"})]
+
+def test_risk_agent_reports_each_risk_as_it_streams():
+    from src.agents.risk import RiskAgent
+    
+    pieces = ['```json\n{"risks": [{"risk": "Late', ' fee", "severity": 6}, ', '{"risk": "Auto-renewal"', ', "severity": 4}]}\n```']
+    streamed = []
+    
+    def chunks():
+        for i, piece in enumerate(pieces):
+            chunk = MagicMock()
+            chunk.get_result.return_value = piece
+            yield chunk
+            # Each risk is reported before the rest of the response arrives
+            streamed.append((i, len(seen)))
+    
+    seen = []
+    with patch('erniebot.ChatCompletion.create', return_value=chunks()) as mock_create:
+        result = RiskAgent().assess_risk("analysis", role="Legal Expert", on_risk=seen.append)
+    
+    assert mock_create.call_args.kwargs["stream"] is True
+    assert seen == [{"risk": "Late fee", "severity": 6}, {"risk": "Auto-renewal", "severity": 4}]
+    assert streamed == [(0, 0), (1, 1), (2, 1), (3, 2)]
+    assert result == {"risks": seen}
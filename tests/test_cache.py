@@ -0,0 +1,183 @@
+import pytest
+import sys
+import os
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.utils.extraction_cache import ExtractionCache
+
+def _write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+def test_cache_key_is_content_addressed(tmp_path):
+    """Same bytes under a different name hit; different settings miss."""
+    a = _write(tmp_path / "a.pdf", b"%PDF-1.4 same bytes")
+    b = _write(tmp_path / "renamed.pdf", b"%PDF-1.4 same bytes")
+    
+    assert ExtractionCache.make_key(a, {'dpi': 200}) == ExtractionCache.make_key(b, {'dpi': 200})
+    assert ExtractionCache.make_key(a, {'dpi': 200}) != ExtractionCache.make_key(a, {'dpi': 300})
+
+def test_cache_roundtrip_and_lru_eviction(tmp_path):
+    cache = ExtractionCache(tmp_path / "cache", max_bytes=10**9)
+    blocks = [{'block_id': f"p1_b{i}", 'page': 1, 'text': f"clause {i} " * 20} for i in range(50)]
+    
+    assert cache.get("k1") is None
+    cache.put("k1", {'blocks': blocks})
+    assert cache.get("k1")['blocks'] == blocks
+    assert (cache.hits, cache.misses) == (1, 1)
+    
+    # Fill past a small budget: the least recently used entry goes first
+    entry_size = cache.total_bytes()
+    cache.max_bytes = entry_size * 2
+    cache.put("k2", {'blocks': blocks[::-1]})
+    time.sleep(0.01)
+    cache.get("k1")  # refresh k1 so k2 becomes the LRU entry
+    cache.put("k3", {'blocks': blocks[:10]})
+    
+    assert cache.get("k2") is None
+    assert cache.get("k1") is not None
+    assert cache.total_bytes() <= cache.max_bytes
+
+def test_iter_document_serves_repeat_runs_from_cache(tmp_path, monkeypatch):
+    import src.ocr as ocr
+    monkeypatch.setattr(Config, "EXTRACTION_CACHE_DIR", str(tmp_path / "cache"))
+    pdf_path = _write(tmp_path / "doc.pdf", b"%PDF-1.4 cached document")
+    
+    calls = []
+    def fake_extract(path, stats, page_cache=None):
+        calls.append(path)
+        stats.update({'total_pages': 1, 'native_pages': 1, 'ocr_pages': 0})
+        yield {'block_id': 'p1_b0', 'page': 1, 'type': 'text', 'text': 'Cached clause', 'bbox': []}
+    monkeypatch.setattr(ocr, "_iter_extract", fake_extract)
+    
+    first_stats, second_stats = {}, {}
+    first = ocr.extract_document(pdf_path, stats=first_stats, use_cache=True)
+    second = ocr.extract_document(pdf_path, stats=second_stats, use_cache=True)
+    
+    assert first == second
+    assert len(calls) == 1
+    assert first_stats['cache'] == 'stored' and second_stats['cache'] == 'hit'
+
+def test_amended_document_only_reextracts_changed_pages(tmp_path, monkeypatch):
+    """Unchanged pages are replayed from the page cache and re-numbered in place."""
+    fitz = pytest.importorskip("fitz")
+    import src.ocr as ocr
+    monkeypatch.setattr(Config, "EXTRACTION_CACHE_DIR", str(tmp_path / "cache"))
+    
+    def build(name, clauses):
+        doc = fitz.open()
+        for clause in clauses:
+            doc.new_page().insert_text((72, 72), clause)
+        path = str(tmp_path / name)
+        doc.save(path)
+        doc.close()
+        return path
+    
+    original = ["1. Term of five years applies.", "2. Fees are payable within 30 days.", "3. Governing law is Delaware."]
+    amended = ["0. Cover letter summarising the redline."] + original[:1] + ["2. Fees are payable within 60 days."] + original[2:]
+    
+    extracted_pages = []
+    real_native = ocr.extract_native_text
+    def spy_native(path, page_numbers=None, max_workers=None):
+        extracted_pages.append(list(page_numbers))
+        return real_native(path, page_numbers=page_numbers, max_workers=max_workers)
+    monkeypatch.setattr(ocr, "extract_native_text", spy_native)
+    # Every page is "native" here; route everything without OCR
+    monkeypatch.setattr(Config, "OCR_MIN_PAGE_CHARS", 1)
+    
+    ocr.extract_document(build("v1.pdf", original), use_cache=True)
+    stats = {}
+    blocks = ocr.extract_document(build("v2.pdf", amended), stats=stats, use_cache=True)
+    
+    assert extracted_pages == [[1, 2, 3], [1, 3]]
+    assert stats['changed_pages'] == [1, 3] and stats['reused_pages'] == 2
+    by_id = {b['block_id']: b for b in blocks}
+    assert by_id['p2_b0']['text'] == original[0] and by_id['p2_b0']['page'] == 2
+    assert by_id['p4_b0']['text'] == original[2]
+    assert [b['page'] for b in blocks] == [1, 2, 3, 4]
+
+def test_fingerprint_covers_form_xobjects():
+    """Pages that only draw a Form XObject differ when the form's content does."""
+    fitz = pytest.importorskip("fitz")
+    from src.ocr import page_fingerprints
+    
+    def wrapped(days):
+        source = fitz.open()
+        source.new_page().insert_text((72, 72), f"Fees are payable within {days} days.")
+        doc = fitz.open()
+        doc.new_page().show_pdf_page(doc[0].rect, source, 0)
+        return doc
+    
+    thirty, ninety = wrapped(30), wrapped(90)
+    # Identical content streams: only the referenced form differs
+    assert thirty[0].read_contents() == ninety[0].read_contents()
+    assert page_fingerprints(thirty) != page_fingerprints(ninety)
+    assert page_fingerprints(thirty) == page_fingerprints(wrapped(30))
+
+def test_llm_cache_ttl_eviction_and_error_responses(tmp_path):
+    from src.utils.llm_cache import LLMCache
+    
+    cache = LLMCache(tmp_path / "llm.sqlite", max_bytes=10, ttl_seconds=3600)
+    key = LLMCache.make_key("ernie-3.5", "sys", "hello", temperature=0.3)
+    assert key != LLMCache.make_key("ernie-3.5", "sys", "hello", temperature=0.7)
+    
+    assert cache.get(key) is None
+    assert cache.put(key, "12345")
+    assert cache.get(key) == "12345"
+    assert (cache.hits, cache.misses) == (1, 1)
+    
+    # Error strings are never stored
+    assert not cache.put("other", "Error executing task: API Down")
+    assert cache.get("other") is None
+    
+    # Over budget: the least recently used entry goes
+    cache.put("k2", "abcdef")
+    assert cache.get(key) is None and cache.get("k2") == "abcdef"
+    
+    cache.ttl_seconds = 0.001
+    time.sleep(0.01)
+    assert cache.get("k2") is None
+
+def test_base_agent_reuses_cached_response(tmp_path, monkeypatch):
+    from unittest.mock import MagicMock, patch
+    from src.agents.base import BaseAgent
+    
+    monkeypatch.setattr(Config, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(Config, "LLM_CACHE_PATH", str(tmp_path / "llm.sqlite"))
+    response = MagicMock()
+    response.get_result.return_value = '{"ok": true}'
+    
+    with patch('erniebot.ChatCompletion.create', return_value=response) as create:
+        agent = BaseAgent(name="CachedAgent", role="Tester")
+        assert agent.run("Same task") == '{"ok": true}'
+        assert agent.run("Same task") == '{"ok": true}'
+        assert create.call_count == 1
+        
+        create.side_effect = Exception("API Down")
+        assert "Error executing task" in agent.run("New task")
+        assert "Error executing task" in agent.run("New task")
+        assert create.call_count == 3
+
+def test_llm_cache_closes_its_connections(tmp_path, monkeypatch):
+    import sqlite3
+    import src.utils.llm_cache as llm_cache
+    
+    opened = []
+    real_connect = sqlite3.connect
+    def tracking_connect(*args, **kwargs):
+        opened.append(real_connect(*args, **kwargs))
+        return opened[-1]
+    monkeypatch.setattr(llm_cache.sqlite3, "connect", tracking_connect)
+    
+    cache = llm_cache.LLMCache(tmp_path / "llm.sqlite", max_bytes=1000, ttl_seconds=3600)
+    cache.put("k", "value")
+    assert cache.get("k") == "value"
+    assert len(cache) == 1 and cache.purge() == 1
+    
+    assert len(opened) == 5
+    for db in opened:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1")
@@ -0,0 +1,42 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.chunking import chunk_blocks, chunk_label, estimate_tokens
+
+def _blocks(n, page_size=5, text="The parties agree to the terms set out below."):
+    return [{'id': f"p{i // page_size + 1}_b{i % page_size}", 'page': i // page_size + 1, 'text': text} for i in range(n)]
+
+def test_estimate_tokens_counts_cjk_per_character():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcdefgh") == 2
+    assert estimate_tokens("合同条款") == 4
+
+def test_chunks_pack_whole_blocks_within_budget():
+    blocks = _blocks(23)
+    chunks = chunk_blocks(blocks, max_tokens=60, overlap_blocks=0)
+    
+    assert all(c['tokens'] <= 60 for c in chunks)
+    # Every block appears exactly once, in order, as a whole "[id] text" line
+    lines = [line for c in chunks for line in c['text'].split("\n")]
+    assert lines == [f"[{b['id']}] {b['text']}" for b in blocks]
+    assert chunks[0]['first_block'] == "p1_b0" and chunks[-1]['last_block'] == "p5_b2"
+    assert chunks[-1]['last_page'] == 5
+
+def test_overlap_repeats_trailing_blocks():
+    chunks = chunk_blocks(_blocks(10), max_tokens=60, overlap_blocks=1)
+    
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert nxt['block_ids'][0] == prev['block_ids'][-1]
+    assert chunks[-1]['last_block'] == "p2_b4"
+
+def test_oversized_block_is_split_but_keeps_its_id():
+    long_block = {'id': 'p2_b3', 'text': "Clause one applies. " * 50}
+    chunks = chunk_blocks([long_block], max_tokens=40)
+    
+    assert len(chunks) > 1
+    assert all(c['text'].startswith("[p2_b3] ") and c['tokens'] <= 40 for c in chunks)
+    # Page recovered from the block id when the block has no page field
+    assert chunk_label(chunks[0]) == "page 2 | blocks p2_b3..p2_b3"
@@ -0,0 +1,47 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.docupilot.agents.scanner import PhraseMatcher, DocumentView
+from src.docupilot.pipeline.risk_orchestrator import CAMELStyleOrchestrator
+
+DOC = {
+    "sections": [
+        {"heading": "Fees", "number": "4", "text": "Invoices are due in 30 days. A Late Fee of 2% applies."},
+        {"heading": "Privacy", "number": "7", "text": "Each party complies with GDPR."},
+        {"heading": "Exit", "number": "12", "text": "Termination for convenience on 90 days notice."},
+    ]
+}
+
+def test_matcher_finds_overlapping_phrases_in_one_pass():
+    matches = list(PhraseMatcher(["he", "she", "hers", "his"]).iter_matches("ushers"))
+    assert sorted(matches) == [(1, "she"), (2, "he"), (2, "hers")]
+
+def test_view_hits_carry_section_and_offset():
+    view = DocumentView(DOC, ["late fee", "gdpr"])
+    
+    assert view.contains("gdpr") and not view.contains("audit")
+    hit = view.evidence("late fee")[0]
+    assert hit["section"] == "4" and hit["heading"] == "Fees"
+    assert DOC["sections"][0]["text"][hit["offset"]:].startswith("Late Fee")
+    assert "Late Fee of 2%" in hit["quote"]
+
+def test_view_offsets_survive_multi_character_lowercase():
+    # 'İ'.lower() is two characters; it must not shift later sections' offsets
+    doc = {"sections": [{"heading": "Seat", "number": "1", "text": "İzmir İstanbul"}] + DOC["sections"]}
+    hit = DocumentView(doc, ["gdpr"]).evidence("gdpr")[0]
+    assert hit["section"] == "7"
+    assert DOC["sections"][1]["text"][hit["offset"]:].startswith("GDPR")
+
+def test_orchestrator_findings_include_evidence():
+    bundle = CAMELStyleOrchestrator().run(DOC)
+    by_title = {f["title"]: f for f in bundle["findings"]}
+    
+    assert [e["section"] for e in by_title["Late fee / interest terms present"]["evidence"]] == ["4"]
+    assert by_title["Privacy regulation triggers present"]["evidence"][0]["section"] == "7"
+    assert by_title["Termination without transition support"]["evidence"][0]["section"] == "12"
+    # Absence findings have nothing to quote
+    assert by_title["Audit rights not explicit"]["evidence"] == []
+    assert "Payment terms unclear" not in by_title
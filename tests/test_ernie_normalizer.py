@@ -0,0 +1,106 @@
+import pytest
+import sys
+import os
+import json
+import re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.docupilot.models.ernie_normalizer import normalize_document, page_windows, merge_normalized
+
+PAGES = [{"page_index": i, "text": f"text of page {i}", "blocks": []} for i in range(1, 8)]
+
+class FakeLLM:
+    """Returns one section per page in the prompt; section 3 is cut short on its first page."""
+    def __init__(self, fail_pages=()):
+        self.calls = []
+        self.fail_pages = set(fail_pages)
+
+    def chat(self, messages, temperature=0.2, max_tokens=2048):
+        pages = [int(n) for n in re.findall(r"--- PAGE (\d+) ---", messages[-1]["content"])]
+        self.calls.append(pages)
+        if self.fail_pages & set(pages):
+            raise RuntimeError("upstream error")
+        sections = [{"heading": f"Clause {p}", "number": str(p), "text": f"text of page {p}"} for p in pages]
+        for s in sections:
+            if s["number"] == "3" and pages[-1] == 3:
+                s["text"] = "text of"
+        return json.dumps({
+            "document_type": "Supply Agreement",
+            "parties": [{"name": "Acme", "role": "Supplier"}],
+            "effective_date": None if pages[0] == 1 else "2024-01-01",
+            "term": None,
+            "sections": sections,
+            "defined_terms": [{"term": f"Page {p}", "definition": "x"} for p in pages] + [{"term": "Goods", "definition": "the goods"}],
+            "obligations": [{"party": "Acme", "obligation": f"deliver batch {p}", "section_ref": str(p)} for p in pages],
+            "raw_extraction_notes": [],
+        })
+
+def test_page_windows_overlap():
+    windows = page_windows(PAGES, 3, overlap=1)
+    assert [[p["page_index"] for p in w] for w in windows] == [[1, 2, 3], [3, 4, 5], [5, 6, 7]]
+    assert len(page_windows(PAGES, 10, overlap=1)) == 1
+
+def test_windows_are_merged_deterministically():
+    llm = FakeLLM()
+    doc = normalize_document(llm, PAGES, window_pages=3, overlap=1, max_workers=3)
+
+    assert sorted(llm.calls) == [[1, 2, 3], [3, 4, 5], [5, 6, 7]]
+    assert [s["number"] for s in doc["sections"]] == ["1", "2", "3", "4", "5", "6", "7"]
+    # The section cut at a window edge keeps its complete text from the overlapping window
+    assert doc["sections"][2]["text"] == "text of page 3"
+    assert doc["parties"] == [{"name": "Acme", "role": "Supplier"}]
+    assert doc["effective_date"] == "2024-01-01"
+    assert [t["term"] for t in doc["defined_terms"]].count("Goods") == 1
+    assert [o["section_ref"] for o in doc["obligations"]] == ["1", "2", "3", "4", "5", "6", "7"]
+
+def test_failed_window_is_noted_and_all_failed_raises():
+    doc = normalize_document(FakeLLM(fail_pages={4}), PAGES, window_pages=3, overlap=1)
+    assert [s["number"] for s in doc["sections"]] == ["1", "2", "3", "5", "6", "7"]
+    assert doc["raw_extraction_notes"] == ["pages 3-5 could not be normalized: upstream error"]
+
+    with pytest.raises(RuntimeError):
+        normalize_document(FakeLLM(fail_pages=set(range(1, 8))), PAGES, window_pages=3, overlap=1)
+
+def test_merge_of_nothing_has_every_key():
+    assert merge_normalized([])["sections"] == []
+    assert merge_normalized([])["document_type"] == "Unknown"
+
+def test_section_longer_than_the_overlap_is_joined_across_windows():
+    pages = [{"page_index": i, "text": f"p{i}", "blocks": []} for i in range(1, 8)]
+    # Section 2 runs from page 2 to page 6
+    body = {p: f"Clause text written on page {p}." for p in range(2, 7)}
+
+    class SpanningLLM:
+        def chat(self, messages, temperature=0.2, max_tokens=2048):
+            window = [int(n) for n in re.findall(r"--- PAGE (\d+) ---", messages[-1]["content"])]
+            sections = []
+            if 1 in window:
+                sections.append({"heading": "Parties", "number": "1", "text": "Acme and Widgets."})
+            spanned = [p for p in window if p in body]
+            if spanned:
+                sections.append({"heading": "Services" if 2 in spanned else "", "number": "2",
+                                 "text": " ".join(body[p] for p in spanned)})
+            if 7 in window:
+                sections.append({"heading": "Term", "number": "3", "text": "Five years."})
+            return json.dumps({"sections": sections})
+
+    doc = normalize_document(SpanningLLM(), pages, window_pages=4, overlap=1)
+    assert [s["number"] for s in doc["sections"]] == ["1", "2", "3"]
+    assert doc["sections"][1]["heading"] == "Services"
+    assert doc["sections"][1]["text"] == " ".join(body[p] for p in range(2, 7))
+
+def test_streamed_window_elements_are_reported():
+    class StreamingLLM(FakeLLM):
+        def chat(self, messages, temperature=0.2, max_tokens=2048, on_element=None):
+            content = super().chat(messages, temperature, max_tokens)
+            for section in json.loads(content)["sections"]:
+                on_element("sections", section)
+            return content
+    
+    elements = []
+    doc = normalize_document(StreamingLLM(), PAGES, window_pages=3, overlap=1,
+                             on_element=lambda key, value: elements.append((key, value["number"])))
+    # Per-window elements: the shared pages 3 and 5 are reported by both of their windows
+    assert sorted(n for _, n in elements) == ["1", "2", "3", "3", "4", "5", "5", "6", "7"]
+    assert doc == normalize_document(FakeLLM(), PAGES, window_pages=3, overlap=1)
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.json_repair import JSONRepairError, parse_json
+
+def test_valid_json_needs_no_repair():
+    assert parse_json('{"risks": []}') == ({"risks": []}, [])
+
+@pytest.mark.parametrize("text, expected, action", [
+    ('```json\n{"a": [1, 2]}\n```', {"a": [1, 2]}, "stripped code fence"),
+    ('{"a": [1, 2,],}', {"a": [1, 2]}, "removed trailing commas"),
+    ("{'risk': 'late fee', 'ok': True, 'n': None}", {"risk": "late fee", "ok": True, "n": None}, "converted single-quoted strings"),
+    ('{risk: "x"}', {"risk": "x"}, "quoted bare keys"),
+    ('Here is the register:\n{"risks": []}\nLet me know!', {"risks": []}, "extracted JSON from surrounding text"),
+    ('See [1] below. {"a": {"b": [1]}}', {"a": {"b": [1]}}, "extracted JSON from surrounding text"),
+    ('{"a": [1, 2]]}', {"a": [1, 2]}, "dropped unmatched closing bracket"),
+    ('{"a": 1, "b": "cut off', {"a": 1}, "dropped incomplete trailing element"),
+    ('[1, true, "x"', [1, True, "x"], "closed 1 truncated container(s)"),
+])
+def test_local_repairs(text, expected, action):
+    value, actions = parse_json(text)
+    assert value == expected
+    assert action in actions
+
+def test_truncated_array_drops_incomplete_element():
+    text = '```json\n{"risks": [{"risk": "a", "severity": 5}, {"risk": "b", "severity":'
+    value, actions = parse_json(text)
+    assert value == {"risks": [{"risk": "a", "severity": 5}]}
+    assert "dropped incomplete trailing element" in actions
+
+@pytest.mark.parametrize("text, expected", [
+    # A number or literal at the cut may itself be short
+    ('[1, 2, 35', [1, 2]),
+    ('{"ok": [true, fal', {"ok": [True]}),
+    ('{"a": {"b": 1, "c": "x', {"a": {"b": 1}}),
+    ('{"risks": [{"risk": "a"', {"risks": []}),
+])
+def test_truncation_keeps_only_complete_values(text, expected):
+    assert parse_json(text)[0] == expected
+
+def test_first_complete_object_wins():
+    assert parse_json('{"risks": [1]}\n{"risks": [1, 2, 3, 4]}')[0] == {"risks": [1]}
+    assert parse_json('{"risks": [1, 2], "x": {"y": 1}, "z": {"w":')[0] == {"risks": [1, 2], "x": {"y": 1}}
+    assert parse_json('{"a": "cut off {"b": 1}')[0] == {"b": 1}
+
+def test_quotes_inside_strings_survive():
+    value, _ = parse_json("""{'q': 'it\\'s "fine"', "r": "say \\"hi\\""}""")
+    assert value == {"q": 'it\'s "fine"', "r": 'say "hi"'}
+
+@pytest.mark.parametrize("text", ["", "no json here", "{'a': undefined_thing}"])
+def test_unrecoverable_text_raises(text):
+    with pytest.raises(JSONRepairError):
+        parse_json(text)
+
+def test_normalizer_only_asks_llm_when_local_repair_fails():
+    from src.docupilot.models.ernie_normalizer import normalize_document
+
+    class FakeLLM:
+        def __init__(self, first):
+            self.responses = [first, '{"document_type": "Lease", "sections": []}']
+            self.calls = 0
+
+        def chat(self, messages, temperature=0.2, max_tokens=2048):
+            self.calls += 1
+            return self.responses[self.calls - 1]
+
+    pages = [{"page_index": 1, "text": "Lease", "blocks": []}]
+    truncated = FakeLLM('```json\n{"document_type": "Lease", "sections": [{"heading": "Rent", "number": "1", "text": "Pay')
+    doc = normalize_document(truncated, pages)
+    assert truncated.calls == 1
+    assert doc["document_type"] == "Lease"
+    # The section cut mid-text is dropped, not kept as "Pay"
+    assert doc["sections"] == []
+
+    garbage = FakeLLM("I could not read this document.")
+    assert normalize_document(garbage, pages)["document_type"] == "Lease"
+    assert garbage.calls == 2
+
+def test_agents_recover_fenced_and_truncated_responses():
+    from src.agents.analyst import AnalystAgent
+    from src.agents.risk import RiskAgent
+
+    with patch.object(AnalystAgent, 'run', return_value="```json\n{'parties': ['Acme',], 'findings': 'ok'}\n```"):
+        assert AnalystAgent().analyze("text") == {"parties": ["Acme"], "findings": "ok"}
+    with patch.object(RiskAgent, 'run', return_value='{"risks": [{"risk": "Late fee", "severity": 6}, {"risk": "Aut'):
+        assert RiskAgent().assess_risk("analysis")["risks"][0]["risk"] == "Late fee"
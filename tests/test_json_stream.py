@@ -0,0 +1,31 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.json_stream import JSONArrayStream
+
+RESPONSE = (
+    'Here you go:\n```json\n'
+    '{"summary": "see [1], {2}", "risks": [{"risk": "Late fee, \\"capped\\" }", "severity": 6}, '
+    "{'risk': 'Auto-renewal', 'severity': 4}], \"notes\": [\"ok\"], \"meta\": {\"nested\": [1]}}\n```"
+)
+
+@pytest.mark.parametrize("chunk_size", [1, 5, len(RESPONSE)])
+def test_elements_are_emitted_once_whatever_the_chunking(chunk_size):
+    stream = JSONArrayStream()
+    found = []
+    for i in range(0, len(RESPONSE), chunk_size):
+        found += stream.feed(RESPONSE[i:i + chunk_size])
+    assert found == [
+        ("risks", {"risk": 'Late fee, "capped" }', "severity": 6}),
+        ("risks", {"risk": "Auto-renewal", "severity": 4}),
+        ("notes", "ok"),
+    ]
+
+def test_element_is_emitted_as_soon_as_it_closes():
+    stream = JSONArrayStream()
+    assert stream.feed('[{"section": "1", "text": "Fees"}, {"section": "2"') == [(None, {"section": "1", "text": "Fees"})]
+    assert stream.feed(', "text": "Term"}') == []
+    assert stream.feed(']') == [(None, {"section": "2", "text": "Term"})]
@@ -0,0 +1,90 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.normalize import create_evidence_store, noise_score
+from src.agents.orchestrator import clean_noisy_blocks
+
+def _block(page, i, text):
+    return {'block_id': f"p{page}_b{i}", 'page': page, 'text': text}
+
+def _three_page_filing():
+    blocks = []
+    for page in (1, 2, 3):
+        blocks += [
+            _block(page, 0, "ACME CORP v. WIDGETS LTD — Case No. 24-1187"),
+            _block(page, 1, f"1 . {page} . Lot {page * 7} shall be delivered in accord-\nance with"),
+            _block(page, 2, f"schedule {chr(64 + page)} agreed by the parties."),
+            _block(page, 3, f"Costs for lot {page * 7} are borne by the {('Buyer', 'Seller', 'Agent')[page - 1]}."),
+            _block(page, 4, f"Page {page} of 3"),
+        ]
+    return blocks
+
+def test_cleaner_strips_headers_page_numbers_and_joins_lines():
+    evidence = create_evidence_store(_three_page_filing())
+    
+    texts = [b['text'] for b in evidence['blocks']]
+    assert texts[:2] == [
+        "1.1. Lot 7 shall be delivered in accordance with schedule A agreed by the parties.",
+        "Costs for lot 7 are borne by the Buyer.",
+    ]
+    assert len(texts) == 6
+    assert evidence['blocks'][0]['merged_ids'] == ["p1_b2"]
+    assert evidence['metadata']['cleaning'] == {
+        'page_numbers_removed': 3, 'headers_footers_removed': 3, 'lines_joined': 3,
+    }
+    assert evidence['metadata']['total_blocks'] == 6
+
+def test_cleaning_can_be_disabled():
+    evidence = create_evidence_store(_three_page_filing(), clean=False)
+    assert len(evidence['blocks']) == 15
+    assert 'cleaning' not in evidence['metadata']
+
+def test_noise_score_separates_clean_and_garbled_text():
+    assert noise_score("The Supplier shall deliver the goods within 30 days.") == 0.0
+    assert noise_score("Th3 Supp1ier sh@ll d e l i v e r ~~ tHe g00ds ^^") > 0.5
+
+def test_only_noisy_blocks_reach_the_ingestion_agent():
+    blocks = [
+        {'id': 'p1_b0', 'page': 1, 'text': "Clean clause.", 'noise': 0.0},
+        {'id': 'p1_b1', 'page': 1, 'text': "G@rbl3d ~~ t e x t", 'noise': 0.8},
+    ]
+    
+    class FakeIngestion:
+        calls = []
+        def process(self, noisy):
+            self.calls.append([b['id'] for b in noisy])
+            return [dict(b, text="Garbled text") for b in noisy]
+    
+    agent = FakeIngestion()
+    cleaned = clean_noisy_blocks(agent, blocks, lambda msg: None, threshold=0.15)
+    assert agent.calls == [['p1_b1']]
+    assert [b['text'] for b in cleaned] == ["Clean clause.", "Garbled text"]
+    
+    clean_noisy_blocks(agent, blocks[:1], lambda msg: None, threshold=0.15)
+    assert len(agent.calls) == 1
+
+def test_amounts_and_years_survive_cleaning():
+    blocks = []
+    for page in (1, 2, 3, 4):
+        blocks += [
+            _block(page, 0, f"Monthly fee: USD {page * 1000}"),
+            _block(page, 1, f"Schedule {page}. Fees for the year"),
+            _block(page, 2, "2024"),
+            _block(page, 3, "Units ordered in total"),
+            _block(page, 4, "150"),
+            _block(page, 5, f"Delivery of lot {page} is due on receipt."),
+            _block(page, 6, f"Total due 50{page}.00"),
+            _block(page, 7, f"Page {page} of 4"),
+        ]
+    evidence = create_evidence_store(blocks)
+    
+    texts = [b['text'] for b in evidence['blocks']]
+    assert texts.count("2024") == 4 and texts.count("150") == 4
+    assert [t for t in texts if t.startswith(("Monthly fee", "Total due"))] == [
+        f"{label} {amount}" for page in (1, 2, 3, 4)
+        for label, amount in (("Monthly fee: USD", page * 1000), ("Total due", f"50{page}.00"))
+    ]
+    assert evidence['metadata']['cleaning']['page_numbers_removed'] == 4
@@ -45,3 +45,97 @@ def test_extract_document_fallback():
         # Should have fallen back to mock data
         assert len(result) > 0
         assert any("UNITED STATES DISTRICT COURT" in b['text'] for b in result)
+
+def _make_text_pdf(path, n_pages):
+    """Build a small digital PDF with two text blocks per page."""
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for i in range(1, n_pages + 1):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Heading for page {i}")
+        page.insert_text((72, 400), f"Clause {i}.1 The Provider shall deliver the services on page {i}.")
+    doc.save(str(path))
+    doc.close()
+    return str(path)
+
+def test_native_extraction_sharded_matches_serial(tmp_path, monkeypatch):
+    """Page-sharded native extraction returns the same blocks, in page order."""
+    import src.ocr as ocr
+    pdf_path = _make_text_pdf(tmp_path / "filing.pdf", 12)
+    monkeypatch.setattr(ocr, "NATIVE_SHARD_MIN_PAGES", 2)
+    
+    serial = ocr.extract_native_text(pdf_path, max_workers=1)
+    sharded = ocr.extract_native_text(pdf_path, max_workers=3)
+    
+    assert sharded == serial
+    assert [b['page'] for b in sharded] == sorted(b['page'] for b in sharded)
+    assert sharded[0]['block_id'] == "p1_b0"
+    assert sharded[-1]['page'] == 12
+
+def test_extract_document_routes_only_scanned_pages_to_ocr(tmp_path, monkeypatch):
+    """Digital pages are read natively; only text-less pages go to OCR."""
+    import src.ocr as ocr
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    for i in range(1, 5):
+        page = doc.new_page()
+        if i != 3:  # page 3 stands in for a scanned exhibit
+            page.insert_text((72, 72), f"Section {i}. The parties agree to the terms set out on this page.")
+    pdf_path = str(tmp_path / "mixed.pdf")
+    doc.save(pdf_path)
+    doc.close()
+    
+    ocr_calls = []
+    def fake_ocr(path, page_numbers, stats=None):
+        ocr_calls.append(list(page_numbers))
+        for p in page_numbers:
+            yield p, [{"block_id": f"p{p}_b0", "page": p, "type": "text", "text": "EXHIBIT A (scanned)", "bbox": []}]
+    monkeypatch.setattr(ocr, "_iter_ocr_pages", fake_ocr)
+    
+    stats = {}
+    blocks = extract_document(pdf_path, stats=stats, use_cache=False)
+    
+    assert ocr_calls == [[3]]
+    assert stats['native_pages'] == 3 and stats['ocr_pages'] == 1
+    assert [b['page'] for b in blocks] == [1, 2, 3, 4]
+    assert blocks[2]['text'] == 'EXHIBIT A (scanned)'
+
+def test_busy_ocr_pool_is_an_error_not_mock_data(tmp_path, monkeypatch):
+    import src.ocr as ocr
+    fitz = pytest.importorskip("fitz")
+    doc = fitz.open()
+    doc.new_page()  # a scanned page: no text layer
+    pdf_path = str(tmp_path / "scanned.pdf")
+    doc.save(pdf_path)
+    doc.close()
+    
+    def busy_pool(path, page_numbers, stats=None):
+        raise TimeoutError("No PaddleOCR engine became free")
+        yield
+    monkeypatch.setattr(ocr, "_iter_ocr_pages", busy_pool)
+    
+    with pytest.raises(TimeoutError):
+        extract_document(pdf_path, use_cache=False)
+
+def test_adaptive_dpi_tracks_text_size(tmp_path):
+    """Large type renders at a lower DPI than fine print, within the clamp range."""
+    fitz = pytest.importorskip("fitz")
+    pdfium = pytest.importorskip("pypdfium2")
+    from src.docupilot.models.render import estimate_line_height_pt, choose_render_dpi
+    
+    doc = fitz.open()
+    for size in (7, 28):
+        page = doc.new_page()
+        for i in range(10):
+            page.insert_text((50, 60 + i * size * 1.6), f"The Licensee shall pay all fees when due {i}", fontsize=size)
+    pdf_path = str(tmp_path / "sizes.pdf")
+    doc.save(pdf_path)
+    doc.close()
+    
+    pdf = pdfium.PdfDocument(pdf_path)
+    fine_dpi = choose_render_dpi(estimate_line_height_pt(pdf[0]), min_dpi=100, max_dpi=300)
+    large_dpi = choose_render_dpi(estimate_line_height_pt(pdf[1]), min_dpi=100, max_dpi=300)
+    pdf.close()
+    
+    assert 100 <= large_dpi < fine_dpi <= 300
+    assert choose_render_dpi(None, min_dpi=100, max_dpi=300) == 300
@@ -0,0 +1,105 @@
+import pytest
+import sys
+import os
+import json
+import base64
+import io
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.config import Config
+from src.docupilot.models.ocr_cloud import Base64JSONBody, CloudOCRExtractor
+
+fitz = pytest.importorskip("fitz")
+
+class LayoutParsingStandIn(BaseHTTPRequestHandler):
+    """Local stand-in for the layout-parsing API: echoes each page's native text."""
+    fail_first = set()  # first-page texts whose first upload gets a 503
+    requests_seen = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with fitz.open(stream=base64.b64decode(body['file']), filetype="pdf") as doc:
+            texts = [page.get_text().strip() for page in doc]
+        
+        with self.lock:
+            self.requests_seen.append(texts)
+            should_fail = texts[0] in self.fail_first
+            self.fail_first.discard(texts[0])
+        if should_fail:
+            self.send_response(503)
+            self.end_headers()
+            self.wfile.write(b"busy")
+            return
+        
+        result = {"errorCode": 0, "result": {"layoutParsingResults": [
+            {"prunedResult": {"parsing_res_list": [
+                {"block_id": 0, "block_label": "text", "block_content": text, "block_bbox": [0, 0, 10, 10]}
+            ]}} for text in texts
+        ]}}
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def stand_in_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), LayoutParsingStandIn)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    LayoutParsingStandIn.requests_seen = []
+    monkeypatch.setattr(Config, "CLOUD_OCR_URL", f"http://127.0.0.1:{server.server_address[1]}/layout-parsing")
+    monkeypatch.setattr(Config, "CLOUD_OCR_TOKEN", "test-token")
+    monkeypatch.setattr(Config, "CLOUD_OCR_BACKOFF_SECONDS", 0.01)
+    yield server
+    server.shutdown()
+
+def _make_pdf(tmp_path, n_pages):
+    doc = fitz.open()
+    for i in range(1, n_pages + 1):
+        doc.new_page().insert_text((72, 72), f"Page {i} text")
+    path = str(tmp_path / "filing.pdf")
+    doc.save(path)
+    doc.close()
+    return path
+
+def test_chunked_upload_stitches_global_page_numbers(stand_in_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CLOUD_OCR_CHUNK_PAGES", 3)
+    monkeypatch.setattr(Config, "CLOUD_OCR_MAX_WORKERS", 3)
+    LayoutParsingStandIn.fail_first = {"Page 4 text"}  # chunk 2 fails once, then succeeds
+    pdf_path = _make_pdf(tmp_path, 8)
+    
+    blocks = CloudOCRExtractor().extract_pdf(pdf_path)
+    
+    assert [b['page'] for b in blocks] == list(range(1, 9))
+    assert all(b['text'] == f"Page {b['page']} text" for b in blocks)
+    assert blocks[4]['block_id'] == "p5_b0"
+    # 3 chunks + 1 retry
+    assert len(LayoutParsingStandIn.requests_seen) == 4
+
+def test_page_subset_keeps_original_page_numbers(stand_in_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "CLOUD_OCR_CHUNK_PAGES", 2)
+    pdf_path = _make_pdf(tmp_path, 6)
+    
+    blocks = CloudOCRExtractor().extract_pdf(pdf_path, pages=[2, 5, 6])
+    
+    assert [(b['page'], b['text']) for b in blocks] == [(2, "Page 2 text"), (5, "Page 5 text"), (6, "Page 6 text")]
+
+@pytest.mark.parametrize("size", [0, 1, 2, 3, 10, 4096 + 1])
+def test_streamed_body_matches_in_memory_json(size):
+    raw = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    fields = {"fileType": 0, "useDocUnwarping": False}
+    body = Base64JSONBody(io.BytesIO(raw), fields, chunk_size=7)
+    
+    streamed = b"".join(iter(lambda: body.read(5), b""))
+    
+    assert len(streamed) == len(body)
+    assert json.loads(streamed) == {"file": base64.b64encode(raw).decode("ascii"), **fields}
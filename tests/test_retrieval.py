@@ -0,0 +1,32 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.retrieval import BM25Index, tokenize
+
+BLOCKS = [
+    {'id': 'p1_b0', 'page': 1, 'text': "This Agreement is made between Acme Corp and Widgets Ltd."},
+    {'id': 'p1_b1', 'page': 1, 'text': "The Buyer shall pay each invoice within 30 days; late payment accrues interest."},
+    {'id': 'p2_b0', 'page': 2, 'text': "Either party may terminate for material breach on written notice."},
+    {'id': 'p2_b1', 'page': 2, 'text': "Payment terms are set out in Schedule B."},
+    {'id': 'p3_b0', 'page': 3, 'text': "本合同受中华人民共和国法律管辖。"},
+]
+
+def test_tokenize_drops_stopwords_and_splits_cjk():
+    assert tokenize("The Buyer shall pay") == ["buyer", "shall", "pay"]
+    assert tokenize("合同") == ["合", "同"]
+
+def test_search_ranks_relevant_blocks_first():
+    index = BM25Index(BLOCKS)
+    
+    hits = index.search("late payment interest invoice", top_k=2)
+    assert [h['id'] for h in hits] == ["p1_b1", "p2_b1"]
+    assert hits[0]['score'] > hits[1]['score'] > 0
+    assert index.search("terminate breach", top_k=1)[0]['id'] == "p2_b0"
+    assert index.search("合同 法律", top_k=1)[0]['id'] == "p3_b0"
+
+def test_search_returns_nothing_for_unknown_terms():
+    assert BM25Index(BLOCKS).search("zebra", top_k=3) == []
+    assert BM25Index([]).search("payment", top_k=3) == []
@@ -0,0 +1,119 @@
+import pytest
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.rule_engine import RuleError, compile_rules, load_rules, _regex_anchor
+
+SAMPLE_RULES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'samples', 'rules.yaml')
+
+BLOCKS = [
+    {'id': 'p1_b0', 'page': 1, 'text': "CAPTION: Smith v. Jones, Superior Court"},
+    {'id': 'p2_b0', 'page': 2, 'text': "The complaint is Dismissed With Prejudice."},
+    {'id': 'p2_b1', 'page': 2, 'text': "Plaintiff shall pay a late fee of 15% per month."},
+    {'id': 'p3_b0', 'page': 3, 'text': "RELIEF REQUESTED: costs. Certificate of Service attached."},
+]
+
+def test_sample_pack_flags_keywords_and_missing_sections():
+    rule_set = load_rules(SAMPLE_RULES)
+    findings = {f.title: f for f in rule_set.evaluate(BLOCKS)}
+
+    hit = findings["Red flag: dismissed with prejudice"]
+    assert hit.severity == 80
+    assert hit.category == "Adverse Finding"
+    assert hit.evidence == [{'block_id': 'p2_b0', 'page': 2, 'quote': "The complaint is Dismissed With Prejudice."}]
+    # Only the section with no matching text anywhere is reported missing
+    missing = sorted(t for t in findings if t.startswith("Required section"))
+    assert missing == ["Required section not found: Jurisdictional Statement"]
+    assert "Red flag: sanctions" not in findings
+
+def test_compiled_pack_is_cached_by_file_hash(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text("red_flags:\n  - pattern: sanctions\n    severity: 5\n")
+    first = load_rules(path)
+    assert load_rules(path) is first
+
+    path.write_text("red_flags:\n  - pattern: default judgment\n    severity: 5\n")
+    assert load_rules(path) is not first
+
+def test_regex_rules_use_their_literal_anchor():
+    assert _regex_anchor(r"late fee of \d+%") == "late fee of "
+    assert _regex_anchor(r"[xyz]{3}abc") == "abc"
+    assert _regex_anchor(r"pay(ment)? due") == " due"
+    assert _regex_anchor(r"smith|jones") is None
+    # Escapes resolve to the characters they match; optional repeats are not required
+    assert _regex_anchor(r"\x41cme corp") == "acme corp"
+    assert _regex_anchor(r"\101cme corp") == "acme corp"
+    assert _regex_anchor(r"\u00e9t\u00e9 clause") == "\u00e9t\u00e9 clause"
+    assert _regex_anchor(r"\N{EURO SIGN}500 due") == "\u20ac500 due"
+    assert _regex_anchor(r"late fees{,2} due") == "late fee"
+
+    rule_set = compile_rules({'rules': [
+        {'id': 'late_fee', 'type': 'regex', 'pattern': r"late fee of (\d+)%", 'severity': 70},
+        {'id': 'anywhere', 'type': 'regex', 'pattern': r"smith|jones", 'severity': 10},
+        {'id': 'escaped', 'type': 'regex', 'pattern': r"\x53uperior court", 'severity': 10},
+        {'id': 'optional', 'type': 'regex', 'pattern': r"dismissed with prejudices{,2}", 'severity': 10},
+    ]})
+    findings = {f.title: f for f in rule_set.evaluate(BLOCKS)}
+    assert findings[r"Red flag: late fee of (\d+)%"].evidence[0]['block_id'] == "p2_b1"
+    assert findings[r"Red flag: late fee of (\d+)%"].severity == 70
+    assert findings["Red flag: smith|jones"].evidence[0]['block_id'] == "p1_b0"
+    assert findings[r"Red flag: \x53uperior court"].evidence[0]['block_id'] == "p1_b0"
+    assert findings["Red flag: dismissed with prejudices{,2}"].evidence[0]['block_id'] == "p2_b0"
+
+def test_absence_rule_with_several_phrases():
+    rule_set = compile_rules({'rules': [
+        {'type': 'absence', 'patterns': ["governing law", "jurisdiction"], 'title': "No governing law"},
+        {'type': 'absence', 'patterns': ["arbitration", "certificate of service"], 'title': "No service"},
+    ]})
+    assert [f.title for f in rule_set.evaluate(BLOCKS)] == ["No governing law"]
+
+def test_malformed_packs_are_rejected():
+    with pytest.raises(RuleError):
+        compile_rules({'rules': [{'type': 'fuzzy', 'pattern': 'x'}]})
+    with pytest.raises(RuleError):
+        compile_rules({'rules': [{'type': 'regex', 'pattern': '('}]})
+    with pytest.raises(RuleError):
+        compile_rules({'red_flags': [{'severity': 3}]})
+
+def test_thousands_of_rules_evaluate_in_one_pass():
+    spec = {'rules': [{'id': f"kw{i}", 'pattern': f"clause token{i} ", 'severity': 3} for i in range(5000)]}
+    spec['rules'].append({'id': 'needle', 'pattern': "dismissed with prejudice", 'severity': 4})
+    rule_set = compile_rules(spec)
+    assert len(rule_set) == 5001
+
+    findings = rule_set.evaluate(BLOCKS * 50)
+    assert [f.title for f in findings] == ["Red flag: dismissed with prejudice"]
+    assert len(findings[0].evidence) == 3
+
+def test_case_folding_keeps_evidence_on_the_right_block():
+    # 'İ'.lower() is two characters; offsets must still map to the original blocks
+    blocks = [
+        {'id': 'a', 'page': 1, 'text': "İ" * 10},
+        {'id': 'b', 'page': 1, 'text': "Late fee"},
+        {'id': 'c', 'page': 2, 'text': "Other terms"},
+        {'id': 'd', 'page': 2, 'text': "Seat: İstanbul Court"},
+    ]
+    rule_set = compile_rules({'rules': [
+        {'id': 'fee', 'pattern': "late fee", 'severity': 10},
+        {'id': 'seat', 'type': 'regex', 'pattern': r"istanbul court", 'severity': 10},
+    ]})
+    findings = {f.title: f for f in rule_set.evaluate(blocks)}
+    assert findings["Red flag: late fee"].evidence == [{'block_id': 'b', 'page': 1, 'quote': "Late fee"}]
+    assert findings["Red flag: istanbul court"].evidence[0]['block_id'] == 'd'
+
+def test_regex_rules_without_a_usable_parser_have_no_anchor(monkeypatch):
+    import src.utils.rule_engine as rule_engine
+    monkeypatch.setattr(rule_engine, "_sre_parse", None)
+    assert _regex_anchor(r"late fee of \d+%") is None
+    
+    class ChangedParser:
+        @staticmethod
+        def parse(pattern):
+            return [("LITERAL",)]  # internals no longer (op, arg) pairs
+    monkeypatch.setattr(rule_engine, "_sre_parse", ChangedParser)
+    assert _regex_anchor(r"late fee of \d+%") is None
+    
+    rule_set = compile_rules({'rules': [{'type': 'regex', 'pattern': r"late fee of (\d+)%", 'severity': 7}]})
+    assert [f.evidence[0]['block_id'] for f in rule_set.evaluate(BLOCKS)] == ["p2_b1"]
@@ -0,0 +1,142 @@
+import pytest
+import sys
+import os
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.scheduler import Stage, StageScheduler, StageError
+
+def test_independent_stages_overlap_and_outputs_flow_by_name():
+    def slow(value):
+        def fn(**inputs):
+            time.sleep(0.1)
+            return value + sum(inputs.values())
+        return fn
+    
+    stages = [
+        Stage('a', slow(1)),
+        Stage('b', slow(10), inputs=['a']),
+        Stage('c', slow(100), inputs=['a']),
+        Stage('d', lambda b, c: b + c, inputs=['b', 'c']),
+    ]
+    scheduler = StageScheduler(stages)
+    started = time.monotonic()
+    out = scheduler.run()
+    
+    assert out['d'] == 11 + 101
+    # b and c run side by side: ~0.2 s total, not ~0.3 s
+    assert time.monotonic() - started < 0.28
+    assert set(scheduler.report) == {'a', 'b', 'c', 'd'}
+    assert scheduler.report['b']['status'] == 'ok' and scheduler.report['b']['seconds'] >= 0.1
+
+def test_retries_timeouts_and_defaults():
+    attempts = []
+    hung_calls = []
+    def hung():
+        hung_calls.append(1)
+        time.sleep(1)
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 2:
+            raise RuntimeError("transient")
+        return "ok"
+    
+    stages = [
+        Stage('flaky', flaky, retries=2),
+        Stage('hung', hung, timeout=0.1, retries=2, default="fallback"),
+        Stage('after', lambda flaky, hung: f"{flaky}+{hung}", inputs=['flaky', 'hung']),
+    ]
+    scheduler = StageScheduler(stages)
+    started = time.monotonic()
+    out = scheduler.run()
+    
+    assert out['after'] == "ok+fallback"
+    assert time.monotonic() - started < 0.5
+    assert scheduler.report['flaky']['attempts'] == 2
+    assert scheduler.report['hung']['status'] == 'failed' and "timed out" in scheduler.report['hung']['error']
+    # A timed-out stage is not started again next to its still-running first attempt
+    assert len(hung_calls) == 1 and scheduler.report['hung']['attempts'] == 1
+
+def test_required_stage_failure_raises():
+    stages = [Stage('boom', lambda: 1 / 0), Stage('next', lambda boom: boom, inputs=['boom'])]
+    with pytest.raises(StageError) as exc:
+        StageScheduler(stages).run()
+    assert exc.value.stage == 'boom'
+
+def test_status_messages_are_delivered_on_the_calling_thread():
+    caller = threading.current_thread()
+    seen = []
+    def callback(msg):
+        assert threading.current_thread() is caller
+        seen.append(msg)
+    
+    def work(emit):
+        emit("halfway")
+        return 1
+    
+    StageScheduler([Stage('work', work, emits=True, status="starting")], status_callback=callback).run()
+    assert seen == ["starting", "halfway"]
+
+def test_invalid_graphs_are_rejected():
+    with pytest.raises(ValueError):
+        StageScheduler([Stage('a', lambda b: b, inputs=['b']), Stage('b', lambda a: a, inputs=['a'])])
+    with pytest.raises(ValueError):
+        StageScheduler([Stage('a', lambda missing: 1, inputs=['missing'])])
+
+def test_partial_results_reach_the_caller_while_the_stage_runs():
+    caller = threading.current_thread()
+    acted_on = threading.Event()
+    seen = []
+    def on_partial(stage, item):
+        assert threading.current_thread() is caller
+        seen.append((stage, item))
+        acted_on.set()
+    
+    def work(partial):
+        partial({'risk': 'first'})
+        # The caller handles the partial result before this stage finishes
+        assert acted_on.wait(timeout=2)
+        return 'done'
+    
+    out = StageScheduler([Stage('risks', work, partials=True)], partial_callback=on_partial).run()
+    assert out['risks'] == 'done'
+    assert seen == [('risks', {'risk': 'first'})]
+
+def test_partials_of_failed_and_orphaned_attempts_are_retracted():
+    seen = []
+    delivered = threading.Event()
+    def on_partial(stage, item):
+        seen.append((stage, item))
+        delivered.set()
+    
+    attempts = []
+    def flaky(partial):
+        attempts.append(1)
+        partial({'risk': 'A', 'attempt': len(attempts)})
+        if len(attempts) == 1:
+            assert delivered.wait(timeout=2)
+            raise RuntimeError("stream broke off")
+        return 'done'
+    
+    def hung(partial, emit):
+        partial({'risk': 'B'})
+        time.sleep(0.3)
+        # Reported after the timeout, while the run is still going: dropped
+        partial({'risk': 'late'})
+        emit("late status")
+    
+    statuses = []
+    stages = [
+        Stage('risks', flaky, partials=True, retries=1),
+        Stage('hung', hung, partials=True, emits=True, timeout=0.15, default=None),
+        Stage('slow', lambda: time.sleep(0.5)),
+    ]
+    StageScheduler(stages, status_callback=statuses.append, partial_callback=on_partial).run()
+    
+    risks = [item for stage, item in seen if stage == 'risks']
+    assert risks == [{'risk': 'A', 'attempt': 1}, {'retract': True}, {'risk': 'A', 'attempt': 2}]
+    assert [item for stage, item in seen if stage == 'hung'] == [{'risk': 'B'}, {'retract': True}]
+    assert "late status" not in statuses